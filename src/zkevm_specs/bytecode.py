@@ -1,7 +1,7 @@
-from typing import Sequence, Union, Tuple, Set, NamedTuple
+from typing import Optional, Sequence, Union, Tuple, Set, NamedTuple
 from collections import namedtuple
-from .util import keccak256, EMPTY_HASH, FQ, RLC
-from .evm import get_push_size, BytecodeFieldTag, BytecodeTableRow
+from .util import EMPTY_HASH, FQ, RLC, FailureReport, require
+from .evm import get_push_size, BytecodeFieldTag, BytecodeTableRow, KeccakTable
 from .encoding import U8, U256, is_circuit_code
 
 # Row in the circuit
@@ -17,7 +17,7 @@ class UnrolledBytecode(NamedTuple):
 
 @is_circuit_code
 def assert_bool(value: Union[int, bool]):
-    assert value in [0, 1]
+    require(value in [0, 1])
 
 
 @is_circuit_code
@@ -35,7 +35,7 @@ def check_bytecode_row(
     prev_row: Row,
     next_row: Row,
     push_table: Set[Tuple[int, int]],
-    keccak_table: Set[Tuple[int, int, int]],
+    keccak_table: KeccakTable,
     r: int,
 ):
     row = Row(*[v if isinstance(v, RLC) else FQ(v) for v in row])
@@ -45,40 +45,40 @@ def check_bytecode_row(
         # Continue
         if prev_row.tag == BytecodeFieldTag.Length:
             # index starts from 0
-            assert row.index == 0
+            require(row.index == 0)
             # is_code := 1, since this is the first byte of the bytecode
-            assert row.is_code == 1
+            require(row.is_code == 1)
         else:
             # index is 1 more than previous row's index
-            assert row.index == prev_row.index + 1
+            require(row.index == prev_row.index + 1)
             # is_code := push_data_left_prev == 0
-            assert row.is_code == (prev_row.push_data_left == 0)
+            require(row.is_code == (prev_row.push_data_left == 0))
         # hash_rlc := hash_rlc_prev * r + byte
-        assert row.hash_rlc == prev_row.hash_rlc * r + row.value
+        require(row.hash_rlc == prev_row.hash_rlc * r + row.value)
         # padding needs to remain the same
-        assert row.padding == prev_row.padding
+        require(row.padding == prev_row.padding)
         # hash needs to remain the same
-        assert row.hash == prev_row.hash
+        require(row.hash == prev_row.hash)
         # hash_length needs to remain the same
-        assert row.hash_length == prev_row.hash_length
+        require(row.hash_length == prev_row.hash_length)
     else:
         # Start
         # the row following an `is_final` previous row is either tagged Length
         if row.tag == BytecodeFieldTag.Length:
             # value matches hash length
-            assert row.value == row.hash_length
+            require(row.value == row.hash_length)
             # if bytecode length is zero
             if row.value == 0:
                 # bytecode hash should be EMPTY_HASH
-                assert row.hash == RLC(EMPTY_HASH, FQ(r)).expr()
+                require(row.hash == RLC(EMPTY_HASH, FQ(r)).expr())
                 # the next row should be a tag Length or padding
-                assert (next_row.tag == BytecodeFieldTag.Length) or (next_row.tag == 0)
+                require((next_row.tag == BytecodeFieldTag.Length) or (next_row.tag == 0))
             else:
                 # the next row should be tag Byte
-                assert next_row.tag == BytecodeFieldTag.Byte
+                require(next_row.tag == BytecodeFieldTag.Byte)
         # or is the start of padding rows
         else:
-            assert row.padding == 1
+            require(row.padding == 1)
 
     # is_final needs to be boolean
     assert_bool(row.is_final)
@@ -87,8 +87,9 @@ def check_bytecode_row(
 
     if row.tag == BytecodeFieldTag.Byte:
         # push_data_left := is_code ? byte_push_size : push_data_left_prev - 1
-        assert row.push_data_left == select(
-            row.is_code, row.byte_push_size, prev_row.push_data_left - 1
+        require(
+            row.push_data_left
+            == select(row.is_code, row.byte_push_size, prev_row.push_data_left - 1)
         )
 
     # Padding
@@ -104,16 +105,43 @@ def check_bytecode_row(
     if row.q_last == 1:
         # padding needs to be enabled OR
         # the last row needs to be the last byte
-        assert row.padding == 1 or row.is_final == 1
+        require(row.padding == 1 or row.is_final == 1)
 
     if row.tag == BytecodeFieldTag.Byte:
         # Lookup how many bytes the current opcode pushes
         # (also indirectly range checks `byte` to be in [0, 255])
-        assert (row.value, row.byte_push_size) in push_table
+        require((row.value, row.byte_push_size) in push_table)
 
     # keccak lookup when on the last byte
     if row.is_final == 1 and row.padding == 0:
-        assert (row.hash_rlc, row.hash_length, row.hash) in keccak_table
+        require((row.hash_rlc, row.hash_length, row.hash) in keccak_table)
+
+
+def verify_bytecode_circuit(
+    rows: Sequence[Row],
+    push_table: Set[Tuple[int, int]],
+    keccak_table: KeccakTable,
+    r: int,
+    report: Optional[FailureReport] = None,
+):
+    """
+    Check all the rows of the bytecode circuit, wrapping around at the ends of
+    the table.  With a report, failures are recorded in it instead of raised,
+    and checking stops once its failure budget is exhausted.
+    """
+    for idx, row in enumerate(rows):
+        prev_row = rows[(idx - 1) % len(rows)]
+        next_row = rows[(idx + 1) % len(rows)]
+        if report is None:
+            check_bytecode_row(row, prev_row, next_row, push_table, keccak_table, r)
+            continue
+        tag = FQ(row.tag).n
+        tag_name = BytecodeFieldTag(tag).name if tag in list(BytecodeFieldTag) else None
+        report.check(
+            idx, tag_name, check_bytecode_row, row, prev_row, next_row, push_table, keccak_table, r
+        )
+        if report.exhausted():
+            return
 
 
 # Populate the circuit matrix
@@ -204,11 +232,13 @@ def assign_push_table():
     return _convert_table(push_table)
 
 
-# Generate keccak table
-def assign_keccak_table(bytecodes: Sequence[bytes], randomness: FQ):
-    keccak_table = []
+# Generate keccak table, or add the bytecodes to a keccak table shared with
+# other circuits
+def assign_keccak_table(
+    bytecodes: Sequence[bytes], randomness: FQ, keccak_table: Optional[KeccakTable] = None
+) -> KeccakTable:
+    if keccak_table is None:
+        keccak_table = KeccakTable(randomness)
     for bytecode in bytecodes:
-        hash = RLC(bytes(reversed(keccak256(bytecode))), randomness)
-        rlc = RLC(bytes(reversed(bytecode)), randomness, len(bytecode))
-        keccak_table.append((rlc.expr(), len(bytecode), hash.expr()))
-    return _convert_table(keccak_table)
+        keccak_table.add(bytecode, randomness)
+    return keccak_table
@@ -1,9 +1,12 @@
+from .checkpoint import *
 from .execution import *
 from .execution_state import *
+from .interpreter import *
 from .main import *
 from .opcode import *
 from .precompiled import *
 from .step import *
 from .table import *
+from .trace import *
 from .typing import *
 from .util import *
@@ -0,0 +1,109 @@
+from __future__ import annotations
+from dataclasses import fields, is_dataclass
+from typing import Any, Iterable, List, Optional, Tuple
+import hashlib
+import json
+import os
+
+from ..util import FQ
+from .step import StepState
+from .table import Tables
+
+
+def _encode_value(value: Any) -> int:
+    if hasattr(value, "expr"):
+        return value.expr().n
+    return FQ(value).n
+
+
+def _encode_row(row: Any) -> Tuple[int, ...]:
+    assert is_dataclass(row), f"Expected a table row, but got {type(row)}"
+    return tuple(_encode_value(getattr(row, field.name)) for field in fields(row))
+
+
+def encode_step(step: StepState) -> bytes:
+    return repr(
+        (
+            int(step.execution_state),
+            step.rw_counter.n,
+            step.call_id.n,
+            bool(step.is_root),
+            bool(step.is_create),
+            _encode_value(step.code_hash),
+            step.program_counter.n,
+            step.stack_pointer.n,
+            step.gas_left.n,
+            step.memory_size.n,
+            step.reversible_write_counter.n,
+            step.log_id.n,
+        )
+    ).encode()
+
+
+def inputs_digest(randomness: FQ, tables: Tables) -> str:
+    """
+    Digest of the randomness and all the witness tables, which is independent
+    of the iteration order of the sets backing the tables.
+    """
+    hasher = hashlib.sha256(repr(randomness.n).encode())
+    named_tables: List[Tuple[str, Iterable[Any]]] = [
+        ("block_table", tables.block_table),
+        ("tx_table", tables.tx_table),
+        ("bytecode_table", tables.bytecode_table),
+        ("rw_table", tables.rw_table),
+        ("copy_table", tables.copy_table),
+        ("keccak_table", tables.keccak_table),
+    ]
+    for name, rows in named_tables:
+        hasher.update(name.encode())
+        for encoded in sorted(_encode_row(row) for row in rows):
+            hasher.update(repr(encoded).encode())
+    return hasher.hexdigest()
+
+
+class VerificationCheckpoint:
+    """
+    Persists the progress of a long `verify_steps` run, so a later run over
+    the same inputs resumes from the last checkpointed step instead of step 0.
+
+    The file records the digest of the tables, the index of the next step to
+    verify and a digest of the steps up to it, including it since the
+    transition into it was verified. Progress is saved every `interval`
+    verified steps and once more when verification finishes.
+    """
+
+    path: str
+    interval: int
+
+    def __init__(self, path: str, interval: int = 1024) -> None:
+        assert interval > 0, "Checkpoint interval should be positive"
+        self.path = path
+        self.interval = interval
+
+    def load(self, digest: str) -> Tuple[int, Optional[str]]:
+        """
+        Returns the index of the next step to verify and the digest of the
+        steps before it, or (0, None) when there is no checkpoint of the same
+        inputs.
+        """
+        try:
+            with open(self.path) as fp:
+                state = json.load(fp)
+        except FileNotFoundError:
+            return 0, None
+        if state.get("digest") != digest:
+            return 0, None
+        return state["next_step"], state["steps_digest"]
+
+    def save(self, digest: str, next_step: int, steps_digest: str):
+        # Write then rename, so a crash never leaves a truncated checkpoint
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as fp:
+            json.dump({"digest": digest, "next_step": next_step, "steps_digest": steps_digest}, fp)
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
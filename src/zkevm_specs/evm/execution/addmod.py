@@ -1,6 +1,6 @@
 from ..instruction import Instruction, Transition
 from ..opcode import Opcode
-from zkevm_specs.util import FQ, RLC
+from zkevm_specs.util import FQ, RLC, require
 
 
 # Returns 1 when a is lower than b, 0 otherwise
@@ -57,7 +57,7 @@ def addmod(instruction: Instruction):
     a_reduced_lt_n = lt_u256(instruction, RLC(a_reduced), n)
     instruction.constrain_zero(FQ(2) - (a_reduced_lt_n + r_lt_n + 2 * n_is_zero))
 
-    assert pushed_r.int_value == r.int_value * (1 - n_is_zero)
+    require(pushed_r.int_value == r.int_value * (1 - n_is_zero))
 
     instruction.step_state_transition_in_same_context(
         opcode,
@@ -13,7 +13,7 @@ def jumpi(instruction: Instruction):
     cond = instruction.stack_pop()
 
     # check `cond` is zero or not
-    if instruction.is_zero(cond):
+    if instruction.is_zero(cond) == FQ(1):
         pc_diff = FQ(1)
     else:
         # Get `dest` raw value in max 8 bytes
@@ -2,7 +2,7 @@ from ..instruction import Instruction, Transition
 from ..table import CallContextFieldTag, TxLogFieldTag, CopyDataTypeTag
 from ..opcode import Opcode
 from ...util.param import GAS_COST_LOG, GAS_COST_LOGDATA
-from ...util import FQ
+from ...util import FQ, require
 
 
 def log(instruction: Instruction):
@@ -53,7 +53,7 @@ def log(instruction: Instruction):
                 )
 
     # TOPIC_COUNT == Non zero topic selector count
-    assert sum(topic_selectors) == topic_count
+    require(sum(topic_selectors) == topic_count)
     # `topic_selectors` order must be from 1 --> 0
     for i in range(0, 4):
         instruction.constrain_bool(FQ(topic_selectors[i]))
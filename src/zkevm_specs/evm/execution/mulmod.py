@@ -1,6 +1,6 @@
 from ..instruction import Instruction, Transition
 from ..opcode import Opcode
-from zkevm_specs.util import FQ, RLC
+from zkevm_specs.util import FQ, RLC, require
 
 
 def mod(instruction: Instruction, a: RLC, n: RLC, r: RLC):
@@ -51,7 +51,7 @@ def mulmod(instruction: Instruction):
     d = RLC(a_reduced_times_b // MOD)
 
     # Safety check
-    assert (a_reduced_times_b) == k * n.int_value + r.int_value
+    require((a_reduced_times_b) == k * n.int_value + r.int_value)
 
     # Reduction of first factor
     mod(instruction, a, n, RLC(a_reduced))
@@ -1,4 +1,4 @@
-from ...util import FQ
+from ...util import FQ, require
 from ..instruction import Instruction, Transition
 from ..opcode import Opcode
 
@@ -25,7 +25,7 @@ def scmp(instruction: Instruction):
     a_hi = instruction.bytes_to_fq(a8s[16:])
     b_lo = instruction.bytes_to_fq(b8s[:16])
     b_hi = instruction.bytes_to_fq(b8s[16:])
-    assert c8s[31] == 0
+    require(c8s[31] == 0)
     cc = instruction.bytes_to_fq(c8s[:31])
 
     a_lt_b_lo, _ = instruction.compare(a_lo, b_lo, 16)
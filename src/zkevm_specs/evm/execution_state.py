@@ -1,5 +1,7 @@
+from __future__ import annotations
 from enum import IntEnum, auto
-from typing import Sequence, Tuple, Union
+from types import MappingProxyType
+from typing import Final, FrozenSet, Mapping, Sequence, Tuple, Union
 
 from ..util import FQ
 from .opcode import (
@@ -134,269 +136,181 @@ class ExecutionState(IntEnum):
         return FQ(self)
 
     def responsible_opcode(self) -> Union[Sequence[int], Sequence[Tuple[int, int]]]:
-        if self == ExecutionState.STOP:
-            return [Opcode.STOP]
-        elif self == ExecutionState.ADD:
-            return [
-                Opcode.ADD,
-                Opcode.SUB,
-            ]
-        elif self == ExecutionState.MUL:
-            return [Opcode.MUL, Opcode.DIV, Opcode.MOD]
-        elif self == ExecutionState.SDIV_SMOD:
-            return [Opcode.SDIV, Opcode.SMOD]
-        elif self == ExecutionState.ADDMOD:
-            return [Opcode.ADDMOD]
-        elif self == ExecutionState.MULMOD:
-            return [Opcode.MULMOD]
-        elif self == ExecutionState.EXP:
-            return [Opcode.EXP]
-        elif self == ExecutionState.SIGNEXTEND:
-            return [Opcode.SIGNEXTEND]
-        elif self == ExecutionState.CMP:
-            return [
-                Opcode.LT,
-                Opcode.GT,
-                Opcode.EQ,
-            ]
-        elif self == ExecutionState.SCMP:
-            return [
-                Opcode.SLT,
-                Opcode.SGT,
-            ]
-        elif self == ExecutionState.ISZERO:
-            return [Opcode.ISZERO]
-        elif self == ExecutionState.BITWISE:
-            return [
-                Opcode.AND,
-                Opcode.OR,
-                Opcode.XOR,
-            ]
-        elif self == ExecutionState.NOT:
-            return [Opcode.NOT]
-        elif self == ExecutionState.BYTE:
-            return [Opcode.BYTE]
-        elif self == ExecutionState.SHL_SHR:
-            return [Opcode.SHL, Opcode.SHR]
-        elif self == ExecutionState.SAR:
-            return [Opcode.SAR]
-        elif self == ExecutionState.SHA3:
-            return [Opcode.SHA3]
-        elif self == ExecutionState.ADDRESS:
-            return [Opcode.ADDRESS]
-        elif self == ExecutionState.BALANCE:
-            return [Opcode.BALANCE]
-        elif self == ExecutionState.ORIGIN:
-            return [Opcode.ORIGIN]
-        elif self == ExecutionState.CALLER:
-            return [Opcode.CALLER]
-        elif self == ExecutionState.CALLVALUE:
-            return [Opcode.CALLVALUE]
-        elif self == ExecutionState.CALLDATALOAD:
-            return [Opcode.CALLDATALOAD]
-        elif self == ExecutionState.CALLDATASIZE:
-            return [Opcode.CALLDATASIZE]
-        elif self == ExecutionState.CALLDATACOPY:
-            return [Opcode.CALLDATACOPY]
-        elif self == ExecutionState.CODESIZE:
-            return [Opcode.CODESIZE]
-        elif self == ExecutionState.CODECOPY:
-            return [Opcode.CODECOPY]
-        elif self == ExecutionState.GASPRICE:
-            return [Opcode.GASPRICE]
-        elif self == ExecutionState.EXTCODESIZE:
-            return [Opcode.EXTCODESIZE]
-        elif self == ExecutionState.EXTCODECOPY:
-            return [Opcode.EXTCODECOPY]
-        elif self == ExecutionState.RETURNDATASIZE:
-            return [Opcode.RETURNDATASIZE]
-        elif self == ExecutionState.RETURNDATACOPY:
-            return [Opcode.RETURNDATACOPY]
-        elif self == ExecutionState.EXTCODEHASH:
-            return [Opcode.EXTCODEHASH]
-        elif self == ExecutionState.BLOCKHASH:
-            return [Opcode.BLOCKHASH]
-        elif self == ExecutionState.BlockCtx:
-            return [
-                Opcode.COINBASE,
-                Opcode.TIMESTAMP,
-                Opcode.NUMBER,
-                Opcode.DIFFICULTY,
-                Opcode.GASLIMIT,
-                Opcode.BASEFEE,
-                Opcode.CHAINID,
-            ]
-        elif self == ExecutionState.SELFBALANCE:
-            return [Opcode.SELFBALANCE]
-        elif self == ExecutionState.POP:
-            return [Opcode.POP]
-        elif self == ExecutionState.MEMORY:
-            return [
-                Opcode.MLOAD,
-                Opcode.MSTORE,
-                Opcode.MSTORE8,
-            ]
-        elif self == ExecutionState.SLOAD:
-            return [Opcode.SLOAD]
-        elif self == ExecutionState.SSTORE:
-            return [Opcode.SSTORE]
-        elif self == ExecutionState.JUMP:
-            return [Opcode.JUMP]
-        elif self == ExecutionState.JUMPI:
-            return [Opcode.JUMPI]
-        elif self == ExecutionState.PC:
-            return [Opcode.PC]
-        elif self == ExecutionState.MSIZE:
-            return [Opcode.MSIZE]
-        elif self == ExecutionState.GAS:
-            return [Opcode.GAS]
-        elif self == ExecutionState.JUMPDEST:
-            return [Opcode.JUMPDEST]
-        elif self == ExecutionState.PUSH:
-            return [
-                Opcode.PUSH1,
-                Opcode.PUSH2,
-                Opcode.PUSH3,
-                Opcode.PUSH4,
-                Opcode.PUSH5,
-                Opcode.PUSH6,
-                Opcode.PUSH7,
-                Opcode.PUSH8,
-                Opcode.PUSH9,
-                Opcode.PUSH10,
-                Opcode.PUSH11,
-                Opcode.PUSH12,
-                Opcode.PUSH13,
-                Opcode.PUSH14,
-                Opcode.PUSH15,
-                Opcode.PUSH16,
-                Opcode.PUSH17,
-                Opcode.PUSH18,
-                Opcode.PUSH19,
-                Opcode.PUSH20,
-                Opcode.PUSH21,
-                Opcode.PUSH22,
-                Opcode.PUSH23,
-                Opcode.PUSH24,
-                Opcode.PUSH25,
-                Opcode.PUSH26,
-                Opcode.PUSH27,
-                Opcode.PUSH28,
-                Opcode.PUSH29,
-                Opcode.PUSH30,
-                Opcode.PUSH31,
-                Opcode.PUSH32,
-            ]
-        elif self == ExecutionState.DUP:
-            return [
-                Opcode.DUP1,
-                Opcode.DUP2,
-                Opcode.DUP3,
-                Opcode.DUP4,
-                Opcode.DUP5,
-                Opcode.DUP6,
-                Opcode.DUP7,
-                Opcode.DUP8,
-                Opcode.DUP9,
-                Opcode.DUP10,
-                Opcode.DUP11,
-                Opcode.DUP12,
-                Opcode.DUP13,
-                Opcode.DUP14,
-                Opcode.DUP15,
-                Opcode.DUP16,
-            ]
-        elif self == ExecutionState.SWAP:
-            return [
-                Opcode.SWAP1,
-                Opcode.SWAP2,
-                Opcode.SWAP3,
-                Opcode.SWAP4,
-                Opcode.SWAP5,
-                Opcode.SWAP6,
-                Opcode.SWAP7,
-                Opcode.SWAP8,
-                Opcode.SWAP9,
-                Opcode.SWAP10,
-                Opcode.SWAP11,
-                Opcode.SWAP12,
-                Opcode.SWAP13,
-                Opcode.SWAP14,
-                Opcode.SWAP15,
-                Opcode.SWAP16,
-            ]
-        elif self == ExecutionState.LOG:
-            return [
-                Opcode.LOG0,
-                Opcode.LOG1,
-                Opcode.LOG2,
-                Opcode.LOG3,
-                Opcode.LOG4,
-            ]
-        elif self == ExecutionState.CREATE:
-            return [Opcode.CREATE]
-        elif self == ExecutionState.CALL:
-            return [Opcode.CALL]
-        elif self == ExecutionState.CALLCODE:
-            return [Opcode.CALLCODE]
-        elif self == ExecutionState.RETURN:
-            return [Opcode.RETURN]
-        elif self == ExecutionState.DELEGATECALL:
-            return [Opcode.DELEGATECALL]
-        elif self == ExecutionState.CREATE2:
-            return [Opcode.CREATE2]
-        elif self == ExecutionState.STATICCALL:
-            return [Opcode.STATICCALL]
-        elif self == ExecutionState.REVERT:
-            return [Opcode.REVERT]
-        elif self == ExecutionState.SELFDESTRUCT:
-            return [Opcode.SELFDESTRUCT]
-        elif self == ExecutionState.ErrorInvalidOpcode:
-            return invalid_opcodes()
-        elif self == ExecutionState.ErrorStack:
-            return stack_overflow_pairs() + stack_underflow_pairs()
-        elif self == ExecutionState.ErrorWriteProtection:
-            return state_write_opcodes()
-        return []
+        return RESPONSIBLE_OPCODES.get(self, ())
 
     def halts(self) -> bool:
-        return self.halts_in_success() or self.halts_in_exception() or self == ExecutionState.REVERT
+        return self in HALTING_STATES
 
     def halts_in_success(self) -> bool:
-        return self in [
-            ExecutionState.STOP,
-            ExecutionState.RETURN,
-            ExecutionState.SELFDESTRUCT,
-        ]
+        return self in HALTING_IN_SUCCESS_STATES
 
     def halts_in_exception(self) -> bool:
-        return self in [
-            ExecutionState.ErrorInvalidOpcode,
-            ExecutionState.ErrorStack,
-            ExecutionState.ErrorWriteProtection,
-            ExecutionState.ErrorDepth,
-            ExecutionState.ErrorInsufficientBalance,
-            ExecutionState.ErrorContractAddressCollision,
-            ExecutionState.ErrorInvalidCreationCode,
-            ExecutionState.ErrorMaxCodeSizeExceeded,
-            ExecutionState.ErrorInvalidJump,
-            ExecutionState.ErrorReturnDataOutOfBound,
-            ExecutionState.ErrorOutOfGasConstant,
-            ExecutionState.ErrorOutOfGasStaticMemoryExpansion,
-            ExecutionState.ErrorOutOfGasDynamicMemoryExpansion,
-            ExecutionState.ErrorOutOfGasMemoryCopy,
-            ExecutionState.ErrorOutOfGasAccountAccess,
-            ExecutionState.ErrorOutOfGasCodeStore,
-            ExecutionState.ErrorOutOfGasLOG,
-            ExecutionState.ErrorOutOfGasEXP,
-            ExecutionState.ErrorOutOfGasSHA3,
-            ExecutionState.ErrorOutOfGasEXTCODECOPY,
-            ExecutionState.ErrorOutOfGasSLOAD,
-            ExecutionState.ErrorOutOfGasSSTORE,
-            ExecutionState.ErrorOutOfGasCALL,
-            ExecutionState.ErrorOutOfGasCALLCODE,
-            ExecutionState.ErrorOutOfGasDELEGATECALL,
-            ExecutionState.ErrorOutOfGasCREATE2,
-            ExecutionState.ErrorOutOfGasSTATICCALL,
-            ExecutionState.ErrorOutOfGasSELFDESTRUCT,
-        ]
+        return self in HALTING_IN_EXCEPTION_STATES
+
+    def can_transit_to(self, next: ExecutionState) -> bool:
+        return next in EXECUTION_STATE_TRANSITIONS[self]
+
+
+RESPONSIBLE_OPCODES: Final[
+    Mapping[ExecutionState, Union[Tuple[int, ...], Tuple[Tuple[int, int], ...]]]
+] = MappingProxyType(
+    {
+        ExecutionState.STOP: (Opcode.STOP,),
+        ExecutionState.ADD: (Opcode.ADD, Opcode.SUB),
+        ExecutionState.MUL: (Opcode.MUL, Opcode.DIV, Opcode.MOD),
+        ExecutionState.SDIV_SMOD: (Opcode.SDIV, Opcode.SMOD),
+        ExecutionState.ADDMOD: (Opcode.ADDMOD,),
+        ExecutionState.MULMOD: (Opcode.MULMOD,),
+        ExecutionState.EXP: (Opcode.EXP,),
+        ExecutionState.SIGNEXTEND: (Opcode.SIGNEXTEND,),
+        ExecutionState.CMP: (Opcode.LT, Opcode.GT, Opcode.EQ),
+        ExecutionState.SCMP: (Opcode.SLT, Opcode.SGT),
+        ExecutionState.ISZERO: (Opcode.ISZERO,),
+        ExecutionState.BITWISE: (Opcode.AND, Opcode.OR, Opcode.XOR),
+        ExecutionState.NOT: (Opcode.NOT,),
+        ExecutionState.BYTE: (Opcode.BYTE,),
+        ExecutionState.SHL_SHR: (Opcode.SHL, Opcode.SHR),
+        ExecutionState.SAR: (Opcode.SAR,),
+        ExecutionState.SHA3: (Opcode.SHA3,),
+        ExecutionState.ADDRESS: (Opcode.ADDRESS,),
+        ExecutionState.BALANCE: (Opcode.BALANCE,),
+        ExecutionState.ORIGIN: (Opcode.ORIGIN,),
+        ExecutionState.CALLER: (Opcode.CALLER,),
+        ExecutionState.CALLVALUE: (Opcode.CALLVALUE,),
+        ExecutionState.CALLDATALOAD: (Opcode.CALLDATALOAD,),
+        ExecutionState.CALLDATASIZE: (Opcode.CALLDATASIZE,),
+        ExecutionState.CALLDATACOPY: (Opcode.CALLDATACOPY,),
+        ExecutionState.CODESIZE: (Opcode.CODESIZE,),
+        ExecutionState.CODECOPY: (Opcode.CODECOPY,),
+        ExecutionState.GASPRICE: (Opcode.GASPRICE,),
+        ExecutionState.EXTCODESIZE: (Opcode.EXTCODESIZE,),
+        ExecutionState.EXTCODECOPY: (Opcode.EXTCODECOPY,),
+        ExecutionState.RETURNDATASIZE: (Opcode.RETURNDATASIZE,),
+        ExecutionState.RETURNDATACOPY: (Opcode.RETURNDATACOPY,),
+        ExecutionState.EXTCODEHASH: (Opcode.EXTCODEHASH,),
+        ExecutionState.BLOCKHASH: (Opcode.BLOCKHASH,),
+        ExecutionState.BlockCtx: (
+            Opcode.COINBASE,
+            Opcode.TIMESTAMP,
+            Opcode.NUMBER,
+            Opcode.DIFFICULTY,
+            Opcode.GASLIMIT,
+            Opcode.BASEFEE,
+            Opcode.CHAINID,
+        ),
+        ExecutionState.SELFBALANCE: (Opcode.SELFBALANCE,),
+        ExecutionState.POP: (Opcode.POP,),
+        ExecutionState.MEMORY: (Opcode.MLOAD, Opcode.MSTORE, Opcode.MSTORE8),
+        ExecutionState.SLOAD: (Opcode.SLOAD,),
+        ExecutionState.SSTORE: (Opcode.SSTORE,),
+        ExecutionState.JUMP: (Opcode.JUMP,),
+        ExecutionState.JUMPI: (Opcode.JUMPI,),
+        ExecutionState.PC: (Opcode.PC,),
+        ExecutionState.MSIZE: (Opcode.MSIZE,),
+        ExecutionState.GAS: (Opcode.GAS,),
+        ExecutionState.JUMPDEST: (Opcode.JUMPDEST,),
+        ExecutionState.PUSH: tuple(Opcode(op) for op in range(Opcode.PUSH1, Opcode.PUSH32 + 1)),
+        ExecutionState.DUP: tuple(Opcode(op) for op in range(Opcode.DUP1, Opcode.DUP16 + 1)),
+        ExecutionState.SWAP: tuple(Opcode(op) for op in range(Opcode.SWAP1, Opcode.SWAP16 + 1)),
+        ExecutionState.LOG: tuple(Opcode(op) for op in range(Opcode.LOG0, Opcode.LOG4 + 1)),
+        ExecutionState.CREATE: (Opcode.CREATE,),
+        ExecutionState.CALL: (Opcode.CALL,),
+        ExecutionState.CALLCODE: (Opcode.CALLCODE,),
+        ExecutionState.RETURN: (Opcode.RETURN,),
+        ExecutionState.DELEGATECALL: (Opcode.DELEGATECALL,),
+        ExecutionState.CREATE2: (Opcode.CREATE2,),
+        ExecutionState.STATICCALL: (Opcode.STATICCALL,),
+        ExecutionState.REVERT: (Opcode.REVERT,),
+        ExecutionState.SELFDESTRUCT: (Opcode.SELFDESTRUCT,),
+        ExecutionState.ErrorInvalidOpcode: tuple(invalid_opcodes()),
+        ExecutionState.ErrorStack: tuple(stack_overflow_pairs()) + tuple(stack_underflow_pairs()),
+        ExecutionState.ErrorWriteProtection: tuple(state_write_opcodes()),
+    }
+)
+
+HALTING_IN_SUCCESS_STATES: Final[FrozenSet[ExecutionState]] = frozenset(
+    [
+        ExecutionState.STOP,
+        ExecutionState.RETURN,
+        ExecutionState.SELFDESTRUCT,
+    ]
+)
+
+HALTING_IN_EXCEPTION_STATES: Final[FrozenSet[ExecutionState]] = frozenset(
+    [
+        ExecutionState.ErrorInvalidOpcode,
+        ExecutionState.ErrorStack,
+        ExecutionState.ErrorWriteProtection,
+        ExecutionState.ErrorDepth,
+        ExecutionState.ErrorInsufficientBalance,
+        ExecutionState.ErrorContractAddressCollision,
+        ExecutionState.ErrorInvalidCreationCode,
+        ExecutionState.ErrorMaxCodeSizeExceeded,
+        ExecutionState.ErrorInvalidJump,
+        ExecutionState.ErrorReturnDataOutOfBound,
+        ExecutionState.ErrorOutOfGasConstant,
+        ExecutionState.ErrorOutOfGasStaticMemoryExpansion,
+        ExecutionState.ErrorOutOfGasDynamicMemoryExpansion,
+        ExecutionState.ErrorOutOfGasMemoryCopy,
+        ExecutionState.ErrorOutOfGasAccountAccess,
+        ExecutionState.ErrorOutOfGasCodeStore,
+        ExecutionState.ErrorOutOfGasLOG,
+        ExecutionState.ErrorOutOfGasEXP,
+        ExecutionState.ErrorOutOfGasSHA3,
+        ExecutionState.ErrorOutOfGasEXTCODECOPY,
+        ExecutionState.ErrorOutOfGasSLOAD,
+        ExecutionState.ErrorOutOfGasSSTORE,
+        ExecutionState.ErrorOutOfGasCALL,
+        ExecutionState.ErrorOutOfGasCALLCODE,
+        ExecutionState.ErrorOutOfGasDELEGATECALL,
+        ExecutionState.ErrorOutOfGasCREATE2,
+        ExecutionState.ErrorOutOfGasSTATICCALL,
+        ExecutionState.ErrorOutOfGasSELFDESTRUCT,
+    ]
+)
+
+HALTING_STATES: Final[FrozenSet[ExecutionState]] = (
+    HALTING_IN_SUCCESS_STATES | HALTING_IN_EXCEPTION_STATES | {ExecutionState.REVERT}
+)
+
+# Opcode -> ExecutionState which handles its successful case
+OPCODE_EXECUTION_STATE: Final[Mapping[int, ExecutionState]] = MappingProxyType(
+    {
+        opcode: execution_state
+        for execution_state, opcodes in RESPONSIBLE_OPCODES.items()
+        if execution_state not in HALTING_IN_EXCEPTION_STATES
+        for opcode in opcodes
+        if isinstance(opcode, int)
+    }
+)
+
+
+def _is_valid_transition(curr: ExecutionState, next: ExecutionState) -> bool:
+    # ExecutionState transition constraint for special ones
+    if curr == ExecutionState.EndTx and next not in [
+        ExecutionState.BeginTx,
+        ExecutionState.EndBlock,
+    ]:
+        return False
+    if curr == ExecutionState.EndBlock and next != ExecutionState.EndBlock:
+        return False
+
+    # Negation ExecutionState transition constraint for rest ones
+    if next == ExecutionState.BeginTx:
+        return curr == ExecutionState.EndTx
+    if next == ExecutionState.EndTx:
+        return curr in HALTING_STATES or curr == ExecutionState.BeginTx
+    if next == ExecutionState.EndBlock:
+        return curr in [ExecutionState.EndTx, ExecutionState.EndBlock]
+    return True
+
+
+# ExecutionState -> all ExecutionStates allowed in the next step
+EXECUTION_STATE_TRANSITIONS: Final[Mapping[ExecutionState, FrozenSet[ExecutionState]]] = (
+    MappingProxyType(
+        {
+            curr: frozenset(next for next in ExecutionState if _is_valid_transition(curr, next))
+            for curr in ExecutionState
+        }
+    )
+)
@@ -3,6 +3,7 @@ from enum import IntEnum, auto
 from typing import Optional, Sequence, Tuple, Union
 
 from ..util import (
+    ConstraintUnsatFailure,
     FQ,
     IntOrFQ,
     RLC,
@@ -17,7 +18,6 @@ from ..util import (
     MEMORY_EXPANSION_QUAD_DENOMINATOR,
     MEMORY_EXPANSION_LINEAR_COEFF,
 )
-from .execution_state import ExecutionState
 from .opcode import Opcode
 from .step import StepState
 from .table import (
@@ -38,11 +38,6 @@ from .table import (
 )
 
 
-class ConstraintUnsatFailure(Exception):
-    def __init__(self, message: str) -> None:
-        self.message = message
-
-
 class TransitionKind(IntEnum):
     Same = auto()
     Delta = auto()
@@ -124,17 +119,20 @@ class Instruction:
         self.is_last_step = is_last_step
 
     def constrain_zero(self, value: Expression):
-        assert value.expr() == 0, ConstraintUnsatFailure(f"Expected value to be 0, but got {value}")
+        if value.expr() != 0:
+            raise AssertionError(ConstraintUnsatFailure(f"Expected value to be 0, but got {value}"))
 
     def constrain_equal(self, lhs: Expression, rhs: Expression):
-        assert lhs.expr() == rhs.expr(), ConstraintUnsatFailure(
-            f"Expected values to be equal, but got {lhs} and {rhs}"
-        )
+        if lhs.expr() != rhs.expr():
+            raise AssertionError(
+                ConstraintUnsatFailure(f"Expected values to be equal, but got {lhs} and {rhs}")
+            )
 
     def constrain_bool(self, num: Expression):
-        assert num.expr() in [0, 1], ConstraintUnsatFailure(
-            f"Expected value to be a bool, but got {num}"
-        )
+        if num.expr() not in [0, 1]:
+            raise AssertionError(
+                ConstraintUnsatFailure(f"Expected value to be a bool, but got {num}")
+            )
 
     def constrain_gas_left_not_underflow(self, gas_left: Expression):
         self.range_check(gas_left, N_BYTES_GAS)
@@ -142,19 +140,12 @@ class Instruction:
     def constrain_execution_state_transition(self):
         curr, next = self.curr.execution_state, self.next.execution_state
 
-        # ExecutionState transition constraint for special ones
-        if curr == ExecutionState.EndTx:
-            assert next in [ExecutionState.BeginTx, ExecutionState.EndBlock]
-        elif curr == ExecutionState.EndBlock:
-            assert next == ExecutionState.EndBlock
-
-        # Negation ExecutionState transition constraint for rest ones
-        if next == ExecutionState.BeginTx:
-            assert curr == ExecutionState.EndTx
-        elif next == ExecutionState.EndTx:
-            assert curr.halts() or curr == ExecutionState.BeginTx
-        elif next == ExecutionState.EndBlock:
-            assert curr in [ExecutionState.EndTx, ExecutionState.EndBlock]
+        if not curr.can_transit_to(next):
+            raise AssertionError(
+                ConstraintUnsatFailure(
+                    f"Invalid ExecutionState transition from {curr.name} to {next.name}"
+                )
+            )
 
     def constrain_step_state_transition(self, **kwargs: Transition):
         keys = set(
@@ -184,21 +175,30 @@ class Instruction:
             if isinstance(next, int):
                 next = FQ(next)
             if transition.kind == TransitionKind.Same:
-                assert next.expr() == curr.expr(), ConstraintUnsatFailure(
-                    f"State {key} should be same as {curr}, but got {next}"
-                )
+                if next.expr() != curr.expr():
+                    raise AssertionError(
+                        ConstraintUnsatFailure(
+                            f"State {key} should be same as {curr}, but got {next}"
+                        )
+                    )
             elif transition.kind == TransitionKind.Delta:
                 if isinstance(transition.value, int):
                     transition.value = FQ(transition.value)
-                assert next.expr() == curr.expr() + transition.value.expr(), ConstraintUnsatFailure(
-                    f"State {key} should transit to {curr} + {transition.value} ({curr + transition.value}), but got {next}"
-                )
+                if next.expr() != curr.expr() + transition.value.expr():
+                    raise AssertionError(
+                        ConstraintUnsatFailure(
+                            f"State {key} should transit to {curr} + {transition.value} ({curr + transition.value}), but got {next}"
+                        )
+                    )
             elif transition.kind == TransitionKind.To:
                 if isinstance(transition.value, int):
                     transition.value = FQ(transition.value)
-                assert next.expr() == transition.value.expr(), ConstraintUnsatFailure(
-                    f"State {key} should transit to {transition.value}, but got {next}"
-                )
+                if next.expr() != transition.value.expr():
+                    raise AssertionError(
+                        ConstraintUnsatFailure(
+                            f"State {key} should transit to {transition.value}, but got {next}"
+                        )
+                    )
             else:
                 raise ValueError("Unreacheable")
 
@@ -347,7 +347,8 @@ class Instruction:
     def select(
         self, condition: FQ, when_true: ExpressionImpl, when_false: ExpressionImpl
     ) -> ExpressionImpl:
-        assert condition in [0, 1], "Condition of select should be a checked bool"
+        if condition not in [0, 1]:
+            raise AssertionError("Condition of select should be a checked bool")
         return when_true if condition == 1 else when_false
 
     def pair_select(self, value: Expression, lhs: Expression, rhs: Expression) -> Tuple[FQ, FQ]:
@@ -362,8 +363,10 @@ class Instruction:
 
     def compare(self, lhs: Expression, rhs: Expression, n_bytes: int) -> Tuple[FQ, FQ]:
         assert n_bytes <= MAX_N_BYTES, "Too many bytes to composite an integer in field"
-        assert lhs.expr().n < 256**n_bytes, f"lhs {lhs} exceeds the range of {n_bytes} bytes"
-        assert rhs.expr().n < 256**n_bytes, f"rhs {rhs} exceeds the range of {n_bytes} bytes"
+        if lhs.expr().n >= 256**n_bytes:
+            raise AssertionError(f"lhs {lhs} exceeds the range of {n_bytes} bytes")
+        if rhs.expr().n >= 256**n_bytes:
+            raise AssertionError(f"rhs {rhs} exceeds the range of {n_bytes} bytes")
         return FQ(lhs.expr().n < rhs.expr().n), FQ(lhs.expr().n == rhs.expr().n)
 
     def compare_word(self, lhs: RLC, rhs: RLC) -> Tuple[FQ, FQ]:
@@ -0,0 +1,435 @@
+from __future__ import annotations
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+from ..util import (
+    COLD_SLOAD_COST,
+    EXTRA_GAS_COST_ACCOUNT_COLD_ACCESS,
+    FQ,
+    GAS_COST_COPY,
+    GAS_COST_COPY_SHA3,
+    GAS_COST_LOG,
+    GAS_COST_LOGDATA,
+    GAS_COST_SLOW,
+    GAS_COST_TX,
+    MEMORY_EXPANSION_LINEAR_COEFF,
+    MEMORY_EXPANSION_QUAD_DENOMINATOR,
+    SLOAD_GAS,
+    SSTORE_RESET_GAS,
+    SSTORE_SET_GAS,
+    WARM_STORAGE_READ_COST,
+    keccak256,
+)
+from .opcode import Opcode, VALID_OPCODE_SET
+from .step import StepState
+from .table import Tables
+from .trace import StructLog, TraceWitnessBuilder, WorldState
+from .typing import Account, Block, Bytecode, Transaction
+
+WORD_MOD = 1 << 256
+
+# Gas cost of EXP per byte of the exponent
+GAS_COST_EXP_BYTE = 50
+
+
+def _signed(value: int) -> int:
+    return value - WORD_MOD if value >> 255 else value
+
+
+def _sdiv(a: int, b: int) -> int:
+    a, b = _signed(a), _signed(b)
+    if b == 0:
+        return 0
+    quotient = abs(a) // abs(b)
+    return (-quotient if (a < 0) != (b < 0) else quotient) % WORD_MOD
+
+
+def _smod(a: int, b: int) -> int:
+    a, b = _signed(a), _signed(b)
+    if b == 0:
+        return 0
+    remainder = abs(a) % abs(b)
+    return (-remainder if a < 0 else remainder) % WORD_MOD
+
+
+def _signextend(b: int, x: int) -> int:
+    if b >= 31:
+        return x
+    sign_bit = b * 8 + 7
+    mask = (1 << (sign_bit + 1)) - 1
+    return x | (WORD_MOD - 1 - mask) if (x >> sign_bit) & 1 else x & mask
+
+
+# Opcode -> result of popping its operands (top of the stack first) and then
+# pushing the result, for opcodes which only touch the stack
+STACK_OPERATIONS: Dict[Opcode, Callable[..., int]] = {
+    Opcode.ADD: lambda a, b: (a + b) % WORD_MOD,
+    Opcode.MUL: lambda a, b: (a * b) % WORD_MOD,
+    Opcode.SUB: lambda a, b: (a - b) % WORD_MOD,
+    Opcode.DIV: lambda a, b: a // b if b != 0 else 0,
+    Opcode.SDIV: _sdiv,
+    Opcode.MOD: lambda a, b: a % b if b != 0 else 0,
+    Opcode.SMOD: _smod,
+    Opcode.ADDMOD: lambda a, b, n: (a + b) % n if n != 0 else 0,
+    Opcode.MULMOD: lambda a, b, n: (a * b) % n if n != 0 else 0,
+    Opcode.EXP: lambda a, b: pow(a, b, WORD_MOD),
+    Opcode.SIGNEXTEND: _signextend,
+    Opcode.LT: lambda a, b: int(a < b),
+    Opcode.GT: lambda a, b: int(a > b),
+    Opcode.SLT: lambda a, b: int(_signed(a) < _signed(b)),
+    Opcode.SGT: lambda a, b: int(_signed(a) > _signed(b)),
+    Opcode.EQ: lambda a, b: int(a == b),
+    Opcode.ISZERO: lambda a: int(a == 0),
+    Opcode.AND: lambda a, b: a & b,
+    Opcode.OR: lambda a, b: a | b,
+    Opcode.XOR: lambda a, b: a ^ b,
+    Opcode.NOT: lambda a: a ^ (WORD_MOD - 1),
+    Opcode.BYTE: lambda i, x: (x >> (248 - i * 8)) & 0xFF if i < 32 else 0,
+    Opcode.SHL: lambda shift, x: (x << shift) % WORD_MOD if shift < 256 else 0,
+    Opcode.SHR: lambda shift, x: x >> shift,
+    Opcode.SAR: lambda shift, x: (_signed(x) >> shift) % WORD_MOD,
+}
+
+
+def memory_gas_cost(memory_size: int) -> int:
+    return (
+        memory_size * MEMORY_EXPANSION_LINEAR_COEFF
+        + memory_size * memory_size // MEMORY_EXPANSION_QUAD_DENOMINATOR
+    )
+
+
+def sstore_gas_cost(original_value: int, value_prev: int, value: int, is_warm: bool) -> int:
+    if value_prev == value or original_value != value_prev:
+        gas_cost = SLOAD_GAS
+    else:
+        gas_cost = SSTORE_SET_GAS if original_value == 0 else SSTORE_RESET_GAS
+    return gas_cost if is_warm else gas_cost + COLD_SLOAD_COST
+
+
+class Interpreter:
+    """
+    Reference interpreter which executes the root call of a transaction against
+    block and account fixtures, to generate valid witnesses of any size.
+
+    The execution is emitted as StructLogs and witnessed by a
+    TraceWitnessBuilder, so the steps, rw rows, copy rows and keccak entries
+    are the same as the ones built from a geth trace of the same call.
+    Opcodes which halt in exception, call or create other contracts, or need
+    a gadget the builder can't witness raise NotImplementedError. The
+    BeginTx, EndTx and EndBlock steps around the call aren't generated.
+    """
+
+    randomness: FQ
+    bytecode: Bytecode
+    tx: Transaction
+    block: Block
+    accounts: Dict[int, Account]
+    builder: TraceWitnessBuilder
+
+    gas_left: int
+    program_counter: int
+    stack: List[int]
+    memory: bytearray
+    memory_size: int
+    world_state: WorldState
+    return_data: bytes
+
+    def __init__(
+        self,
+        randomness: FQ,
+        bytecode: Bytecode,
+        tx: Optional[Transaction] = None,
+        block: Optional[Block] = None,
+        accounts: Sequence[Account] = (),
+        gas: Optional[int] = None,
+    ) -> None:
+        self.randomness = randomness
+        self.bytecode = bytecode
+        self.tx = Transaction() if tx is None else tx
+        self.block = Block() if block is None else block
+        self.builder = TraceWitnessBuilder(randomness, bytecode, self.tx, accounts=accounts)
+
+        if gas is None:
+            gas = self.tx.gas - GAS_COST_TX - self.tx.call_data_gas_cost()
+            if gas < 0:
+                raise ValueError("Transaction gas is less than its intrinsic gas")
+        self.gas_left = gas
+        self.program_counter = 0
+        self.stack = []
+        self.memory = bytearray()
+        self.memory_size = 0
+        self.world_state = WorldState(accounts, self.tx)
+        self.return_data = b""
+
+    @property
+    def callee_address(self) -> int:
+        return self.tx.callee_address or 0
+
+    def run(self) -> List[StepState]:
+        """
+        Execute the bytecode until it halts and return the witnessed steps.
+        """
+        return list(self.builder.build_steps(self.struct_logs()))
+
+    def tables(self) -> Tables:
+        return self.builder.tables(self.block)
+
+    def struct_logs(self) -> Iterator[StructLog]:
+        """
+        Lazily execute the bytecode, yielding the StructLog of each step.
+        """
+        code = self.bytecode.code
+        while True:
+            pc = self.program_counter
+            opcode_byte = code[pc] if pc < len(code) else Opcode.STOP
+            if opcode_byte not in VALID_OPCODE_SET:
+                raise NotImplementedError(f"Invalid opcode 0x{opcode_byte:02x} at pc {pc}")
+            opcode = Opcode(opcode_byte)
+
+            stack_pointer = 1024 - len(self.stack)
+            if stack_pointer > opcode.max_stack_pointer():
+                raise NotImplementedError(f"Stack underflow of {opcode.name} at pc {pc}")
+            if stack_pointer < opcode.min_stack_pointer():
+                raise NotImplementedError(f"Stack overflow of {opcode.name} at pc {pc}")
+
+            gas_cost = opcode.constant_gas_cost() + self._dynamic_gas_cost(opcode)
+            if gas_cost > self.gas_left:
+                raise NotImplementedError(f"Out of gas of {opcode.name} at pc {pc}")
+
+            yield StructLog(pc, opcode, self.gas_left, gas_cost, 1, list(self.stack))
+            if opcode == Opcode.STOP:
+                return
+
+            self.gas_left -= gas_cost
+            self._execute(opcode)
+            if opcode == Opcode.RETURN:
+                return
+
+    def _peek(self, n: int) -> List[int]:
+        return [self.stack[-1 - idx] for idx in range(n)]
+
+    def _pop(self, n: int) -> List[int]:
+        values = self._peek(n)
+        del self.stack[len(self.stack) - n :]
+        return values
+
+    def _push(self, value: int):
+        self.stack.append(value % WORD_MOD)
+
+    def _memory_expansion(self, offset: int, length: int) -> int:
+        """
+        Returns the memory size in words after accessing length bytes at offset.
+        """
+        if length == 0:
+            return self.memory_size
+        return max(self.memory_size, (offset + length + 31) // 32)
+
+    def _memory_expansion_gas_cost(self, offset: int, length: int) -> int:
+        next_memory_size = self._memory_expansion(offset, length)
+        return memory_gas_cost(next_memory_size) - memory_gas_cost(self.memory_size)
+
+    def _dynamic_gas_cost(self, opcode: Opcode) -> int:
+        if opcode == Opcode.EXP:
+            _, exponent = self._peek(2)
+            return GAS_COST_SLOW + GAS_COST_EXP_BYTE * ((exponent.bit_length() + 7) // 8)
+        if opcode == Opcode.SHA3:
+            offset, length = self._peek(2)
+            return GAS_COST_COPY_SHA3 * ((length + 31) // 32) + self._memory_expansion_gas_cost(
+                offset, length
+            )
+        if opcode in [Opcode.CALLDATACOPY, Opcode.CODECOPY]:
+            memory_offset, _, length = self._peek(3)
+            return GAS_COST_COPY * ((length + 31) // 32) + self._memory_expansion_gas_cost(
+                memory_offset, length
+            )
+        if opcode == Opcode.EXTCODECOPY:
+            address, memory_offset, _, length = self._peek(4)
+            gas_cost = GAS_COST_COPY * ((length + 31) // 32) + self._memory_expansion_gas_cost(
+                memory_offset, length
+            )
+            if address not in self.world_state.accessed_addresses:
+                gas_cost += EXTRA_GAS_COST_ACCOUNT_COLD_ACCESS
+            return gas_cost
+        if Opcode.LOG0 <= opcode <= Opcode.LOG4:
+            offset, length = self._peek(2)
+            return (
+                GAS_COST_LOG * (1 + opcode - Opcode.LOG0)
+                + GAS_COST_LOGDATA * length
+                + self._memory_expansion_gas_cost(offset, length)
+            )
+        if opcode == Opcode.RETURN:
+            offset, length = self._peek(2)
+            return self._memory_expansion_gas_cost(offset, length)
+        if opcode in [Opcode.MLOAD, Opcode.MSTORE]:
+            (offset,) = self._peek(1)
+            return self._memory_expansion_gas_cost(offset, 32)
+        if opcode == Opcode.MSTORE8:
+            (offset,) = self._peek(1)
+            return self._memory_expansion_gas_cost(offset, 1)
+        world_state = self.world_state
+        if opcode == Opcode.SLOAD:
+            (key,) = self._peek(1)
+            is_warm = (self.callee_address, key) in world_state.accessed_storage_keys
+            return WARM_STORAGE_READ_COST if is_warm else COLD_SLOAD_COST
+        if opcode == Opcode.SSTORE:
+            key, value = self._peek(2)
+            return sstore_gas_cost(
+                world_state.committed_storage(self.callee_address, key),
+                world_state.current_storage(self.callee_address, key),
+                value,
+                (self.callee_address, key) in world_state.accessed_storage_keys,
+            )
+        if opcode == Opcode.EXTCODEHASH:
+            (address,) = self._peek(1)
+            is_warm = address in world_state.accessed_addresses
+            return 0 if is_warm else EXTRA_GAS_COST_ACCOUNT_COLD_ACCESS
+        if opcode.has_dynamic_gas():
+            raise NotImplementedError(f"Dynamic gas of {opcode.name} is not supported")
+        return 0
+
+    def _expand_memory(self, offset: int, length: int):
+        self.memory_size = self._memory_expansion(offset, length)
+        if len(self.memory) < self.memory_size * 32:
+            self.memory.extend(bytes(self.memory_size * 32 - len(self.memory)))
+
+    def _write_memory(self, offset: int, data: bytes):
+        self._expand_memory(offset, len(data))
+        self.memory[offset : offset + len(data)] = data
+
+    def _read_memory(self, offset: int, length: int) -> bytes:
+        self._expand_memory(offset, length)
+        return bytes(self.memory[offset : offset + length])
+
+    def _jump(self, dest: int):
+        code = self.bytecode.code
+        if dest >= len(code) or code[dest] != Opcode.JUMPDEST or not self.bytecode.is_code[dest]:
+            raise NotImplementedError(f"Invalid jump destination {dest}")
+        self.program_counter = dest
+
+    def _execute(self, opcode: Opcode):
+        code = self.bytecode.code
+        tx, block, world_state = self.tx, self.block, self.world_state
+        next_pc = self.program_counter + 1
+
+        if opcode in STACK_OPERATIONS:
+            n_pops = 1024 - opcode.max_stack_pointer()
+            self._push(STACK_OPERATIONS[opcode](*self._pop(n_pops)))
+        elif opcode.is_push():
+            n_bytes = opcode - Opcode.PUSH1 + 1
+            data = bytes(code[next_pc : next_pc + n_bytes])
+            self._push(int.from_bytes(data.ljust(n_bytes, b"\x00"), "big"))
+            next_pc += n_bytes
+        elif opcode.is_dup():
+            self._push(self.stack[-(opcode - Opcode.DUP1 + 1)])
+        elif opcode.is_swap():
+            x = opcode - Opcode.SWAP1 + 1
+            self.stack[-1], self.stack[-1 - x] = self.stack[-1 - x], self.stack[-1]
+        elif opcode == Opcode.POP:
+            self._pop(1)
+        elif opcode == Opcode.JUMPDEST:
+            pass
+        elif opcode == Opcode.JUMP:
+            (dest,) = self._pop(1)
+            self._jump(dest)
+            return
+        elif opcode == Opcode.JUMPI:
+            dest, condition = self._pop(2)
+            if condition != 0:
+                self._jump(dest)
+                return
+        elif opcode == Opcode.PC:
+            self._push(self.program_counter)
+        elif opcode == Opcode.MSIZE:
+            self._push(self.memory_size * 32)
+        elif opcode == Opcode.GAS:
+            self._push(self.gas_left)
+        elif opcode == Opcode.ADDRESS:
+            self._push(self.callee_address)
+        elif opcode in [Opcode.ORIGIN, Opcode.CALLER]:
+            self._push(tx.caller_address)
+        elif opcode == Opcode.CALLVALUE:
+            self._push(tx.value)
+        elif opcode == Opcode.GASPRICE:
+            self._push(tx.gas_price)
+        elif opcode == Opcode.CALLDATASIZE:
+            self._push(len(tx.call_data))
+        elif opcode == Opcode.CALLDATALOAD:
+            (offset,) = self._pop(1)
+            data = tx.call_data[offset : offset + 32] if offset < len(tx.call_data) else b""
+            self._push(int.from_bytes(data.ljust(32, b"\x00"), "big"))
+        elif opcode in [Opcode.CALLDATACOPY, Opcode.CODECOPY, Opcode.EXTCODECOPY]:
+            if opcode == Opcode.EXTCODECOPY:
+                (address,) = self._pop(1)
+                world_state.access_address(address)
+                src = bytes(world_state.account(address).code.code)
+            else:
+                src = tx.call_data if opcode == Opcode.CALLDATACOPY else bytes(code)
+            memory_offset, data_offset, length = self._pop(3)
+            data = src[data_offset : data_offset + length] if data_offset < len(src) else b""
+            if length > 0:
+                self._write_memory(memory_offset, data.ljust(length, b"\x00"))
+        elif opcode == Opcode.CODESIZE:
+            self._push(len(code))
+        elif opcode == Opcode.RETURNDATASIZE:
+            # The root call hasn't called any other contract
+            self._push(0)
+        elif opcode == Opcode.SELFBALANCE:
+            self._push(world_state.account(self.callee_address).balance)
+        elif opcode == Opcode.BLOCKHASH:
+            (number,) = self._pop(1)
+            depth = block.number - number
+            if 0 < depth <= len(block.history_hashes):
+                self._push(block.history_hashes[-depth])
+            else:
+                self._push(0)
+        elif opcode == Opcode.COINBASE:
+            self._push(block.coinbase)
+        elif opcode == Opcode.TIMESTAMP:
+            self._push(block.timestamp)
+        elif opcode == Opcode.NUMBER:
+            self._push(block.number)
+        elif opcode == Opcode.DIFFICULTY:
+            self._push(block.difficulty)
+        elif opcode == Opcode.GASLIMIT:
+            self._push(block.gas_limit)
+        elif opcode == Opcode.CHAINID:
+            self._push(block.chainid)
+        elif opcode == Opcode.BASEFEE:
+            self._push(block.base_fee)
+        elif opcode == Opcode.SHA3:
+            offset, length = self._pop(2)
+            data = self._read_memory(offset, length) if length > 0 else b""
+            self._push(int.from_bytes(keccak256(data), "big"))
+        elif opcode == Opcode.MLOAD:
+            (offset,) = self._pop(1)
+            self._push(int.from_bytes(self._read_memory(offset, 32), "big"))
+        elif opcode == Opcode.MSTORE:
+            offset, value = self._pop(2)
+            self._write_memory(offset, value.to_bytes(32, "big"))
+        elif opcode == Opcode.MSTORE8:
+            offset, value = self._pop(2)
+            self._write_memory(offset, bytes([value & 0xFF]))
+        elif opcode == Opcode.SLOAD:
+            (key,) = self._pop(1)
+            world_state.access_storage_key(self.callee_address, key)
+            self._push(world_state.current_storage(self.callee_address, key))
+        elif opcode == Opcode.SSTORE:
+            key, value = self._pop(2)
+            world_state.access_storage_key(self.callee_address, key)
+            world_state.write_storage(self.callee_address, key, value)
+        elif opcode == Opcode.EXTCODEHASH:
+            (address,) = self._pop(1)
+            world_state.access_address(address)
+            account = world_state.account(address)
+            self._push(0 if account.is_empty() else account.code_hash())
+        elif Opcode.LOG0 <= opcode <= Opcode.LOG4:
+            offset, length = self._pop(2)
+            self._pop(opcode - Opcode.LOG0)
+            if length > 0:
+                self._read_memory(offset, length)
+        elif opcode == Opcode.RETURN:
+            offset, length = self._pop(2)
+            self.return_data = self._read_memory(offset, length) if length > 0 else b""
+        else:
+            raise NotImplementedError(f"Execution of {opcode.name} is not supported")
+
+        self.program_counter = next_pc
@@ -1,37 +1,132 @@
-from typing import List
+from typing import Iterable, Iterator, Optional
+import hashlib
 
-from ..util import FQ
+from ..util import FQ, FailureReport
+from .checkpoint import VerificationCheckpoint, encode_step, inputs_digest
 from .execution import EXECUTION_STATE_IMPL
 from .execution_state import ExecutionState
 from .instruction import Instruction
 from .step import StepState
 from .table import Tables
 
-
 DUMMY_STEP_STATE = StepState(ExecutionState.EndBlock, rw_counter=-1)
 
 
 def verify_steps(
     randomness: FQ,
     tables: Tables,
-    steps: List[StepState],
+    steps: Iterable[StepState],
     begin_with_first_step: bool = False,
     end_with_last_step: bool = False,
+    checkpoint: Optional[VerificationCheckpoint] = None,
+    report: Optional[FailureReport] = None,
 ):
-    if end_with_last_step:
-        steps.append(DUMMY_STEP_STATE)
+    for _ in iter_verify_steps(
+        randomness, tables, steps, begin_with_first_step, end_with_last_step, checkpoint, report
+    ):
+        pass
+
+
+def iter_verify_steps(
+    randomness: FQ,
+    tables: Tables,
+    steps: Iterable[StepState],
+    begin_with_first_step: bool = False,
+    end_with_last_step: bool = False,
+    checkpoint: Optional[VerificationCheckpoint] = None,
+    report: Optional[FailureReport] = None,
+) -> Iterator[int]:
+    """
+    Verify steps lazily and yield the index of each verified step, so steps
+    can be streamed from a witness generator.
+    With a checkpoint, steps verified by a previous run over the same inputs
+    are skipped and the progress is persisted while verifying.
+    With a report, failures are recorded in it instead of raised, and
+    verification stops once its failure budget is exhausted. Progress after
+    the first failure isn't checkpointed.
+    """
+    digest, resume_from, resume_steps_digest = "", 0, None
+    if checkpoint is not None:
+        digest = inputs_digest(randomness, tables)
+        resume_from, resume_steps_digest = checkpoint.load(digest)
 
-    for idx, (curr, next) in enumerate(zip(steps, steps[1:])):
-        verify_step(
-            Instruction(
+    # Running digest of the verified steps. The checkpointed digest also
+    # covers the next step of the last verified one, since the transition
+    # into it was verified too.
+    hasher = hashlib.sha256()
+    n_processed = 0
+
+    iterator = iter(steps)
+    first_step: Optional[StepState] = next(iterator, None)
+    if first_step is None:
+        if resume_from > 0:
+            raise ValueError(f"Steps end before checkpointed step {resume_from}")
+        return
+    curr: StepState = first_step
+    encoded_curr, encoded_next = encode_step(curr), b""
+    idx = 0
+    while True:
+        lookahead = next(iterator, None)
+        is_last_step = lookahead is None
+        if lookahead is not None:
+            next_step = lookahead
+        elif end_with_last_step:
+            next_step = DUMMY_STEP_STATE
+        else:
+            break
+
+        encoded_next = encode_step(next_step)
+        hasher.update(encoded_curr)
+        n_processed = idx + 1
+        if idx < resume_from:
+            if (
+                idx + 1 == resume_from
+                and _steps_digest(hasher, encoded_next) != resume_steps_digest
+            ):
+                raise ValueError(f"Steps up to checkpointed step {resume_from} have changed")
+        else:
+            instruction = Instruction(
                 randomness=randomness,
                 tables=tables,
                 curr=curr,
-                next=next,
+                next=next_step,
                 is_first_step=begin_with_first_step and idx == 0,
-                is_last_step=end_with_last_step and idx == len(steps) - 2,
+                is_last_step=end_with_last_step and is_last_step,
             )
-        )
+            if report is None:
+                verify_step(instruction)
+            else:
+                report.check(idx, curr.execution_state.name, verify_step, instruction)
+            if (
+                checkpoint is not None
+                and n_processed % checkpoint.interval == 0
+                and (report is None or report.ok())
+            ):
+                checkpoint.save(digest, n_processed, _steps_digest(hasher, encoded_next))
+            yield idx
+            if report is not None and report.exhausted():
+                return
+
+        if is_last_step:
+            break
+        curr, encoded_curr, idx = next_step, encoded_next, idx + 1
+
+    # The checkpointed steps digest is only compared once the checkpointed
+    # step is reached, so fewer steps than checkpointed would verify nothing.
+    if n_processed < resume_from:
+        raise ValueError(f"Steps end before checkpointed step {resume_from}")
+
+    if checkpoint is not None and n_processed > resume_from and (report is None or report.ok()):
+        checkpoint.save(digest, n_processed, _steps_digest(hasher, encoded_next))
+
+
+def _steps_digest(hasher, encoded_next: bytes) -> str:
+    """
+    Returns the digest of the steps hashed by hasher followed by the next step.
+    """
+    hasher = hasher.copy()
+    hasher.update(encoded_next)
+    return hasher.hexdigest()
 
 
 def verify_step(instruction: Instruction):
@@ -1,5 +1,6 @@
 from enum import IntEnum
-from typing import Final, Dict, Tuple, List
+from types import MappingProxyType
+from typing import Final, Dict, FrozenSet, Mapping, Sequence, Tuple
 
 from ..util import FQ
 from ..util.param import *
@@ -351,76 +352,100 @@ OPCODE_INFO_MAP: Final[Dict[Opcode, OpcodeInfo]] = dict(
 )
 
 
-def valid_opcodes() -> List[Opcode]:
-    return list(Opcode)
+VALID_OPCODES: Final[Tuple[Opcode, ...]] = tuple(Opcode)
+VALID_OPCODE_SET: Final[FrozenSet[int]] = frozenset(VALID_OPCODES)
+INVALID_OPCODES: Final[Tuple[int, ...]] = tuple(
+    opcode for opcode in range(256) if opcode not in VALID_OPCODE_SET
+)
+# Byte -> number of bytes pushed, only PUSH1 to PUSH32 have an entry
+PUSH_SIZE_MAP: Final[Mapping[int, int]] = MappingProxyType(
+    {opcode: opcode - Opcode.PUSH1 + 1 for opcode in range(Opcode.PUSH1, Opcode.PUSH32 + 1)}
+)
+STACK_OVERFLOW_PAIRS: Final[Tuple[Tuple[Opcode, int], ...]] = tuple(
+    (opcode, stack_pointer)
+    for opcode in VALID_OPCODES
+    if opcode.min_stack_pointer() > 0
+    for stack_pointer in range(opcode.min_stack_pointer())
+)
+STACK_UNDERFLOW_PAIRS: Final[Tuple[Tuple[Opcode, int], ...]] = tuple(
+    (opcode, stack_pointer + 1)
+    for opcode in VALID_OPCODES
+    if opcode.max_stack_pointer() < 1024
+    for stack_pointer in range(opcode.max_stack_pointer(), 1024)
+)
+CONSTANT_GAS_COST_PAIRS: Final[Tuple[Tuple[Opcode, int], ...]] = tuple(
+    (opcode, opcode.constant_gas_cost())
+    for opcode in VALID_OPCODES
+    if not opcode.has_dynamic_gas() and opcode.constant_gas_cost() > 0
+)
+STATE_WRITE_OPCODES: Final[Tuple[Opcode, ...]] = (
+    Opcode.SSTORE,
+    Opcode.LOG0,
+    Opcode.LOG1,
+    Opcode.LOG2,
+    Opcode.LOG3,
+    Opcode.LOG4,
+    Opcode.CREATE,
+    Opcode.CALL,
+    Opcode.CREATE2,
+    Opcode.SELFDESTRUCT,
+)
+CALL_OPCODES: Final[Tuple[Opcode, ...]] = (
+    Opcode.CALL,
+    Opcode.CALLCODE,
+    Opcode.DELEGATECALL,
+    Opcode.STATICCALL,
+)
+ETHER_TRANSFER_OPCODES: Final[Tuple[Opcode, ...]] = (Opcode.CALL, Opcode.CALLCODE)
+CREATE_OPCODES: Final[Tuple[Opcode, ...]] = (Opcode.CREATE, Opcode.CREATE2)
+JUMP_OPCODES: Final[Tuple[Opcode, ...]] = (Opcode.JUMP, Opcode.JUMPI)
+
+
+def valid_opcodes() -> Sequence[Opcode]:
+    return VALID_OPCODES
 
 
-def invalid_opcodes() -> List[int]:
-    return [opcode for opcode in range(256) if opcode not in valid_opcodes()]
+def invalid_opcodes() -> Sequence[int]:
+    return INVALID_OPCODES
 
 
-def stack_overflow_pairs() -> List[Tuple[Opcode, int]]:
-    pairs = []
-    for opcode in valid_opcodes():
-        if opcode.min_stack_pointer() > 0:
-            for stack_pointer in range(opcode.min_stack_pointer()):
-                pairs.append((opcode, stack_pointer))
-    return pairs
+def stack_overflow_pairs() -> Sequence[Tuple[Opcode, int]]:
+    return STACK_OVERFLOW_PAIRS
 
 
-def stack_underflow_pairs() -> List[Tuple[Opcode, int]]:
-    pairs = []
-    for opcode in valid_opcodes():
-        if opcode.max_stack_pointer() < 1024:
-            for stack_pointer in range(opcode.max_stack_pointer(), 1024):
-                pairs.append((opcode, stack_pointer + 1))
-    return pairs
+def stack_underflow_pairs() -> Sequence[Tuple[Opcode, int]]:
+    return STACK_UNDERFLOW_PAIRS
 
 
-def constant_gas_cost_pairs() -> List[Tuple[Opcode, int]]:
-    pairs = []
-    for opcode in valid_opcodes():
-        if not opcode.has_dynamic_gas() and opcode.constant_gas_cost() > 0:
-            pairs.append((opcode, opcode.constant_gas_cost()))
-    return pairs
+def constant_gas_cost_pairs() -> Sequence[Tuple[Opcode, int]]:
+    return CONSTANT_GAS_COST_PAIRS
 
 
-def state_write_opcodes() -> List[Opcode]:
-    return [
-        Opcode.SSTORE,
-        Opcode.LOG0,
-        Opcode.LOG1,
-        Opcode.LOG2,
-        Opcode.LOG3,
-        Opcode.LOG4,
-        Opcode.CREATE,
-        Opcode.CALL,
-        Opcode.CREATE2,
-        Opcode.SELFDESTRUCT,
-    ]
+def state_write_opcodes() -> Sequence[Opcode]:
+    return STATE_WRITE_OPCODES
 
 
-def call_opcodes() -> List[Opcode]:
-    return [Opcode.CALL, Opcode.CALLCODE, Opcode.DELEGATECALL, Opcode.STATICCALL]
+def call_opcodes() -> Sequence[Opcode]:
+    return CALL_OPCODES
 
 
-def ether_transfer_opcdes() -> List[Opcode]:
-    return [Opcode.CALL, Opcode.CALLCODE]
+def ether_transfer_opcdes() -> Sequence[Opcode]:
+    return ETHER_TRANSFER_OPCODES
 
 
-def create_opcodes() -> List[Opcode]:
-    return [Opcode.CREATE, Opcode.CREATE2]
+def create_opcodes() -> Sequence[Opcode]:
+    return CREATE_OPCODES
 
 
-def jump_opcodes() -> List[Opcode]:
-    return [Opcode.JUMP, Opcode.JUMPI]
+def jump_opcodes() -> Sequence[Opcode]:
+    return JUMP_OPCODES
 
 
 # Checks if the passed in byte is a PUSH op
 def is_push(op) -> bool:
-    return op in range(Opcode.PUSH1, Opcode.PUSH32 + 1)
+    return op in PUSH_SIZE_MAP
 
 
 # Returns how many bytes the opcode pushes
 def get_push_size(op) -> int:
-    return op - Opcode.PUSH1 + 1 if is_push(op) else 0
+    return PUSH_SIZE_MAP.get(op, 0)
@@ -1,10 +1,24 @@
 from __future__ import annotations
-from typing import Any, List, Mapping, Optional, Sequence, Set, Type, TypeVar, Union
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
 from enum import IntEnum, auto
 from itertools import chain, product
 from dataclasses import dataclass, field, fields
 
-from ..util import Expression, FQ
+from ..util import ConstraintUnsatFailure, Expression, FQ, RLC, keccak256
 from .execution_state import ExecutionState
 
 
@@ -326,13 +340,13 @@ class WrongQueryKey(Exception):
         self.message = f"Lookup {table_name} with invalid keys {diff}"
 
 
-class LookupUnsatFailure(Exception):
+class LookupUnsatFailure(ConstraintUnsatFailure):
     def __init__(self, table_name: str, inputs: Any) -> None:
         self.inputs = inputs
         self.message = f"Lookup {table_name} is unsatisfied on inputs {inputs}"
 
 
-class LookupAmbiguousFailure(Exception):
+class LookupAmbiguousFailure(ConstraintUnsatFailure):
     def __init__(self, table_name: str, inputs: Any, matched_rows: Sequence[Any]) -> None:
         self.inputs = inputs
         self.message = f"Lookup {table_name} is ambiguous on inputs {inputs}, ${len(matched_rows)} matched rows found: {matched_rows}"
@@ -455,6 +469,91 @@ class KeccakTableRow(TableRow):
     output: FQ
 
 
+# TODO: Review if the keccak table layout used here matches the final keccak
+# lookup table layout in the spec.
+# - Keccak input spec PR https://github.com/privacy-scaling-explorations/zkevm-specs/pull/147
+# - Tracking issue https://github.com/privacy-scaling-explorations/zkevm-specs/issues/158
+class KeccakTable:
+    """
+    Keccak lookup table shared by the tx, bytecode and EVM circuits.
+
+    The entries are the finalized KeccakTableRow of each input, with the RLCs
+    precomputed with the randomness of the table and indexed by the input RLC.
+    The tx circuit looks up (is_enabled, input_rlc, input_len, output_rlc),
+    where a disabled lookup matches the all 0s row, and the bytecode circuit
+    looks up (input_rlc, input_len, hash) with the hash encoded as a word.
+    """
+
+    randomness: Optional[FQ]
+    # Rows indexed by their acc_input
+    rows: Dict[FQ, Set[KeccakTableRow]]
+    # Digest of the rows added from their input, encoded as a word, which is
+    # the hash looked up by the bytecode circuit
+    hash_words: Dict[KeccakTableRow, FQ]
+
+    def __init__(self, randomness: Optional[FQ] = None, rows: Iterable[KeccakTableRow] = ()):
+        self.randomness = randomness
+        self.rows = {}
+        self.hash_words = {}
+        self.extend(rows)
+
+    def add(self, input: bytes, randomness: FQ) -> KeccakTableRow:
+        if self.randomness is None:
+            self.randomness = randomness
+        assert self.randomness == randomness, "Keccak table RLCs use a different randomness"
+
+        output = keccak256(input)
+        row = KeccakTableRow(
+            state_tag=FQ(2),  # Finalize
+            input_len=FQ(len(input)),
+            acc_input=RLC(input[::-1], randomness, n_bytes=len(input)).expr(),
+            output=RLC(output, randomness).expr(),
+        )
+        self.rows.setdefault(row.acc_input, set()).add(row)
+        self.hash_words[row] = RLC(int.from_bytes(output, "big"), randomness).expr()
+        return row
+
+    def extend(self, rows: Iterable[KeccakTableRow]):
+        for row in rows:
+            self.rows.setdefault(row.acc_input, set()).add(row)
+
+    def __iter__(self) -> Iterator[KeccakTableRow]:
+        for rows in self.rows.values():
+            yield from rows
+
+    def __len__(self) -> int:
+        return sum(len(rows) for rows in self.rows.values())
+
+    def __contains__(self, lookup: Tuple[Union[FQ, RLC], ...]) -> bool:
+        input_rlc, input_len, hash = (
+            value.expr() if isinstance(value, RLC) else FQ(value) for value in lookup
+        )
+        for row in self.rows.get(input_rlc, ()):
+            if row.input_len == input_len and self.hash_words.get(row) == hash:
+                return True
+        return False
+
+    def lookup(self, is_enabled: FQ, input_rlc: FQ, input_len: FQ, output_rlc: FQ, assert_msg: str):
+        if is_enabled == FQ(0):
+            found = input_rlc == FQ(0) and input_len == FQ(0) and output_rlc == FQ(0)
+        else:
+            row = KeccakTableRow(FQ(2), input_len, input_rlc, output_rlc)
+            found = is_enabled == FQ(1) and row in self.rows.get(input_rlc, ())
+        if not found:
+            raise AssertionError(
+                f"{assert_msg}: {(is_enabled, input_rlc, input_len, output_rlc)} "
+                + "not found in the lookup table"
+            )
+
+    def lookup_row(self, input_len: Expression, input_rlc: Expression) -> KeccakTableRow:
+        query = {
+            "state_tag": FQ(2),  # Finalize
+            "input_len": input_len,
+            "acc_input": input_rlc,
+        }
+        return lookup(KeccakTableRow, self.rows.get(input_rlc.expr(), set()), query)
+
+
 class Tables:
     """
     A collection of lookup tables used in EVM circuit.
@@ -466,7 +565,7 @@ class Tables:
     bytecode_table: Set[BytecodeTableRow]
     rw_table: Set[RWTableRow]
     copy_table: Set[CopyTableRow]
-    keccak_table: Set[KeccakTableRow]
+    keccak_table: KeccakTable
 
     def __init__(
         self,
@@ -474,8 +573,8 @@ class Tables:
         tx_table: Set[TxTableRow],
         bytecode_table: Set[BytecodeTableRow],
         rw_table: Union[Set[Sequence[Expression]], Set[RWTableRow]],
-        copy_circuit: Sequence[CopyCircuitRow] = None,
-        keccak_table: Sequence[KeccakTableRow] = None,
+        copy_circuit: Optional[Sequence[CopyCircuitRow]] = None,
+        keccak_table: Union[None, Sequence[KeccakTableRow], KeccakTable] = None,
     ) -> None:
         self.block_table = block_table
         self.tx_table = tx_table
@@ -484,10 +583,11 @@ class Tables:
             row if isinstance(row, RWTableRow) else RWTableRow(*row)  # type: ignore  # (RWTableRow input args)
             for row in rw_table
         )
-        if copy_circuit is not None:
-            self.copy_table = self._convert_copy_circuit_to_table(copy_circuit)
-        if keccak_table is not None:
-            self.keccak_table = set(keccak_table)
+        self.copy_table = self._convert_copy_circuit_to_table(copy_circuit or [])
+        if isinstance(keccak_table, KeccakTable):
+            self.keccak_table = keccak_table
+        else:
+            self.keccak_table = KeccakTable(rows=keccak_table or [])
 
     def _convert_copy_circuit_to_table(self, copy_circuit: Sequence[CopyCircuitRow]):
         rows: List[CopyTableRow] = []
@@ -621,12 +721,7 @@ class Tables:
         return lookup(CopyTableRow, self.copy_table, query)
 
     def keccak_lookup(self, length: Expression, value_rlc: Expression):
-        query = {
-            "state_tag": FQ(2),  # Finalize
-            "input_len": length,
-            "acc_input": value_rlc,
-        }
-        return lookup(KeccakTableRow, self.keccak_table, query)
+        return self.keccak_table.lookup_row(length, value_rlc)
 
 
 T = TypeVar("T", bound=TableRow)
@@ -0,0 +1,761 @@
+from __future__ import annotations
+from itertools import chain
+from typing import (
+    Any,
+    Dict,
+    IO,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+import json
+
+from ..util import (
+    FQ,
+    U160,
+    U256,
+    IntOrFQ,
+    RLC,
+    SLOAD_GAS,
+    SSTORE_CLEARS_SCHEDULE,
+    SSTORE_RESET_GAS,
+    SSTORE_SET_GAS,
+)
+from .execution_state import ExecutionState, OPCODE_EXECUTION_STATE
+from .opcode import Opcode
+from .step import StepState
+from .table import (
+    AccountFieldTag,
+    CallContextFieldTag,
+    CopyDataTypeTag,
+    Tables,
+    TxLogFieldTag,
+)
+from .typing import (
+    Account,
+    Block,
+    Bytecode,
+    CopyCircuit,
+    KeccakCircuit,
+    RWDictionary,
+    Transaction,
+)
+
+# Opcode names used by newer geth versions which differ from ours
+OPCODE_ALIASES: Dict[str, Opcode] = {
+    "KECCAK256": Opcode.SHA3,
+    "PREVRANDAO": Opcode.DIFFICULTY,
+}
+
+
+class StructLog:
+    """
+    One entry of a `debug_traceTransaction` structLog trace, which describes
+    the EVM state right before `op` is executed.
+    """
+
+    pc: int
+    op: Opcode
+    gas: int
+    gas_cost: int
+    depth: int
+    # Stack from bottom to top, as reported by geth
+    stack: List[int]
+
+    def __init__(
+        self,
+        pc: int,
+        op: Opcode,
+        gas: int,
+        gas_cost: int = 0,
+        depth: int = 1,
+        stack: Optional[List[int]] = None,
+    ) -> None:
+        self.pc = pc
+        self.op = op
+        self.gas = gas
+        self.gas_cost = gas_cost
+        self.depth = depth
+        self.stack = [] if stack is None else stack
+
+    @staticmethod
+    def from_json(log: Mapping[str, Any]) -> StructLog:
+        op = log["op"]
+        if isinstance(op, str):
+            op = OPCODE_ALIASES[op] if op in OPCODE_ALIASES else Opcode[op]
+        return StructLog(
+            pc=log["pc"],
+            op=Opcode(op),
+            gas=log["gas"],
+            gas_cost=log.get("gasCost", 0),
+            depth=log.get("depth", 1),
+            stack=[int(value, 16) for value in log.get("stack") or []],
+        )
+
+
+def iter_struct_logs(fp: IO[str], chunk_size: int = 1 << 20) -> Iterator[StructLog]:
+    """
+    Incrementally parse the `structLogs` array of a `debug_traceTransaction`
+    result (optionally wrapped in a JSON-RPC response), so only one chunk and
+    one log entry have to be held in memory at a time.
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = "", 0, False
+
+    def read_more() -> None:
+        nonlocal buffer, pos, eof
+        chunk = fp.read(chunk_size)
+        eof = len(chunk) == 0
+        buffer, pos = buffer[pos:] + chunk, 0
+
+    def skip_whitespace() -> None:
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            read_more()
+
+    def expect(char: str) -> None:
+        nonlocal pos
+        skip_whitespace()
+        if pos >= len(buffer) or buffer[pos] != char:
+            raise ValueError(f"Malformed trace, expect '{char}' after structLogs")
+        pos += 1
+
+    key = '"structLogs"'
+    while True:
+        found = buffer.find(key, pos)
+        if found >= 0:
+            pos = found + len(key)
+            break
+        if eof:
+            raise ValueError("Trace does not contain structLogs")
+        # Keep the tail in case the key is split between chunks
+        pos = max(pos, len(buffer) - len(key))
+        read_more()
+
+    expect(":")
+    expect("[")
+    while True:
+        skip_whitespace()
+        if pos >= len(buffer):
+            raise ValueError("Malformed trace, structLogs is not terminated")
+        if buffer[pos] == "]":
+            return
+        if buffer[pos] == ",":
+            pos += 1
+            continue
+        try:
+            log, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            read_more()
+            continue
+        pos = end
+        yield StructLog.from_json(log)
+
+
+# ExecutionStates which need world state or other calls to be witnessed, so
+# they can't be built from a single call's structLogs
+UNSUPPORTED_EXECUTION_STATES = frozenset(
+    [
+        ExecutionState.BALANCE,
+        ExecutionState.EXTCODESIZE,
+        ExecutionState.RETURNDATACOPY,
+        ExecutionState.CREATE,
+        ExecutionState.CALL,
+        ExecutionState.CALLCODE,
+        ExecutionState.DELEGATECALL,
+        ExecutionState.CREATE2,
+        ExecutionState.STATICCALL,
+        ExecutionState.REVERT,
+        ExecutionState.SELFDESTRUCT,
+    ]
+)
+
+# ExecutionStates which read the world state, so they can only be witnessed
+# when the accounts before the call are given
+WORLD_STATE_EXECUTION_STATES = frozenset(
+    [
+        ExecutionState.EXTCODECOPY,
+        ExecutionState.EXTCODEHASH,
+        ExecutionState.SLOAD,
+        ExecutionState.SSTORE,
+    ]
+)
+
+# ExecutionState -> CallContextFieldTag read right before the pushed value
+CALL_CONTEXT_PUSH_FIELDS: Dict[ExecutionState, CallContextFieldTag] = {
+    ExecutionState.ADDRESS: CallContextFieldTag.CalleeAddress,
+    ExecutionState.CALLER: CallContextFieldTag.CallerAddress,
+    ExecutionState.CALLVALUE: CallContextFieldTag.Value,
+    ExecutionState.CALLDATASIZE: CallContextFieldTag.CallDataLength,
+    ExecutionState.RETURNDATASIZE: CallContextFieldTag.LastCalleeReturnDataLength,
+}
+
+
+class WorldState:
+    """
+    Accounts, storage and access lists of a transaction, as seen by its root
+    call. The TraceWitnessBuilder and the Interpreter each track their own, at
+    their own step of the execution.
+    """
+
+    accounts: Dict[int, Account]
+    # Storage written by the transaction, the rest is committed in accounts
+    storage: Dict[Tuple[int, int], int]
+    accessed_addresses: Set[int]
+    accessed_storage_keys: Set[Tuple[int, int]]
+
+    def __init__(self, accounts: Iterable[Account], tx: Transaction) -> None:
+        self.accounts = {account.address: account for account in accounts}
+        self.storage = dict()
+        # The caller and callee are warm since the beginning of the tx
+        self.accessed_addresses = {tx.caller_address, tx.callee_address or 0}
+        self.accessed_storage_keys = set()
+
+    def account(self, address: int) -> Account:
+        return self.accounts.get(address) or Account(address=U160(address))
+
+    def committed_storage(self, address: int, key: int) -> int:
+        return self.account(address).storage.get(U256(key), U256(0))
+
+    def current_storage(self, address: int, key: int) -> int:
+        if (address, key) in self.storage:
+            return self.storage[(address, key)]
+        return self.committed_storage(address, key)
+
+    def write_storage(self, address: int, key: int, value: int):
+        self.storage[(address, key)] = value
+
+    def access_address(self, address: int) -> bool:
+        """
+        Adds address to the access list and returns whether it was warm.
+        """
+        is_warm = address in self.accessed_addresses
+        self.accessed_addresses.add(address)
+        return is_warm
+
+    def access_storage_key(self, address: int, key: int) -> bool:
+        """
+        Adds the storage key to the access list and returns whether it was warm.
+        """
+        is_warm = (address, key) in self.accessed_storage_keys
+        self.accessed_storage_keys.add((address, key))
+        return is_warm
+
+
+class SkippedStep(NamedTuple):
+    """
+    A step of the root call whose lookups aren't witnessed, so it can't be
+    verified.
+    """
+
+    step_index: int  # Index of the step in the built steps
+    op: Opcode
+    reason: str
+
+
+class TraceWitnessBuilder:
+    """
+    Build the EVM circuit witness of a root call from its structLogs.
+
+    Each StructLog becomes a StepState, and the rw, copy and keccak rows the
+    step looks up are appended to `rw_dictionary`, `copy_circuit` and
+    `keccak_circuit` in the same order as the execution gadgets consume them.
+    Values pushed by a step are taken from the stack of the following log, and
+    memory is tracked from the witnessed writes since geth omits it by default.
+
+    Storage and account lookups also need the `accounts` before the call, from
+    which storage, access lists and refund are tracked. The root call is
+    assumed to be persistent, with the caller and callee already warm.
+
+    Steps which can't be witnessed, like calls to other contracts, are still
+    built but recorded in `skipped_steps`, and the logs of the calls they make
+    aren't built. The state they change (memory, storage, log id, ...) isn't
+    tracked, so the steps after them which depend on it don't verify.
+    """
+
+    randomness: FQ
+    bytecode: Bytecode
+    tx: Transaction
+    call_id: int
+    code_hash: RLC
+
+    rw_dictionary: RWDictionary
+    copy_circuit: CopyCircuit
+    keccak_circuit: KeccakCircuit
+
+    memory: bytearray
+    memory_size: int
+    reversible_write_counter: int
+    log_id: int
+
+    n_steps: int
+    skipped_steps: List[SkippedStep]
+
+    # World state, which is only tracked when accounts are given
+    world_state: Optional[WorldState]
+    tx_refund: int
+    # Code of the callee and of the accounts copied from, by code hash
+    bytecodes: Dict[int, Bytecode]
+
+    def __init__(
+        self,
+        randomness: FQ,
+        bytecode: Bytecode,
+        tx: Optional[Transaction] = None,
+        call_id: int = 1,
+        rw_counter: int = 1,
+        accounts: Optional[Sequence[Account]] = None,
+        reversible_write_counter: int = 0,
+    ) -> None:
+        self.randomness = randomness
+        self.bytecode = bytecode
+        self.tx = Transaction() if tx is None else tx
+        self.call_id = call_id
+        self.code_hash = RLC(bytecode.hash(), randomness)
+        self.rw_dictionary = RWDictionary(rw_counter)
+        self.copy_circuit = CopyCircuit()
+        self.keccak_circuit = KeccakCircuit()
+        self.memory = bytearray()
+        self.memory_size = 0
+        self.reversible_write_counter = reversible_write_counter
+        self.log_id = 0
+        self.n_steps = 0
+        self.skipped_steps = []
+        self.world_state = None if accounts is None else WorldState(accounts, self.tx)
+        self.tx_refund = 0
+        self.bytecodes = {bytecode.hash(): bytecode}
+
+    def build_steps(self, struct_logs: Iterable[StructLog]) -> Iterator[StepState]:
+        """
+        Lazily turn the struct_logs of the root call into StepStates, holding
+        one log of lookahead. The logs of the calls it makes are skipped.
+        """
+        prev: Optional[StructLog] = None
+        n_call_logs = 0
+        for log in struct_logs:
+            if log.depth != 1:
+                n_call_logs += 1
+                continue
+            if prev is not None:
+                yield self.build_step(prev, log.stack, n_call_logs)
+            prev, n_call_logs = log, 0
+        if prev is not None:
+            yield self.build_step(prev, None, n_call_logs)
+
+    def build_step(
+        self, log: StructLog, next_stack: Optional[List[int]], n_call_logs: int = 0
+    ) -> StepState:
+        """
+        Build the StepState of log and append the rows it looks up.
+        The next_stack is None when log is the last one of the trace, and
+        n_call_logs is the number of logs of the calls made by log.
+        """
+        if log.depth != 1:
+            raise ValueError(f"Log at depth {log.depth} is not in the root call")
+
+        opcode = log.op
+        execution_state = OPCODE_EXECUTION_STATE[opcode]
+        step = StepState(
+            execution_state=execution_state,
+            rw_counter=self.rw_dictionary.rw_counter,
+            call_id=self.call_id,
+            is_root=True,
+            is_create=False,
+            code_hash=self.code_hash,
+            program_counter=log.pc,
+            stack_pointer=1024 - len(log.stack),
+            gas_left=log.gas,
+            memory_size=self.memory_size,
+            reversible_write_counter=self.reversible_write_counter,
+            log_id=self.log_id,
+        )
+        index, self.n_steps = self.n_steps, self.n_steps + 1
+
+        reason = None
+        if execution_state in UNSUPPORTED_EXECUTION_STATES:
+            reason = f"Witness of {opcode.name} is not supported from traces"
+            if n_call_logs > 0:
+                reason += f", skipping {n_call_logs} logs of the calls it makes"
+        elif execution_state in WORLD_STATE_EXECUTION_STATES and self.world_state is None:
+            reason = f"Witness of {opcode.name} needs the accounts before the call"
+        if reason is not None:
+            self.skipped_steps.append(SkippedStep(index, opcode, reason))
+            return step
+
+        if execution_state == ExecutionState.STOP:
+            self._is_success_read()
+            self._is_persistent_read()
+        elif execution_state == ExecutionState.RETURN:
+            self._is_success_read()
+            self._stack_pops(log, 2)
+            self._is_persistent_read()
+        elif next_stack is not None:
+            self._witness_step(log, next_stack)
+        # Otherwise the trace ends before the step pushes its result, so it
+        # can only be used as next step of the previous one
+        return step
+
+    def tables(self, block: Optional[Block] = None) -> Tables:
+        block = Block() if block is None else block
+        return Tables(
+            block_table=set(block.table_assignments(self.randomness)),
+            tx_table=set(self.tx.table_assignments(self.randomness)),
+            bytecode_table=set(
+                chain(
+                    *[
+                        bytecode.table_assignments(self.randomness)
+                        for bytecode in self.bytecodes.values()
+                    ]
+                )
+            ),
+            rw_table=set(self.rw_dictionary.rws),
+            copy_circuit=self.copy_circuit.rows,
+            keccak_table=self.keccak_circuit.rows,
+        )
+
+    def _witness_step(self, log: StructLog, next_stack: List[int]):
+        opcode = log.op
+        execution_state = OPCODE_EXECUTION_STATE[opcode]
+        stack_pointer = 1024 - len(log.stack)
+        pushed = next_stack[-1] if len(next_stack) > 0 else 0
+
+        if opcode.is_dup():
+            x = opcode - Opcode.DUP1 + 1
+            self._stack_read(stack_pointer + x - 1, log.stack[-x])
+            self._stack_write(stack_pointer - 1, log.stack[-x])
+        elif opcode.is_swap():
+            x = opcode - Opcode.SWAP1 + 1
+            top, target = log.stack[-1], log.stack[-1 - x]
+            self._stack_read(stack_pointer, top)
+            self._stack_read(stack_pointer + x, target)
+            self._stack_write(stack_pointer, target)
+            self._stack_write(stack_pointer + x, top)
+        elif execution_state in CALL_CONTEXT_PUSH_FIELDS:
+            value: Union[FQ, RLC] = FQ(pushed)
+            if execution_state == ExecutionState.CALLVALUE:
+                value = RLC(pushed, self.randomness)
+            self.rw_dictionary.call_context_read(
+                self.call_id, CALL_CONTEXT_PUSH_FIELDS[execution_state], value
+            )
+            self._stack_write(stack_pointer - 1, pushed)
+        elif execution_state in [ExecutionState.ORIGIN, ExecutionState.GASPRICE]:
+            self._tx_id_read()
+            self._stack_write(stack_pointer - 1, pushed)
+        elif execution_state == ExecutionState.SELFBALANCE:
+            callee_address = self._callee_address_read()
+            self.rw_dictionary.account_read(
+                callee_address, AccountFieldTag.Balance, RLC(pushed, self.randomness)
+            )
+            self._stack_write(stack_pointer - 1, pushed)
+        elif execution_state == ExecutionState.CALLDATALOAD:
+            self._stack_pops(log, 1)
+            self._tx_id_read()
+            self._call_data_length_read()
+            self._stack_write_bytes(stack_pointer, pushed)
+        elif execution_state == ExecutionState.CALLDATACOPY:
+            memory_offset, data_offset, length = self._stack_pops(log, 3)
+            self._tx_id_read()
+            self._call_data_length_read()
+            call_data = self.tx.call_data
+            self._copy(
+                self.tx.id,
+                CopyDataTypeTag.TxCalldata,
+                data_offset,
+                len(call_data),
+                memory_offset,
+                length,
+                dict(enumerate(call_data)),
+            )
+        elif execution_state == ExecutionState.CODECOPY:
+            memory_offset, code_offset, length = self._stack_pops(log, 3)
+            code = self.bytecode.code
+            self._copy(
+                self.code_hash.expr(),
+                CopyDataTypeTag.Bytecode,
+                code_offset,
+                len(code),
+                memory_offset,
+                length,
+                {idx: (byte, self.bytecode.is_code[idx]) for idx, byte in enumerate(code)},
+            )
+        elif execution_state == ExecutionState.SHA3:
+            offset, length = self._stack_pops(log, 2)
+            self._stack_write_bytes(stack_pointer + 1, pushed)
+            self._expand_memory(offset, length)
+            data = bytes(self.memory[offset : offset + length])
+            if length > 0:
+                self.copy_circuit.copy(
+                    self.randomness,
+                    self.rw_dictionary,
+                    self.call_id,
+                    CopyDataTypeTag.Memory,
+                    self.call_id,
+                    CopyDataTypeTag.RlcAcc,
+                    offset,
+                    offset + length,
+                    FQ(0),
+                    length,
+                    {offset + idx: byte for idx, byte in enumerate(data)},
+                )
+            self.keccak_circuit.add(data, self.randomness)
+        elif execution_state == ExecutionState.SLOAD:
+            world_state = self._world_state()
+            self._tx_id_read()
+            self._reversion_info_read()
+            callee_address = self._callee_address_read()
+            (key,) = self._stack_pops(log, 1)
+            self.rw_dictionary.account_storage_read(
+                callee_address,
+                RLC(key, self.randomness),
+                RLC(world_state.current_storage(callee_address, key), self.randomness),
+                self.tx.id,
+                RLC(world_state.committed_storage(callee_address, key), self.randomness),
+            )
+            self._stack_write(stack_pointer, pushed)
+            self._storage_key_access(callee_address, key)
+            self.reversible_write_counter += 1
+        elif execution_state == ExecutionState.SSTORE:
+            world_state = self._world_state()
+            self._tx_id_read()
+            self.rw_dictionary.call_context_read(self.call_id, CallContextFieldTag.IsStatic, 0)
+            self._reversion_info_read()
+            callee_address = self._callee_address_read()
+            key, new_value = self._stack_pops(log, 2)
+            value_prev = world_state.current_storage(callee_address, key)
+            original_value = world_state.committed_storage(callee_address, key)
+            self.rw_dictionary.account_storage_write(
+                callee_address,
+                RLC(key, self.randomness),
+                RLC(new_value, self.randomness),
+                RLC(value_prev, self.randomness),
+                self.tx.id,
+                RLC(original_value, self.randomness),
+            )
+            world_state.write_storage(callee_address, key, new_value)
+            self._storage_key_access(callee_address, key)
+            tx_refund_prev = self.tx_refund
+            self.tx_refund = sstore_refund(tx_refund_prev, original_value, value_prev, new_value)
+            self.rw_dictionary.tx_refund_write(self.tx.id, self.tx_refund, tx_refund_prev)
+            self.reversible_write_counter += 3
+        elif execution_state == ExecutionState.EXTCODEHASH:
+            world_state = self._world_state()
+            (address,) = self._stack_pops(log, 1)
+            self._tx_id_read()
+            self._reversion_info_read()
+            is_warm = world_state.access_address(address)
+            self.rw_dictionary.tx_access_list_account_write(self.tx.id, address, True, is_warm)
+            account = world_state.account(address)
+            for field_tag, field in [
+                (AccountFieldTag.Nonce, account.nonce),
+                (AccountFieldTag.Balance, account.balance),
+                (AccountFieldTag.CodeHash, account.code_hash()),
+            ]:
+                self.rw_dictionary.account_read(address, field_tag, RLC(field, self.randomness))
+            self._stack_write(stack_pointer, pushed)
+        elif execution_state == ExecutionState.EXTCODECOPY:
+            world_state = self._world_state()
+            address, memory_offset, code_offset, length = self._stack_pops(log, 4)
+            self._tx_id_read()
+            self._reversion_info_read()
+            is_warm = world_state.access_address(address)
+            self.rw_dictionary.tx_access_list_account_write(self.tx.id, address, True, is_warm)
+            bytecode = world_state.account(address).code
+            code_hash = RLC(bytecode.hash(), self.randomness)
+            self.rw_dictionary.account_read(address, AccountFieldTag.CodeHash, code_hash)
+            self.bytecodes[bytecode.hash()] = bytecode
+            code = bytecode.code
+            self._copy(
+                code_hash.expr(),
+                CopyDataTypeTag.Bytecode,
+                code_offset,
+                len(code),
+                memory_offset,
+                length,
+                {idx: (byte, bytecode.is_code[idx]) for idx, byte in enumerate(code)},
+            )
+        elif execution_state == ExecutionState.LOG:
+            offset, length = self._stack_pops(log, 2)
+            self._tx_id_read()
+            self.rw_dictionary.call_context_read(self.call_id, CallContextFieldTag.IsStatic, 0)
+            callee_address = self._callee_address_read()
+            self._is_persistent_read()
+            self.log_id += 1
+            self.rw_dictionary.tx_log_write(
+                self.tx.id, self.log_id, TxLogFieldTag.Address, 0, FQ(callee_address)
+            )
+            for idx in range(opcode - Opcode.LOG0):
+                topic = log.stack[-3 - idx]
+                self._stack_read(stack_pointer + 2 + idx, topic)
+                self.rw_dictionary.tx_log_write(
+                    self.tx.id, self.log_id, TxLogFieldTag.Topic, idx, RLC(topic, self.randomness)
+                )
+            self._expand_memory(offset, length)
+            if length > 0:
+                self.copy_circuit.copy(
+                    self.randomness,
+                    self.rw_dictionary,
+                    self.call_id,
+                    CopyDataTypeTag.Memory,
+                    self.tx.id,
+                    CopyDataTypeTag.TxLog,
+                    offset,
+                    offset + length,
+                    FQ(0),
+                    length,
+                    {offset + idx: self.memory[offset + idx] for idx in range(length)},
+                    log_id=self.log_id,
+                )
+        elif opcode == Opcode.MLOAD:
+            (offset,) = self._stack_pops(log, 1)
+            self._stack_write(stack_pointer, pushed)
+            self._expand_memory(offset, 32)
+            for idx in range(32):
+                self.rw_dictionary.memory_read(
+                    self.call_id, offset + idx, self.memory[offset + idx]
+                )
+        elif opcode in [Opcode.MSTORE, Opcode.MSTORE8]:
+            offset, word = self._stack_pops(log, 2)
+            data = word.to_bytes(32, "big") if opcode == Opcode.MSTORE else bytes([word & 0xFF])
+            self._expand_memory(offset, len(data))
+            for idx, byte in enumerate(data):
+                self.memory[offset + idx] = byte
+                self.rw_dictionary.memory_write(self.call_id, offset + idx, byte)
+        else:
+            # Stack-only opcodes pop their operands and then push the result
+            n_pops = 1024 - opcode.max_stack_pointer()
+            n_pushes = opcode.min_stack_pointer() + n_pops
+            assert n_pushes <= 1, f"Unexpected {n_pushes} pushes for {opcode.name}"
+            self._stack_pops(log, n_pops)
+            if n_pushes == 1:
+                self._stack_write(stack_pointer + n_pops - 1, pushed)
+
+    def _stack_read(self, stack_pointer: int, value: int):
+        self.rw_dictionary.stack_read(self.call_id, stack_pointer, RLC(value, self.randomness))
+
+    def _stack_write(self, stack_pointer: int, value: int):
+        self.rw_dictionary.stack_write(self.call_id, stack_pointer, RLC(value, self.randomness))
+
+    def _stack_write_bytes(self, stack_pointer: int, value: int):
+        # CALLDATALOAD and SHA3 gadgets compare the pushed word with the RLC of
+        # its bytes in big-endian order, so the word is encoded from them.
+        self.rw_dictionary.stack_write(
+            self.call_id, stack_pointer, RLC(value.to_bytes(32, "big"), self.randomness)
+        )
+
+    def _stack_pops(self, log: StructLog, n: int) -> Tuple[int, ...]:
+        stack_pointer = 1024 - len(log.stack)
+        values = tuple(log.stack[-1 - idx] for idx in range(n))
+        for idx, value in enumerate(values):
+            self._stack_read(stack_pointer + idx, value)
+        return values
+
+    def _tx_id_read(self):
+        self.rw_dictionary.call_context_read(self.call_id, CallContextFieldTag.TxId, self.tx.id)
+
+    def _reversion_info_read(self):
+        self.rw_dictionary.call_context_read(
+            self.call_id, CallContextFieldTag.RwCounterEndOfReversion, 0
+        )
+        self._is_persistent_read()
+
+    def _is_success_read(self):
+        self.rw_dictionary.call_context_read(self.call_id, CallContextFieldTag.IsSuccess, 1)
+
+    def _is_persistent_read(self):
+        self.rw_dictionary.call_context_read(self.call_id, CallContextFieldTag.IsPersistent, 1)
+
+    def _callee_address_read(self) -> int:
+        callee_address = self.tx.callee_address or 0
+        self.rw_dictionary.call_context_read(
+            self.call_id, CallContextFieldTag.CalleeAddress, callee_address
+        )
+        return callee_address
+
+    def _world_state(self) -> WorldState:
+        assert self.world_state is not None, "World state is only tracked with the accounts"
+        return self.world_state
+
+    def _storage_key_access(self, address: int, key: int):
+        is_warm = self._world_state().access_storage_key(address, key)
+        self.rw_dictionary.tx_access_list_account_storage_write(
+            self.tx.id, address, RLC(key, self.randomness), True, is_warm
+        )
+
+    def _call_data_length_read(self):
+        self.rw_dictionary.call_context_read(
+            self.call_id, CallContextFieldTag.CallDataLength, len(self.tx.call_data)
+        )
+
+    def _expand_memory(self, offset: int, length: int):
+        if length == 0:
+            return
+        self.memory_size = max(self.memory_size, (offset + length + 31) // 32)
+        if len(self.memory) < self.memory_size * 32:
+            self.memory.extend(bytes(self.memory_size * 32 - len(self.memory)))
+
+    def _copy(
+        self,
+        src_id: Union[int, FQ],
+        src_type: CopyDataTypeTag,
+        src_addr: int,
+        src_addr_end: int,
+        memory_offset: int,
+        length: int,
+        src_data: Mapping[IntOrFQ, Any],
+    ):
+        """
+        Copy length bytes from a non-memory source into memory.
+        """
+        if length == 0:
+            return
+        self._expand_memory(memory_offset, length)
+        self.copy_circuit.copy(
+            self.randomness,
+            self.rw_dictionary,
+            src_id,
+            src_type,
+            self.call_id,
+            CopyDataTypeTag.Memory,
+            src_addr,
+            src_addr_end,
+            memory_offset,
+            length,
+            src_data,
+        )
+        for idx in range(length):
+            value = src_data.get(src_addr + idx, 0) if src_addr + idx < src_addr_end else 0
+            self.memory[memory_offset + idx] = value[0] if isinstance(value, tuple) else value
+
+
+def sstore_refund(tx_refund: int, original_value: int, value_prev: int, value: int) -> int:
+    """
+    Returns the tx refund after an SSTORE, following EIP-2200 with the
+    refunds of EIP-3529.
+    """
+    if value_prev == value:
+        return tx_refund
+    if original_value == value_prev:
+        if original_value != 0 and value == 0:
+            tx_refund += SSTORE_CLEARS_SCHEDULE
+        return tx_refund
+    if original_value != 0:
+        if value_prev == 0:
+            tx_refund -= SSTORE_CLEARS_SCHEDULE
+        if value == 0:
+            tx_refund += SSTORE_CLEARS_SCHEDULE
+    if original_value == value:
+        tx_refund += (SSTORE_SET_GAS if original_value == 0 else SSTORE_RESET_GAS) - SLOAD_GAS
+    return tx_refund
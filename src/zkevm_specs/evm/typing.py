@@ -12,7 +12,6 @@ from typing import (
     Mapping,
     Tuple,
 )
-from functools import reduce
 from itertools import chain
 
 from ..util import (
@@ -24,9 +23,8 @@ from ..util import (
     RLC,
     Expression,
     keccak256,
-    GAS_COST_TX_CALL_DATA_PER_NON_ZERO_BYTE,
-    GAS_COST_TX_CALL_DATA_PER_ZERO_BYTE,
     EMPTY_CODE_HASH,
+    call_data_gas_cost,
 )
 from .table import (
     RW,
@@ -148,18 +146,7 @@ class Transaction:
         self.call_data = call_data
 
     def call_data_gas_cost(self) -> int:
-        return reduce(
-            lambda acc, byte: (
-                acc
-                + (
-                    GAS_COST_TX_CALL_DATA_PER_ZERO_BYTE
-                    if byte == 0
-                    else GAS_COST_TX_CALL_DATA_PER_NON_ZERO_BYTE
-                )
-            ),
-            self.call_data,
-            0,
-        )
+        return call_data_gas_cost(self.call_data)
 
     def table_assignments(self, randomness: FQ) -> Iterator[TxTableRow]:
         return chain(
@@ -1,17 +1,16 @@
+from __future__ import annotations
 from dataclasses import dataclass
-from typing import Tuple, List, Union
+from typing import Iterable, Iterator, Tuple, List, Sequence, Union, overload
 
 from .util import (
     FQ,
     U64,
     U160,
     U256,
-    linear_combine,
     PUBLIC_INPUTS_BLOCK_LEN as BLOCK_LEN,
     PUBLIC_INPUTS_EXTRA_LEN as EXTRA_LEN,
     PUBLIC_INPUTS_TX_LEN as TX_LEN,
-    GAS_COST_TX_CALL_DATA_PER_NON_ZERO_BYTE,
-    GAS_COST_TX_CALL_DATA_PER_ZERO_BYTE,
+    call_data_gas_cost,
 )
 from .encoding import is_circuit_code
 from .tx import Tag as TxTag
@@ -20,36 +19,6 @@ from .evm import (
 )
 
 
-@dataclass
-class BlockTableRow:
-    value: FQ
-
-
-@dataclass
-class TxTableRow:
-    tx_id: FQ
-    tag: FQ  # Fixed Column
-    index: FQ
-    value: FQ
-
-
-@dataclass
-class Row:
-    """PublicInputs circuit row"""
-
-    q_block_table: FQ  # Fixed Column
-    block_table: BlockTableRow
-    q_tx_table: FQ  # Fixed Column
-    tx_table: TxTableRow
-
-    raw_public_inputs: FQ
-    rpi_rlc_acc: FQ  # raw_public_inputs accumulated RLC from bottom to top
-    rand_rpi: FQ
-
-    q_end: FQ  # Fixed Column
-    q_not_end: FQ  # Fixed Column
-
-
 @dataclass
 class PublicInputs:
     """Public Inputs of the PublicInputs circuit"""
@@ -64,11 +33,11 @@ class PublicInputs:
 
 @is_circuit_code
 def check_row(
-    row: Row,
-    row_next: Row,
-    row_offset_tx_table_tx_id: Row,
-    row_offset_tx_table_index: Row,
-    row_offset_tx_table_value: Row,
+    row: RowView,
+    row_next: RowView,
+    row_offset_tx_table_tx_id: RowView,
+    row_offset_tx_table_index: RowView,
+    row_offset_tx_table_value: RowView,
 ):
 
     q_not_end = row.q_not_end
@@ -102,20 +71,132 @@ def check_row(
     )
 
 
+@dataclass
+class Columns:
+    """PublicInputs circuit columns, with the field elements as ints"""
+
+    q_block_table: List[int]  # Fixed Column
+    block_table_value: List[int]
+    q_tx_table: List[int]  # Fixed Column
+    tx_table_tx_id: List[int]
+    tx_table_tag: List[int]  # Fixed Column
+    tx_table_index: List[int]
+    tx_table_value: List[int]
+
+    raw_public_inputs: List[int]
+    rpi_rlc_acc: List[int]  # raw_public_inputs accumulated RLC from bottom to top
+    rand_rpi: List[int]
+
+    q_end: List[int]  # Fixed Column
+    q_not_end: List[int]  # Fixed Column
+
+
+class ColumnField:
+    """Field of a row view, read and written in its column"""
+
+    def __init__(self, column: str):
+        self.column = column
+
+    def __get__(self, view, owner=None) -> FQ:
+        return FQ(getattr(view.columns, self.column)[view.offset])
+
+    def __set__(self, view, value: FQ):
+        getattr(view.columns, self.column)[view.offset] = FQ(value).n
+
+
+class ColumnsView:
+    columns: Columns
+    offset: int
+
+    def __init__(self, columns: Columns, offset: int):
+        self.columns = columns
+        self.offset = offset
+
+
+class BlockTableRowView(ColumnsView):
+    """BlockTableRow at an offset of the columns"""
+
+    value = ColumnField("block_table_value")
+
+
+class TxTableRowView(ColumnsView):
+    """TxTableRow at an offset of the columns"""
+
+    tx_id = ColumnField("tx_table_tx_id")
+    tag = ColumnField("tx_table_tag")
+    index = ColumnField("tx_table_index")
+    value = ColumnField("tx_table_value")
+
+
+class RowView(ColumnsView):
+    """Row at an offset of the columns"""
+
+    q_block_table = ColumnField("q_block_table")
+    q_tx_table = ColumnField("q_tx_table")
+    raw_public_inputs = ColumnField("raw_public_inputs")
+    rpi_rlc_acc = ColumnField("rpi_rlc_acc")
+    rand_rpi = ColumnField("rand_rpi")
+    q_end = ColumnField("q_end")
+    q_not_end = ColumnField("q_not_end")
+
+    @property
+    def block_table(self) -> BlockTableRowView:
+        return BlockTableRowView(self.columns, self.offset)
+
+    @property
+    def tx_table(self) -> TxTableRowView:
+        return TxTableRowView(self.columns, self.offset)
+
+
+class RowsView(Sequence[RowView]):
+    """Rows of the columns, whose fields are read and written in the columns"""
+
+    columns: Columns
+
+    def __init__(self, columns: Columns):
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.columns.raw_public_inputs)
+
+    @overload
+    def __getitem__(self, index: int) -> RowView: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[RowView]: ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("PublicInputs row index out of range")
+        return RowView(self.columns, index)
+
+
 @dataclass
 class Witness:
-    rows: List[Row]  # PublicInputs rows
+    columns: Columns  # PublicInputs columns
     public_inputs: PublicInputs  # Public Inputs of the PublicInputs circuit
 
+    @property
+    def rows(self) -> RowsView:
+        """PublicInputs rows"""
+        return RowsView(self.columns)
+
 
 @is_circuit_code
 def verify_circuit(
     witness: Witness,
     MAX_TXS: int,
     MAX_CALLDATA_BYTES: int,
+    column_wise: bool = False,
 ) -> None:
     """
-    Entry level circuit verification function
+    Entry level circuit verification function.  The constraints of the rows
+    are checked with check_row, or with check_columns when `column_wise` is
+    set, which is much faster for large witnesses.
     """
 
     rows = witness.rows
@@ -135,19 +216,33 @@ def verify_circuit(
     # 1.4 state_root_prev copy constraint from public input to raw_public_inputs
     assert rows[BLOCK_LEN + 3].raw_public_inputs == witness.public_inputs.state_root_prev
 
+    if column_wise:
+        check_columns(witness.columns, MAX_TXS, MAX_CALLDATA_BYTES)
+    else:
+        check_rows(rows, MAX_TXS, MAX_CALLDATA_BYTES)
+
+
+def tx_table_offsets(MAX_TXS: int, MAX_CALLDATA_BYTES: int) -> Tuple[int, int, int]:
+    """
+    Offsets in raw_public_inputs of the tx_table -> {tx_id, index, value}
+    columns
+    """
+    tx_table_len = TX_LEN * MAX_TXS + 1 + MAX_CALLDATA_BYTES
+    tx_id_offset = BLOCK_LEN + 1 + EXTRA_LEN
+    return (tx_id_offset, tx_id_offset + tx_table_len, tx_id_offset + 2 * tx_table_len)
+
+
+def check_rows(rows: Sequence[RowView], MAX_TXS: int, MAX_CALLDATA_BYTES: int):
+    """
+    Check the constraints of each row with check_row
+    """
+    offsets = tx_table_offsets(MAX_TXS, MAX_CALLDATA_BYTES)
     for i in range(len(rows)):
         row = rows[i]
         row_next = rows[(i + 1) % len(rows)]
-        # Offset in raw_public_inputs with tx_table -> tx_id column
-        tx_table_offset = BLOCK_LEN + 1 + EXTRA_LEN
-        row_offset_tx_table_tx_id = rows[(i + tx_table_offset) % len(rows)]
-        # Offset in raw_public_inputs with tx_table -> index column
-        tx_table_len = TX_LEN * MAX_TXS + 1 + MAX_CALLDATA_BYTES
-        tx_table_offset += tx_table_len
-        row_offset_tx_table_index = rows[(i + tx_table_offset) % len(rows)]
-        # Offset in raw_public_inputs with tx_table -> value column
-        tx_table_offset += tx_table_len
-        row_offset_tx_table_value = rows[(i + tx_table_offset) % len(rows)]
+        row_offset_tx_table_tx_id, row_offset_tx_table_index, row_offset_tx_table_value = (
+            rows[(i + offset) % len(rows)] for offset in offsets
+        )
 
         check_row(
             row,
@@ -158,6 +253,89 @@ def verify_circuit(
         )
 
 
+def _enabled_rows(selector: List[int]) -> range:
+    # Rows enabled by a selector assigned 1 in a single range of rows and 0 in
+    # the others, which is how the fixed columns are assigned.  All the rows
+    # for other assignments.
+    n_enabled = selector.count(1)
+    if selector.count(0) + n_enabled == len(selector):
+        start = selector.index(1) if n_enabled > 0 else 0
+        if selector[start : start + n_enabled] == [1] * n_enabled:
+            return range(start, start + n_enabled)
+    return range(len(selector))
+
+
+def _rotated(column: List[int], offset: int, length: int) -> List[int]:
+    # Values of column[(i + offset) % len(column)] for i in range(length)
+    offset %= len(column)
+    values = column[offset : offset + length]
+    while len(values) < length:
+        values += column[: length - len(values)]
+    return values
+
+
+def _check_equal(name: str, selector: List[int], rows: range, lhs: List[int], rhs: List[int]):
+    # Check q * lhs == q * rhs, where lhs and rhs hold the values at the rows
+    if lhs == rhs:
+        return
+    for i, a, b in zip(rows, lhs, rhs):
+        if selector[i] % FQ.field_modulus != 0 and (a - b) % FQ.field_modulus != 0:
+            raise AssertionError(f"{name} constraint failed at row {i}: {a} != {b}")
+
+
+def check_columns(columns: Columns, MAX_TXS: int, MAX_CALLDATA_BYTES: int):
+    """
+    Check the same constraints as check_rows, column by column.  The shifted
+    columns are compared as slices over the rows enabled by each selector, and
+    only the rows of a mismatch are checked one by one.
+    """
+    raw = columns.raw_public_inputs
+    acc = columns.rpi_rlc_acc
+    rand = columns.rand_rpi
+
+    def segment(column: List[int], rows: range) -> List[int]:
+        return column[rows.start : rows.stop]
+
+    # 0.1 rand_rpi[i] == rand_rpi[j]
+    rows = _enabled_rows(columns.q_not_end)
+    next_rand = _rotated(rand, rows.start + 1, len(rows))
+    _check_equal("rand_rpi", columns.q_not_end, rows, segment(rand, rows), next_rand)
+
+    # 0.0 rpi_rlc_acc[0] == RLC(raw_public_inputs, rand_rpi)
+    next_acc = _rotated(acc, rows.start + 1, len(rows))
+    acc_expr = [
+        (acc_next * r + value) % FQ.field_modulus
+        for acc_next, r, value in zip(next_acc, segment(rand, rows), segment(raw, rows))
+    ]
+    _check_equal("rpi_rlc_acc", columns.q_not_end, rows, segment(acc, rows), acc_expr)
+
+    rows = _enabled_rows(columns.q_end)
+    _check_equal("rpi_rlc_acc end", columns.q_end, rows, segment(acc, rows), segment(raw, rows))
+
+    # 0.2 Block table -> value column match with raw_public_inputs at expected offset
+    rows = _enabled_rows(columns.q_block_table)
+    _check_equal(
+        "block_table.value",
+        columns.q_block_table,
+        rows,
+        segment(columns.block_table_value, rows),
+        segment(raw, rows),
+    )
+
+    # 0.3 Tx table -> {tx_id, index, value} column match with raw_public_inputs at expected offset
+    rows = _enabled_rows(columns.q_tx_table)
+    tx_table_columns = [
+        ("tx_table.tx_id", columns.tx_table_tx_id),
+        ("tx_table.index", columns.tx_table_index),
+        ("tx_table.value", columns.tx_table_value),
+    ]
+    for (name, column), offset in zip(
+        tx_table_columns, tx_table_offsets(MAX_TXS, MAX_CALLDATA_BYTES)
+    ):
+        raw_at_offset = _rotated(raw, rows.start + offset, len(rows))
+        _check_equal(name, columns.q_tx_table, rows, segment(column, rows), raw_at_offset)
+
+
 @dataclass
 class Block:
     """Block header"""
@@ -207,26 +385,19 @@ class Transaction:
         column.append(FQ(1 if self.to_addr is None else 0))  # IsCreate
         column.append(FQ(self.value))  # Value
         column.append(FQ(len(self.data)))  # CallDataLength
-        call_data_gas_cost = sum(
-            [
-                (
-                    GAS_COST_TX_CALL_DATA_PER_ZERO_BYTE
-                    if byte == 0
-                    else GAS_COST_TX_CALL_DATA_PER_NON_ZERO_BYTE
-                )
-                for byte in self.data
-            ]
-        )
-        column.append(FQ(call_data_gas_cost))  # CallDataCost
+        column.append(FQ(call_data_gas_cost(self.data)))  # CallDataCost
         column.append(FQ(self.tx_sign_hash))  # TxSignHash
         return column
 
     def tx_table_tx_fields(self, index: int) -> Tuple[List[FQ], List[FQ], List[FQ]]:
         """Return the tx table contents corresponding to this tx.  Contains fields and no calldata"""
-        tx_id_col = [FQ(index + 1)] * TX_LEN
-        index_col = [FQ(0)] * TX_LEN
-        value_col = self.tx_table_value_column()
-        return (tx_id_col, index_col, value_col)
+        return tx_table_columns(self.iter_tx_table_tx_fields(index))
+
+    def iter_tx_table_tx_fields(self, index: int) -> Iterator[Tuple[int, int, int]]:
+        """Yield the (tx_id, index, value) tx table rows of this tx.  Contains no calldata"""
+        tx_id = index + 1
+        for value in self.tx_table_value_column():
+            yield (tx_id, 0, value.n)
 
 
 @dataclass
@@ -255,53 +426,54 @@ class PublicData:
 
     def tx_table_tx_fields(self, MAX_TXS: int) -> Tuple[List[FQ], List[FQ], List[FQ]]:
         """Return the tx table, static section with tx fields (no calldata)"""
-        tx_id_col = []
-        index_col = []
-        value_col = []
-        assert len(self.txs) <= MAX_TXS
-        for i in range(MAX_TXS):
-            tx = Transaction.default()
-            if i < len(self.txs):
-                tx = self.txs[i]
+        return tx_table_columns(self.iter_tx_table_tx_fields(MAX_TXS))
 
-            (tx_id_col_i, index_col_i, value_col_i) = tx.tx_table_tx_fields(i)
+    def tx_table_tx_calldata(self, MAX_CALLDATA_BYTES: int) -> Tuple[List[FQ], List[FQ], List[FQ]]:
+        """Return the tx table, dynamic section with calldata"""
+        return tx_table_columns(self.iter_tx_table_tx_calldata(MAX_CALLDATA_BYTES))
 
-            tx_id_col.extend(tx_id_col_i)
-            index_col.extend(index_col_i)
-            value_col.extend(value_col_i)
+    def tx_table(
+        self, MAX_TXS: int, MAX_CALLDATA_BYTES: int
+    ) -> Tuple[List[FQ], List[FQ], List[FQ]]:
+        """Return the complete tx table including the initial 0 row"""
+        return tx_table_columns(self.iter_tx_table(MAX_TXS, MAX_CALLDATA_BYTES))
 
-        return (tx_id_col, index_col, value_col)
+    def iter_tx_table_tx_fields(self, MAX_TXS: int) -> Iterator[Tuple[int, int, int]]:
+        """Yield the (tx_id, index, value) tx table rows, static section with tx fields"""
+        assert len(self.txs) <= MAX_TXS
+        for i in range(MAX_TXS):
+            tx = self.txs[i] if i < len(self.txs) else Transaction.default()
+            yield from tx.iter_tx_table_tx_fields(i)
 
-    def tx_table_tx_calldata(self, MAX_CALLDATA_BYTES: int) -> Tuple[List[FQ], List[FQ], List[FQ]]:
-        """Return the tx table, dynamic section with calldata"""
-        tx_id_col = []
-        index_col = []
-        value_col = []
+    def iter_tx_table_tx_calldata(self, MAX_CALLDATA_BYTES: int) -> Iterator[Tuple[int, int, int]]:
+        """Yield the (tx_id, index, value) tx table rows, dynamic section with calldata"""
+        calldata_len = sum(len(tx.data) for tx in self.txs)
+        assert calldata_len <= MAX_CALLDATA_BYTES
         for i, tx in enumerate(self.txs):
             for byte_index, byte in enumerate(tx.data):
-                tx_id_col.append(FQ(i + 1))
-                index_col.append(FQ(byte_index))
-                value_col.append(FQ(byte))
+                yield (i + 1, byte_index, byte)
+        for _ in range(MAX_CALLDATA_BYTES - calldata_len):
+            yield (0, 0, 0)
 
-        assert len(value_col) <= MAX_CALLDATA_BYTES
-        calldata_padding = [FQ(0)] * (MAX_CALLDATA_BYTES - len(value_col))
-        tx_id_col.extend(calldata_padding)
-        index_col.extend(calldata_padding)
-        value_col.extend(calldata_padding)
+    def iter_tx_table(
+        self, MAX_TXS: int, MAX_CALLDATA_BYTES: int
+    ) -> Iterator[Tuple[int, int, int]]:
+        """Yield the (tx_id, index, value) rows of the complete tx table, with the 0 row"""
+        yield (0, 0, 0)
+        yield from self.iter_tx_table_tx_fields(MAX_TXS)
+        yield from self.iter_tx_table_tx_calldata(MAX_CALLDATA_BYTES)
 
-        return (tx_id_col, index_col, value_col)
 
-    def tx_table(
-        self, MAX_TXS: int, MAX_CALLDATA_BYTES: int
-    ) -> Tuple[List[FQ], List[FQ], List[FQ]]:
-        """Return the complete tx table including the initial 0 row"""
-        tx_fields = self.tx_table_tx_fields(MAX_TXS)
-        tx_calldata = self.tx_table_tx_calldata(MAX_CALLDATA_BYTES)
-        return (
-            [FQ(0)] + tx_fields[0] + tx_calldata[0],
-            [FQ(0)] + tx_fields[1] + tx_calldata[1],
-            [FQ(0)] + tx_fields[2] + tx_calldata[2],
-        )
+def tx_table_columns(rows: Iterable[Tuple[int, int, int]]) -> Tuple[List[FQ], List[FQ], List[FQ]]:
+    """Return the tx_id, index and value columns of (tx_id, index, value) tx table rows"""
+    tx_id_col: List[FQ] = []
+    index_col: List[FQ] = []
+    value_col: List[FQ] = []
+    for tx_id, index, value in rows:
+        tx_id_col.append(FQ(tx_id))
+        index_col.append(FQ(index))
+        value_col.append(FQ(value))
+    return (tx_id_col, index_col, value_col)
 
 
 def public_data2witness(
@@ -309,76 +481,72 @@ def public_data2witness(
 ) -> Witness:
     # NOTE: Begin rlc calculation of raw_public_inputs.  This logic must be
     # implemented by the verifier.
-    raw_public_inputs = []
+    tx_table_len = TX_LEN * MAX_TXS + 1 + MAX_CALLDATA_BYTES
+    n_rows = BLOCK_LEN + 1 + EXTRA_LEN + 3 * tx_table_len
+    raw_public_inputs = [0] * n_rows
 
     # Block table
     block_table_value_col = public_data.block_table_value_column()
-    raw_public_inputs.extend(block_table_value_col)  # start offset = 0
+    assert len(block_table_value_col) == BLOCK_LEN + 1
+    for i, block_value in enumerate(block_table_value_col):  # start offset = 0
+        raw_public_inputs[i] = block_value.n
 
     # Extra fields
-    raw_public_inputs.append(FQ(public_data.block.hash))  # start offset = BLOCK_LEN + 1 (for 0 row)
-    raw_public_inputs.append(FQ(public_data.block.state_root))
-    raw_public_inputs.append(FQ(public_data.state_root_prev))
-
-    # Tx Table
-    tx_table = public_data.tx_table(MAX_TXS, MAX_CALLDATA_BYTES)
-    raw_public_inputs.extend(tx_table[0])  # start offset = BLOCK_LEN + 1 + EXTRA_LEN
-    raw_public_inputs.extend(
-        tx_table[1]
-    )  # start offset += (TX_LEN * MAX_TXS + 1 + MAX_CALLDATA_BYTES)
-    raw_public_inputs.extend(
-        tx_table[2]
-    )  # start offset += (TX_LEN * MAX_TXS + 1 + MAX_CALLDATA_BYTES)
-
-    assert len(raw_public_inputs) == BLOCK_LEN + 1 + EXTRA_LEN + 3 * (
-        TX_LEN * MAX_TXS + 1 + MAX_CALLDATA_BYTES
-    )
-    rpi_rlc = linear_combine(raw_public_inputs, rand_rpi, range_check=False)
+    # start offset = BLOCK_LEN + 1 (for 0 row)
+    raw_public_inputs[BLOCK_LEN + 1] = FQ(public_data.block.hash).n
+    raw_public_inputs[BLOCK_LEN + 2] = FQ(public_data.block.state_root).n
+    raw_public_inputs[BLOCK_LEN + 3] = FQ(public_data.state_root_prev).n
+
+    # Tx Table, written in its columns and at its offsets in raw_public_inputs
+    # start offset = BLOCK_LEN + 1 + EXTRA_LEN, then
+    # start offset += (TX_LEN * MAX_TXS + 1 + MAX_CALLDATA_BYTES) for each column
+    tx_id_offset, index_offset, value_offset = tx_table_offsets(MAX_TXS, MAX_CALLDATA_BYTES)
+    tx_table_tx_id_col = [0] * n_rows
+    tx_table_index_col = [0] * n_rows
+    tx_table_value_col = [0] * n_rows
+    n_tx_table_rows = 0
+    for i, (tx_id, index, value) in enumerate(
+        public_data.iter_tx_table(MAX_TXS, MAX_CALLDATA_BYTES)
+    ):
+        tx_table_tx_id_col[i] = raw_public_inputs[tx_id_offset + i] = tx_id
+        tx_table_index_col[i] = raw_public_inputs[index_offset + i] = index
+        tx_table_value_col[i] = raw_public_inputs[value_offset + i] = value
+        n_tx_table_rows += 1
+    assert n_tx_table_rows == tx_table_len
+
+    # Accumulate the RLC from the bottom to the top in a single pass, which
+    # leaves the RLC of all the raw_public_inputs in the first row.
+    rpi_rlc_acc_col = [0] * n_rows
+    acc, r, modulus = 0, rand_rpi.n, FQ.field_modulus
+    for i in range(n_rows - 1, -1, -1):
+        acc = (acc * r + raw_public_inputs[i]) % modulus
+        rpi_rlc_acc_col[i] = acc
+    rpi_rlc = FQ(rpi_rlc_acc_col[0])
     # NOTE: End rlc calculation of raw_public_inputs.
 
-    rpi_rlc_acc_col = [raw_public_inputs[-1]]
-    for i in reversed(range(len(raw_public_inputs) - 1)):
-        rpi_rlc_acc_col.append(rpi_rlc_acc_col[-1] * rand_rpi + raw_public_inputs[i])
-    rpi_rlc_acc_col = list(reversed(rpi_rlc_acc_col))
-
-    rows = []
-    for i in range(len(raw_public_inputs)):
-        q_end = FQ(1) if i == len(raw_public_inputs) - 1 else FQ(0)
-        q_not_end = FQ(1) - q_end
-        block_row = BlockTableRow(FQ(0))
-
-        q_block_table = FQ(0)
-        if i < BLOCK_LEN + 1:
-            q_block_table = FQ(1)
-            block_row = BlockTableRow(block_table_value_col[i])
-
-        q_tx_table = FQ(0)
-        tx_row = TxTableRow(FQ(0), FQ(0), FQ(0), FQ(0))
-        if i < TX_LEN * MAX_TXS + 1 + MAX_CALLDATA_BYTES:
-            q_tx_table = FQ(1)
-            tx_id = tx_table[0][i]
-            index = tx_table[1][i]
-            value = tx_table[2][i]
-            tag = FQ(TxTag.CallData)
-            if i == 0:
-                tag = FQ(0)
-            elif i < TX_LEN * MAX_TXS + 1:
-                # Iterate over TxTag values (until TxTag.TxSignHash) in a cycle
-                tag = FQ((i % TX_LEN))
-            tx_row = TxTableRow(tx_id, tag, index, value)
-
-        row = Row(
-            q_block_table,
-            block_row,
-            q_tx_table,
-            tx_row,
-            raw_public_inputs[i],
-            rpi_rlc_acc_col[i],
-            rand_rpi,
-            q_end,
-            q_not_end,
-        )
-        rows.append(row)
+    def pad(column: List[int]) -> List[int]:
+        return column + [0] * (n_rows - len(column))
+
+    # The tag iterates over TxTag values (until TxTag.TxSignHash) in a cycle
+    tx_table_tag_col = (
+        [0]
+        + [i % TX_LEN for i in range(1, TX_LEN * MAX_TXS + 1)]
+        + [TxTag.CallData] * MAX_CALLDATA_BYTES
+    )
+    columns = Columns(
+        q_block_table=pad([1] * (BLOCK_LEN + 1)),
+        block_table_value=pad(raw_public_inputs[: BLOCK_LEN + 1]),
+        q_tx_table=pad([1] * tx_table_len),
+        tx_table_tx_id=tx_table_tx_id_col,
+        tx_table_tag=pad(tx_table_tag_col),
+        tx_table_index=tx_table_index_col,
+        tx_table_value=tx_table_value_col,
+        raw_public_inputs=raw_public_inputs,
+        rpi_rlc_acc=rpi_rlc_acc_col,
+        rand_rpi=[r] * n_rows,
+        q_end=[0] * (n_rows - 1) + [1],
+        q_not_end=[1] * (n_rows - 1) + [0],
+    )
 
     public_inputs = PublicInputs(
         rand_rpi,
@@ -387,4 +555,4 @@ def public_data2witness(
         FQ(public_data.block.state_root),
         FQ(public_data.state_root_prev),
     )
-    return Witness(rows, public_inputs)
+    return Witness(columns, public_inputs)
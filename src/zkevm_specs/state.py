@@ -1,13 +1,50 @@
-from typing import NamedTuple, Tuple, List, Set, Dict, Optional
+from __future__ import annotations
+from typing import (
+    IO,
+    Any,
+    Union,
+    Callable,
+    NamedTuple,
+    Tuple,
+    List,
+    Iterable,
+    Iterator,
+    Sequence,
+    Set,
+    Dict,
+    Optional,
+)
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
 from enum import IntEnum
+from itertools import compress
 from math import log, ceil
+from operator import attrgetter, eq, ge, itemgetter, not_, or_
+from struct import unpack
+import heapq
+import json
+import os
+import pickle
+import tempfile
 
 from zkevm_specs.evm.table import MPTProofType
 
-from .util import FQ, RLC, U160, U256, Expression, linear_combine
+from .util import (
+    FQ,
+    RLC,
+    U160,
+    U256,
+    ConstraintFailure,
+    Expression,
+    FailureReport,
+    linear_combine,
+    require,
+)
 from .encoding import U8, is_circuit_code
 from .evm import (
     RW,
+    RWTableRow,
+    RWTableTag,
     AccountFieldTag,
     CallContextFieldTag,
     TxLogFieldTag,
@@ -29,6 +66,7 @@ TAG_BITS = ceil(log(MAX_TAG + 1, 2))  # 4
 ID_BITS = ceil(log(MAX_ID + 1, 2))  # 28
 ADDRESS_BITS = ceil(log(MAX_ADDRESS + 1, 2))  # 160
 FIELD_TAG_BITS = ceil(log(MAX_FIELD_TAG + 1, 2))  # 5
+SORT_MEMORY_BUDGET = 2**20  # Operations sorted in memory before spilling to disk
 
 
 class Tag(IntEnum):
@@ -107,15 +145,179 @@ class Row(NamedTuple):
         return self.key4_bytes
 
 
+class PackedRow:
+    """
+    State circuit row holding plain ints instead of field elements.  It has
+    the interface of Row, whose field elements are built on demand, so it can
+    be checked as a Row while taking a fraction of its memory.  The address
+    limbs and the storage key bytes are witness columns like in Row, so they
+    are kept as assigned and checked against the address and the storage key.
+    """
+
+    __slots__ = (
+        "_rw_counter",
+        "_is_write",
+        "_tag",
+        "_id",
+        "_address",
+        "_field_tag",
+        "_storage_key_rlc",
+        "_address_limbs",
+        "_storage_key_bytes",
+        "_value",
+        "_committed_value",
+        "_root",
+    )
+
+    def __init__(
+        self,
+        rw_counter: int,
+        is_write: int,
+        tag: int,
+        id: int,
+        address: int,
+        field_tag: int,
+        storage_key_rlc: int,
+        address_limbs: Tuple[int, ...],
+        storage_key_bytes: Tuple[int, ...],
+        value: int,
+        committed_value: int,
+        root: int,
+    ):
+        assert len(address_limbs) == 10, "Address should have 10 limbs"
+        assert len(storage_key_bytes) == 32, "Storage key should have 32 bytes"
+        self._rw_counter = rw_counter
+        self._is_write = is_write
+        self._tag = tag
+        self._id = id
+        self._address = address
+        self._field_tag = field_tag
+        self._storage_key_rlc = storage_key_rlc
+        self._address_limbs = address_limbs
+        self._storage_key_bytes = storage_key_bytes
+        self._value = value
+        self._committed_value = committed_value
+        self._root = root
+
+    @classmethod
+    def from_row(cls, row: Row) -> PackedRow:
+        return cls(
+            row.rw_counter.n,
+            row.is_write.n,
+            row.tag().n,
+            row.id().n,
+            row.address().n,
+            row.field_tag().n,
+            row.storage_key().n,
+            tuple(limb.n for limb in row.address_limbs()),
+            tuple(b.n for b in row.storage_key_bytes()),
+            row.value.n,
+            row.committed_value.n,
+            row.root.n,
+        )
+
+    def to_row(self) -> Row:
+        return Row(
+            self.rw_counter,
+            self.is_write,
+            self.keys,
+            self.key2_limbs,  # type: ignore
+            self.key4_bytes,  # type: ignore
+            self.value,
+            self.committed_value,
+            self.root,
+        )
+
+    def _fields(self) -> Tuple[Any, ...]:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, PackedRow) and self._fields() == other._fields()
+
+    def __hash__(self) -> int:
+        return hash(self._fields())
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name[1:]}={getattr(self, name)}" for name in self.__slots__)
+        return f"PackedRow({fields})"
+
+    @property
+    def rw_counter(self) -> FQ:
+        return FQ(self._rw_counter)
+
+    @property
+    def is_write(self) -> FQ:
+        return FQ(self._is_write)
+
+    @property
+    def keys(self) -> Tuple[FQ, FQ, FQ, FQ, FQ]:
+        return (self.tag(), self.id(), self.address(), self.field_tag(), self.storage_key())
+
+    @property
+    def key2_limbs(self) -> Tuple[FQ, ...]:
+        return tuple(map(FQ, self._address_limbs))
+
+    @property
+    def key4_bytes(self) -> Tuple[FQ, ...]:
+        return tuple(map(FQ, self._storage_key_bytes))
+
+    @property
+    def value(self) -> FQ:
+        return FQ(self._value)
+
+    @property
+    def committed_value(self) -> FQ:
+        return FQ(self._committed_value)
+
+    @property
+    def root(self) -> FQ:
+        return FQ(self._root)
+
+    def tag(self):
+        return FQ(self._tag)
+
+    def id(self):
+        return FQ(self._id)
+
+    def address(self):
+        return FQ(self._address)
+
+    def address_limbs(self):
+        return self.key2_limbs
+
+    def field_tag(self):
+        return FQ(self._field_tag)
+
+    def storage_key(self):
+        return FQ(self._storage_key_rlc)
+
+    def storage_key_bytes(self):
+        return self.key4_bytes
+
+
+# Either representation of a state circuit row
+StateRow = Union[Row, PackedRow]
+
+# Mock MPT updates by the (address, field_tag, storage_key) of the Account and
+# Storage Operations
+MPTUpdates = Dict[Tuple[FQ, FQ, FQ], MPTTableRow]
+
+
 class Tables:
     """
     Tables used for lookup from the state circuit.
     """
 
     mpt_table: Set[MPTTableRow]
+    # MPT table rows by (address, proof_type, storage_key)
+    mpt_index: Dict[Tuple[int, int, int], Set[MPTTableRow]]
 
     def __init__(self, mpt_table: Set[MPTTableRow]):
         self.mpt_table = mpt_table
+        self.mpt_index = {}
+        for row in mpt_table:
+            key = (row.address.expr().n, row.proof_type.expr().n, row.storage_key.expr().n)
+            self.mpt_index.setdefault(key, set()).add(row)
 
     def mpt_lookup(
         self,
@@ -136,14 +338,18 @@ class Tables:
             "root": root,
             "root_prev": root_prev,
         }
-        return lookup(MPTTableRow, self.mpt_table, query)
+        # Only the rows with the same (address, proof_type, storage_key) can
+        # match, so the lookup is done among them.
+        key = (address.expr().n, proof_type.expr().n, storage_key.expr().n)
+        return lookup(MPTTableRow, self.mpt_index.get(key, set()), query)
 
 
 # Boolean Expression builder
-def all_keys_eq(row: Row, row_prev: Row) -> bool:
+def all_keys_eq(row: StateRow, row_prev: StateRow) -> bool:
+    keys, keys_prev = row.keys, row_prev.keys
     eq = True
-    for i in range(len(row.keys)):
-        eq = eq and (row.keys[i] == row_prev.keys[i])
+    for i in range(len(keys)):
+        eq = eq and (keys[i] == keys_prev[i])
     return eq
 
 
@@ -155,22 +361,97 @@ class LowerThanGadget:
         self.lhs = lhs
         self.rhs = rhs
 
-    def verify(self):
+    def lt(self) -> bool:
         lt = self.lhs[0].n < self.rhs[0].n
         for i in range(1, len(self.lhs)):
             lt = self.lhs[i].n < self.rhs[i].n or (self.lhs[i] == self.rhs[i] and lt)
-        assert lt
+        return lt
+
+    def verify(self):
+        require(self.lt())
+
+
+assert TAG_BITS + ID_BITS == 2 * 16
+
+ORDERING_LIMBS = 31
+ORDERING_KEY_MASK = 2 ** (16 * ORDERING_LIMBS) - 1
+# Name of the key held by each 16 bit limb of the ordering key, from the most
+# significant limb
+ORDERING_LIMB_KEYS = (
+    ["tag/id"] * 2 + ["address"] * 10 + ["field_tag"] + ["storage_key"] * 16 + ["rw_counter"] * 2
+)
+
+
+def _pack_ordering_key(
+    tag: int, id: int, address: int, field_tag: int, storage_key: int, rw_counter: int
+) -> int:
+    v = tag
+    v = v * 2**ID_BITS + id  # 2 limbs
+    v = v * 2**ADDRESS_BITS + address  # + 10 limbs = 12 limbs
+    v = v * 2**16 + field_tag  # + 1 limb = 13 limbs
+    v = v * (2**32) + storage_key  # + 16 limbs = 29 limbs
+    v = v * 2**RW_COUNTER_BITS + rw_counter  # + 2 limbs = 31 limbs
+    return v & ORDERING_KEY_MASK
+
+
+def ordering_key(row: StateRow) -> int:
+    """
+    Pack all the keys and rw_counter used for the lexicographic ordering into
+    an integer of 31 16 bit limbs.  The field ordering is (from most
+    significant to less significant):
+    - tag
+    - id
+    - address
+    - field_tag
+    - storage_key
+    - rw_counter
+    """
+    storage_key = sum(b.n << (8 * i) for i, b in enumerate(row.storage_key_bytes()))
+    return _pack_ordering_key(
+        row.tag().n,
+        row.id().n,
+        row.address().n,
+        row.field_tag().n,
+        storage_key,
+        row.rw_counter.n,
+    )
+
+
+def ordering_limbs(key: int) -> List[FQ]:
+    """
+    Little-Endian list of the 16 bit limbs of an ordering key
+    """
+    limbs = []
+    for i in range(ORDERING_LIMBS):
+        limbs.append(FQ(key & 0xFFFF))
+        key = key >> 16
+    return limbs
+
+
+def explain_ordering_failure(key_prev: int, key: int) -> str:
+    limbs_prev = ordering_limbs(key_prev)
+    limbs = ordering_limbs(key)
+    if LowerThanGadget(limbs_prev, limbs).lt():
+        return "Keys are in order"
+    for i in reversed(range(ORDERING_LIMBS)):
+        if limbs_prev[i] != limbs[i]:
+            name = ORDERING_LIMB_KEYS[ORDERING_LIMBS - 1 - i]
+            return (
+                f"Keys are not in order: limb {i} ({name}) decreases "
+                f"from {limbs_prev[i].n:#x} to {limbs[i].n:#x}"
+            )
+    return "Keys are not in order: all the keys and rw_counter are equal to the previous row"
 
 
 @is_circuit_code
 def assert_in_range(x: FQ, min_val: int, max_val: int) -> None:
-    assert min_val <= x.n and x.n <= max_val
+    require(min_val <= x.n and x.n <= max_val)
 
 
 @is_circuit_code
 def check_start(row: Row, row_prev: Row):
     # 1.0. rw_counter is 0
-    assert row.rw_counter == 0
+    require(row.rw_counter == 0)
 
 
 @is_circuit_code
@@ -179,15 +460,15 @@ def check_memory(row: Row, row_prev: Row):
     get_memory_address = lambda row: row.address()
 
     # 2.0. Unused keys are 0
-    assert row.field_tag() == 0
-    assert row.storage_key() == 0
+    require(row.field_tag() == 0)
+    require(row.storage_key() == 0)
 
     # 2.1. First access for a set of all keys
     #
     # When the set of all keys changes (first access of an address in a call)
     # - If READ, value must be 0
     if not all_keys_eq(row, row_prev) and row.is_write == 0:
-        assert row.value == 0
+        require(row.value == 0)
 
     # 2.2. mem_addr in range
     assert_in_range(get_memory_address(row), 0, MAX_MEMORY_ADDRESS)
@@ -196,7 +477,7 @@ def check_memory(row: Row, row_prev: Row):
     assert_in_range(row.value, 0, 2**8 - 1)
 
     # 2.4 state root does not change
-    assert row.root == row_prev.root
+    require(row.root == row_prev.root)
 
 
 @is_circuit_code
@@ -205,8 +486,8 @@ def check_stack(row: Row, row_prev: Row):
     get_stack_ptr = lambda row: row.address()
 
     # 3.0. Unused keys are 0
-    assert row.field_tag() == 0
-    assert row.storage_key() == 0
+    require(row.field_tag() == 0)
+    require(row.storage_key() == 0)
 
     # 3.1. First access for a set of all keys
     #
@@ -216,7 +497,7 @@ def check_stack(row: Row, row_prev: Row):
     # When the set of all keys changes (first access of a stack position in a call)
     # - It must be a WRITE
     if not all_keys_eq(row, row_prev):
-        assert row.is_write == 1
+        require(row.is_write == 1)
 
     # 3.2. stack_ptr in range
     stack_ptr = get_stack_ptr(row)
@@ -228,13 +509,13 @@ def check_stack(row: Row, row_prev: Row):
         assert_in_range(stack_ptr_diff, 0, 1)
 
     # 3.4 state root does not change
-    assert row.root == row_prev.root
+    require(row.root == row_prev.root)
 
 
 @is_circuit_code
 def check_storage(row: Row, row_prev: Row, row_next: Row, tables: Tables):
     # 4.0. Unused keys are 0
-    assert row.field_tag() == 0
+    require(row.field_tag() == 0)
 
     # 4.1. MPT lookup for last access to (address, storage_key)
     if not all_keys_eq(row, row_next):
@@ -248,7 +529,7 @@ def check_storage(row: Row, row_prev: Row, row_next: Row, tables: Tables):
             row_prev.root,
         )
     else:
-        assert row.root == row_prev.root
+        require(row.root == row_prev.root)
 
 
 @is_circuit_code
@@ -257,11 +538,11 @@ def check_call_context(row: Row, row_prev: Row):
     get_field_tag = lambda row: row.field_tag()
 
     # 5.0. Unused keys are 0
-    assert row.address() == 0
-    assert row.storage_key() == 0
+    require(row.address() == 0)
+    require(row.storage_key() == 0)
 
     # 5.1 state root does not change
-    assert row.root == row_prev.root
+    require(row.root == row_prev.root)
 
     # TODO: Missing constraints
 
@@ -274,8 +555,8 @@ def check_account(row: Row, row_prev: Row, row_next: Row, tables: Tables):
     proof_type = MPTProofType.from_account_field_tag(field_tag)
 
     # 6.0. Unused keys are 0
-    assert row.id() == 0
-    assert row.storage_key() == 0
+    require(row.id() == 0)
+    require(row.storage_key() == 0)
 
     # 6.2. MPT storage lookup for last access to (address, field_tag)
     if not all_keys_eq(row, row_next):
@@ -289,7 +570,7 @@ def check_account(row: Row, row_prev: Row, row_next: Row, tables: Tables):
             row_prev.root,
         )
     else:
-        assert row.root == row_prev.root
+        require(row.root == row_prev.root)
 
     # NOTE: Value transition rules are constrained via the EVM circuit: for example,
     # Nonce only increases by 1 or decreases by 1 (on revert).
@@ -300,12 +581,12 @@ def check_tx_refund(row: Row, row_prev: Row):
     get_tx_id = lambda row: row.id()
 
     # 7.0. Unused keys are 0
-    assert row.address() == 0
-    assert row.field_tag() == 0
-    assert row.storage_key() == 0
+    require(row.address() == 0)
+    require(row.field_tag() == 0)
+    require(row.storage_key() == 0)
 
     # 7.1 state root does not change
-    assert row.root == row_prev.root
+    require(row.root == row_prev.root)
 
     # TODO: Missing constraints
     # - When keys change, value must be 0
@@ -317,11 +598,11 @@ def check_tx_access_list_account(row: Row, row_prev: Row):
     get_addr = lambda row: row.address()
 
     # 9.0. Unused keys are 0
-    assert row.field_tag() == 0
-    assert row.storage_key() == 0
+    require(row.field_tag() == 0)
+    require(row.storage_key() == 0)
 
     # 9.1 state root does not change
-    assert row.root == row_prev.root
+    require(row.root == row_prev.root)
 
     # TODO: Missing constraints
     # - When keys change, value must be 0
@@ -334,10 +615,10 @@ def check_tx_access_list_account_storage(row: Row, row_prev: Row):
     get_storage_key = lambda row: row.storage_key()
 
     # 8.0. Unused keys are 0
-    assert row.field_tag() == 0
+    require(row.field_tag() == 0)
 
     # 8.1 State root cannot change
-    assert row.root == row_prev.root
+    require(row.root == row_prev.root)
 
     # TODO: state root does not change
     # - When keys change, value must be 0
@@ -348,9 +629,9 @@ def check_account_destructed(row: Row, row_prev: Row):
     get_addr = lambda row: row.address()
 
     # 10.0. Unused keys are 0
-    assert row.id() == 0
-    assert row.field_tag() == 0
-    assert row.storage_key() == 0
+    require(row.id() == 0)
+    require(row.field_tag() == 0)
+    require(row.storage_key() == 0)
 
     # TODO: Missing constraints
     # - When keys change, value must be 0
@@ -365,10 +646,10 @@ def check_tx_log(row: Row, row_prev: Row):
     prev_tx_id = row_prev.id()
 
     # 12.0 is_write is always true
-    assert row.is_write == 1
+    require(row.is_write == 1)
 
     # 12.1 state root does not change
-    assert row.root == row_prev.root
+    require(row.root == row_prev.root)
 
     # removed field_tag-specific constraints as issue
     # https://github.com/privacy-scaling-explorations/zkevm-specs/issues/221
@@ -380,32 +661,40 @@ def check_tx_receipt(row: Row, row_prev: Row):
     pre_tx_id = row_prev.id()
     field_tag = row.field_tag()
     # 11.0. Unused keys are 0
-    assert row.address() == 0
-    assert row.storage_key() == 0
+    require(row.address() == 0)
+    require(row.storage_key() == 0)
 
     # 11.1 value for tag `PostStateOrStatus` is bool (0 or 1) according to EIP#658
     if field_tag == U256(TxReceiptFieldTag.PostStateOrStatus):
-        assert row.value in [0, 1]
+        require(row.value in [0, 1])
 
     # 11.2 when tx id changes, must be increasing by one , the CumulativeGasUsed must be increasing as well
     if tx_id != pre_tx_id and row.tag() == row_prev.tag():
-        assert tx_id == pre_tx_id + 1
+        require(tx_id == pre_tx_id + 1)
         if field_tag == U256(TxReceiptFieldTag.CumulativeGasUsed):
-            assert row.value.n > row_prev.value.n
+            require(row.value.n > row_prev.value.n)
 
     # 11.3 tx id starts with 1
     if row.tag() != row_prev.tag():
         # first row the tx id is 1
-        assert tx_id == FQ(1)
+        require(tx_id == FQ(1))
 
     assert_in_range(tx_id, 1, 2**11)
 
     # 11.4 state root does not change
-    assert row.root == row_prev.root
+    require(row.root == row_prev.root)
 
 
 @is_circuit_code
-def check_state_row(row: Row, row_prev: Row, row_next: Row, tables: Tables, randomness: FQ):
+def check_state_row(
+    row: StateRow,
+    row_prev: StateRow,
+    row_next: StateRow,
+    tables: Tables,
+    randomness: FQ,
+    key_prev: Optional[int] = None,
+    key: Optional[int] = None,
+):
     #
     # Constraints that affect all rows, no matter which Tag they use
     #
@@ -420,13 +709,13 @@ def check_state_row(row: Row, row_prev: Row, row_next: Row, tables: Tables, rand
     # 0.1. address is linear combination of 10 x 16bit limbs and also in range
     for limb in row.address_limbs():
         assert_in_range(limb, 0, 2**16 - 1)
-    assert row.address() == linear_combine(row.address_limbs(), FQ(2**16), range_check=False)
+    require(row.address() == linear_combine(row.address_limbs(), FQ(2**16), range_check=False))
 
     # 0.2. address is RLC encoded
-    assert row.storage_key() == linear_combine(row.storage_key_bytes(), randomness)
+    require(row.storage_key() == linear_combine(row.storage_key_bytes(), randomness))
 
     # 0.3. is_write is boolean
-    assert row.is_write in [0, 1]
+    require(row.is_write in [0, 1])
 
     # 0.4. Keys and RWC are sorted in lexicographic order for same Tag
     #
@@ -447,36 +736,17 @@ def check_state_row(row: Row, row_prev: Row, row_next: Row, tables: Tables, rand
     # spec different from the implementation, and plan to update the
     # implementation to follow the spec in the future.
 
-    assert TAG_BITS + ID_BITS == 2 * 16
-
-    # Return a list of 16 bit limbs with all the keys and rw_counter used for
-    # the lexicographic ordering.  The field ordering is (from most significant
-    # to less significant):
-    # - tag
-    # - id
-    # - address
-    # - field_tag
-    # - storage_key
-    # - rw_counter
-    def keys_rwc_to_limbs_in_order(row: Row) -> List[FQ]:
-        v = row.tag().n
-        v = v * 2**ID_BITS + row.id().n  # 2 limbs
-        v = v * 2**ADDRESS_BITS + row.address().n  # + 10 limbs = 12 limbs
-        v = v * 2**16 + row.field_tag().n  # + 1 limb = 13 limbs
-        v = v * (2**32) + int.from_bytes(
-            map(lambda b: b.n, row.storage_key_bytes()), "little"
-        )  # + 16 limbs = 29 limbs
-        v = v * 2**RW_COUNTER_BITS + row.rw_counter.n  # + 2 limbs = 31 limbs
-        limbs = []
-        for i in range(31):
-            limbs.append(FQ(v & 0xFFFF))
-            v = v >> 16
-        return limbs
-
-    limbs_prev = keys_rwc_to_limbs_in_order(row_prev)
-    limbs = keys_rwc_to_limbs_in_order(row)
+    # The ordering key of each row packs all the keys and rw_counter, and is
+    # computed once per row: comparing the packed integers is equivalent to
+    # the LowerThanGadget over their 16 bit limbs, which are only decomposed
+    # to explain a failure.
     if row.tag() != Tag.Start:
-        LowerThanGadget(limbs_prev, limbs).verify()
+        if key_prev is None:
+            key_prev = ordering_key(row_prev)
+        if key is None:
+            key = ordering_key(row)
+        if key_prev >= key:
+            raise AssertionError(explain_ordering_failure(key_prev, key))
 
     # 0.5. Read consistency
     #
@@ -484,46 +754,331 @@ def check_state_row(row: Row, row_prev: Row, row_next: Row, tables: Tables, rand
     # AND When all the keys are equal in two consecutive a rows:
     # - The corresponding value must be equal to the previous row
     if row.is_write == 0 and all_keys_eq(row, row_prev):
-        assert row.value == row_prev.value
+        require(row.value == row_prev.value)
 
     if all_keys_eq(row, row_prev):
-        assert row.committed_value == row_prev.committed_value
+        require(row.committed_value == row_prev.committed_value)
 
     # 8. RWC !=0 except for Tag.Start
     if row.tag() != Tag.Start:
-        assert row.rw_counter != 0
+        require(row.rw_counter != 0)
 
-    #
-    # Constraints specific to each Tag
-    #
-    if row.tag() == Tag.Start:
+    check_tag_constraints(row, row_prev, row_next, tables)
+
+
+@is_circuit_code
+def check_tag_constraints(row: StateRow, row_prev: StateRow, row_next: StateRow, tables: Tables):
+    """
+    Constraints specific to each Tag
+    """
+    tag = row.tag().n
+    if tag == Tag.Start:
         check_start(row, row_prev)
-    elif row.tag() == Tag.Memory:
+    elif tag == Tag.Memory:
         check_memory(row, row_prev)
-    elif row.tag() == Tag.Stack:
+    elif tag == Tag.Stack:
         check_stack(row, row_prev)
-    elif row.tag() == Tag.Storage:
+    elif tag == Tag.Storage:
         check_storage(row, row_prev, row_next, tables)
-    elif row.tag() == Tag.CallContext:
+    elif tag == Tag.CallContext:
         check_call_context(row, row_prev)
-    elif row.tag() == Tag.Account:
+    elif tag == Tag.Account:
         check_account(row, row_prev, row_next, tables)
-    elif row.tag() == Tag.TxRefund:
+    elif tag == Tag.TxRefund:
         check_tx_refund(row, row_prev)
-    elif row.tag() == Tag.TxAccessListAccountStorage:
+    elif tag == Tag.TxAccessListAccountStorage:
         check_tx_access_list_account_storage(row, row_prev)
-    elif row.tag() == Tag.TxAccessListAccount:
+    elif tag == Tag.TxAccessListAccount:
         check_tx_access_list_account(row, row_prev)
-    elif row.tag() == Tag.AccountDestructed:
+    elif tag == Tag.AccountDestructed:
         check_account_destructed(row, row_prev)
-    elif row.tag() == Tag.TxReceipt:
+    elif tag == Tag.TxReceipt:
         check_tx_receipt(row, row_prev)
-    elif row.tag() == Tag.TxLog:
+    elif tag == Tag.TxLog:
         check_tx_log(row, row_prev)
     else:
         raise ValueError("Unreacheable")
 
 
+def _out_of_range(column: List[int], min_val: int, max_val: int) -> Iterable[int]:
+    if not column or (min(column) >= min_val and max(column) <= max_val):
+        return ()
+    return (idx for idx, v in enumerate(column) if not min_val <= v <= max_val)
+
+
+def _mismatches(lhs: List[Any], rhs: List[Any]) -> Iterable[int]:
+    # Indices where two columns differ, only searched row by row when the
+    # columns aren't equal
+    if lhs == rhs:
+        return ()
+    return (idx for idx, (a, b) in enumerate(zip(lhs, rhs)) if a != b)
+
+
+def _rotated(column: List[Any]) -> List[Any]:
+    # Values of column[idx - 1] for each idx, wrapping around at the start
+    return column[-1:] + column[:-1]
+
+
+def common_constraint_failures(
+    rows: Sequence[StateRow], randomness: FQ
+) -> Tuple[Set[int], List[int]]:
+    """
+    Check the constraints shared by all Tags (0.0 to 0.5 and 8) column by
+    column over the integer values of the rows, wrapping around at the ends of
+    the table.  Columns are compared as whole lists, and only searched row by
+    row for the failing rows on a mismatch.  Returns the indices of the failing
+    rows, and the ordering key of each row as returned by `ordering_key`.
+    """
+    if len(rows) == 0:
+        return set(), []
+    value_of = attrgetter("n")
+    all_keys = [tuple(map(value_of, row.keys)) for row in rows]
+    tags, ids, addresses, field_tags, storage_key_rlcs = map(list, zip(*all_keys))
+    rw_counters = [row.rw_counter.n for row in rows]
+    is_writes = [row.is_write.n for row in rows]
+    failures: Set[int] = set()
+
+    # 0.0. tag, id, field_tag are in the expected range
+    failures.update(_out_of_range(tags, 1, MAX_TAG))
+    failures.update(_out_of_range(ids, 0, MAX_ID))
+    failures.update(_out_of_range(field_tags, 0, MAX_FIELD_TAG))
+
+    # 0.1. The address limbs are the 16 bit Little-Endian decomposition of
+    # the address, which is equivalent to range checking the limbs and
+    # comparing their linear combination with the address.
+    failures.update(_out_of_range(addresses, 0, MAX_ADDRESS))
+    address_limbs = [tuple(map(value_of, row.key2_limbs)) for row in rows]
+    expected_limbs = [
+        unpack("<10H", (address & MAX_ADDRESS).to_bytes(20, "little")) for address in addresses
+    ]
+    failures.update(_mismatches(address_limbs, expected_limbs))
+
+    # 0.2. storage_key is the RLC of its bytes.  Rows often share a storage
+    # key (zero for all the Tags but Storage), so the value and RLC of each
+    # distinct list of bytes are computed once.
+    storage_key_bytes = [tuple(map(value_of, row.key4_bytes)) for row in rows]
+    storage_keys: Dict[Tuple[int, ...], int] = {}
+    rlcs: Dict[Tuple[int, ...], Optional[int]] = {}
+    for key_bytes in set(storage_key_bytes):
+        storage_keys[key_bytes] = sum(b << (8 * i) for i, b in enumerate(key_bytes))
+        rlc: Optional[int] = None
+        if max(key_bytes) < 256:
+            rlc = 0
+            for b in reversed(key_bytes):
+                rlc = (rlc * randomness.n + b) % FQ.field_modulus
+        rlcs[key_bytes] = rlc
+    failures.update(
+        _mismatches([rlcs[key_bytes] for key_bytes in storage_key_bytes], storage_key_rlcs)
+    )
+    keys = list(
+        map(
+            _pack_ordering_key,
+            tags,
+            ids,
+            addresses,
+            field_tags,
+            [storage_keys[key_bytes] for key_bytes in storage_key_bytes],
+            rw_counters,
+        )
+    )
+
+    # 0.3. is_write is boolean
+    failures.update(_out_of_range(is_writes, 0, 1))
+
+    # 0.4. Keys and RWC are sorted in lexicographic order
+    # 8. RWC !=0 except for Tag.Start
+    # Only the Start rows are expected among the candidates
+    unordered = map(ge, _rotated(keys), keys)
+    zero_rw_counters = map(not_, rw_counters)
+    candidates = compress(range(len(rows)), map(or_, unordered, zero_rw_counters))
+    failures.update(idx for idx in candidates if tags[idx] != Tag.Start)
+
+    # 0.5. Read consistency
+    values = [row.value.n for row in rows]
+    committed_values = [row.committed_value.n for row in rows]
+    for idx in compress(range(len(rows)), map(eq, _rotated(all_keys), all_keys)):
+        if committed_values[idx] != committed_values[idx - 1] or (
+            is_writes[idx] == 0 and values[idx] != values[idx - 1]
+        ):
+            failures.add(idx)
+
+    return failures, keys
+
+
+def verify_state_circuit(
+    rows: Sequence[StateRow],
+    tables: Tables,
+    randomness: FQ,
+    report: Optional[FailureReport] = None,
+):
+    """
+    Check all the rows of the state circuit, wrapping around at the ends of
+    the table.  With a report, failures are recorded in it instead of raised,
+    and checking stops once its failure budget is exhausted.
+
+    The constraints shared by all Tags are checked column-wise first; only the
+    rows failing them are checked again with `check_state_row` to explain the
+    failure, while the rest only go through the Tag specific constraints.
+    """
+    _verify_state_window(rows, range(len(rows)), 0, tables, randomness, report)
+
+
+def _verify_state_window(
+    rows: Sequence[StateRow],
+    indices: range,
+    offset: int,
+    tables: Tables,
+    randomness: FQ,
+    report: Optional[FailureReport],
+):
+    # Check rows[idx] for idx in indices, reporting them as row offset + idx
+    failures, keys = common_constraint_failures(rows, randomness)
+    for idx in indices:
+        row = rows[idx]
+        row_prev = rows[(idx - 1) % len(rows)]
+        row_next = rows[(idx + 1) % len(rows)]
+        key_prev = keys[(idx - 1) % len(rows)]
+        if idx in failures:
+            check: Callable[..., None] = check_state_row
+            args: Tuple = (row, row_prev, row_next, tables, randomness, key_prev, keys[idx])
+        else:
+            check, args = check_tag_constraints, (row, row_prev, row_next, tables)
+        if report is None:
+            check(*args)
+            continue
+        tag = Tag(row.tag().n).name if 1 <= row.tag().n <= MAX_TAG else None
+        report.check(offset + idx, tag, check, *args)
+        if report.exhausted():
+            return
+
+
+# Tables and randomness of the parallel verification, set once per worker
+# process by its initializer instead of being sent with every chunk.
+_worker_tables: Optional[Tables] = None
+_worker_randomness: Optional[FQ] = None
+
+
+def _init_state_worker(tables: Tables, randomness: FQ):
+    global _worker_tables, _worker_randomness
+    _worker_tables, _worker_randomness = tables, randomness
+
+
+def _verify_state_chunk(
+    window: List[StateRow], start: int, max_failures: Optional[int]
+) -> Tuple[List[ConstraintFailure], int]:
+    assert _worker_tables is not None and _worker_randomness is not None
+    report = None if max_failures is None else FailureReport(max_failures)
+    indices = range(1, len(window) - 1)
+    _verify_state_window(window, indices, start - 1, _worker_tables, _worker_randomness, report)
+    return ([], len(indices)) if report is None else (report.failures, report.n_checked)
+
+
+def verify_state_circuit_parallel(
+    rows: Sequence[StateRow],
+    tables: Tables,
+    randomness: FQ,
+    report: Optional[FailureReport] = None,
+    processes: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+):
+    """
+    Same as `verify_state_circuit`, with the rows split in chunks checked in a
+    pool of `processes` worker processes.  Since a row is only checked against
+    the previous and next rows, each chunk is sent with one extra row on each
+    side, wrapping around at the ends of the table.
+
+    Failures are reported with their index in `rows`, and the results of the
+    chunks are merged in order, so the outcome is the same as the sequential
+    verification: without a report the failure of the first failing row is
+    raised, and with a report checking stops once its failure budget is
+    exhausted.
+    """
+    if len(rows) == 0:
+        return
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if chunk_size is None:
+        # A few chunks per process to balance the load
+        chunk_size = -(-len(rows) // (4 * processes))
+    assert chunk_size > 0, "Chunk size should be positive"
+
+    max_failures = None if report is None else report.max_failures
+    with ProcessPoolExecutor(
+        processes, initializer=_init_state_worker, initargs=(tables, randomness)
+    ) as pool:
+        futures = []
+        for start in range(0, len(rows), chunk_size):
+            end = min(start + chunk_size, len(rows))
+            window = [rows[start - 1], *rows[start:end], rows[end % len(rows)]]
+            futures.append((start, pool.submit(_verify_state_chunk, window, start, max_failures)))
+
+        try:
+            for start, future in futures:
+                failures, n_checked = future.result()
+                if report is None:
+                    continue
+                for failure in failures:
+                    report.failures.append(failure)
+                    if report.exhausted():
+                        report.n_checked += failure.index - start + 1
+                        return
+                report.n_checked += n_checked
+        finally:
+            for _, future in futures:
+                future.cancel()
+
+
+def verify_state_rows(
+    rows: Iterable[StateRow],
+    tables: Tables,
+    randomness: FQ,
+    report: Optional[FailureReport] = None,
+):
+    """
+    Check a stream of state circuit rows, such as the ones yielded by
+    `iter_assign_state_circuit`, keeping only a window of three rows and the
+    first two rows in memory.  The table wraps around as in
+    `verify_state_circuit`, so the first row is checked last, once the last
+    row is known.
+    """
+
+    def check(
+        idx: int, row: StateRow, row_prev: StateRow, row_next: StateRow, key_prev: int, key: int
+    ) -> bool:
+        if report is None:
+            check_state_row(row, row_prev, row_next, tables, randomness, key_prev, key)
+            return True
+        tag = Tag(row.tag().n).name if 1 <= row.tag().n <= MAX_TAG else None
+        report.check(
+            idx, tag, check_state_row, row, row_prev, row_next, tables, randomness, key_prev, key
+        )
+        return not report.exhausted()
+
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return
+    first_key = ordering_key(first)
+    second = first
+
+    idx = 0
+    row_prev, key_prev = first, first_key
+    row, key = first, first_key
+    for row_next in rows:
+        key_next = ordering_key(row_next)
+        idx += 1
+        if idx == 1:
+            second = row_next
+        elif not check(idx - 1, row, row_prev, row_next, key_prev, key):
+            return
+        row_prev, key_prev = row, key
+        row, key = row_next, key_next
+
+    if idx > 0 and not check(idx, row, row_prev, first, key_prev, key):
+        return
+    check(0, first, row, second, key, first_key)
+
+
 # State circuit operation superclass
 class Operation(NamedTuple):
     """
@@ -731,6 +1286,87 @@ class TxReceiptOp(Operation):
         # fmt: on
 
 
+def _storage_key(key: Expression) -> int:
+    # The rw table holds storage keys RLC encoded, which can only be decoded
+    # from the RLC they were built with.
+    if not isinstance(key, RLC):
+        raise ValueError(f"Storage key {key} should be an RLC to be decoded")
+    return key.int_value
+
+
+def rw_table_to_operations(
+    rw_table: Iterable[RWTableRow],
+    n_rows: Optional[int] = None,
+    memory_budget: int = SORT_MEMORY_BUDGET,
+) -> List[Operation]:
+    """
+    Convert the rows of the EVM rw table, such as the ones built with
+    RWDictionary, to state circuit Operations sorted in the order of the rows
+    and padded at the start with StartOps up to `n_rows` Operations, or with a
+    single StartOp without `n_rows`.
+
+    The committed value of an Account is the value_prev of its first access,
+    and the one of a storage slot is the committed value of the transaction
+    kept in aux0.  The MPT table matching the rows of the Operations is
+    mocked with `mpt_table_from_last_accesses`.
+    """
+    ops: List[Operation] = []
+    # rw_counter and value_prev of the first access to each Account field
+    account_first_access: Dict[Tuple[int, int], Tuple[int, FQ]] = {}
+    # Index in ops and Account field of each Account Operation
+    account_ops: List[Tuple[int, Tuple[int, int]]] = []
+    for row in rw_table:
+        rw_counter = row.rw_counter.expr().n
+        rw = RW(row.rw.expr().n)
+        tag = RWTableTag(row.key0.expr().n)
+        key1, key2, key3 = row.key1.expr().n, row.key2.expr().n, row.key3.expr().n
+        value = row.value.expr()
+
+        op: Operation
+        if tag == RWTableTag.Start:
+            continue
+        elif tag == RWTableTag.Memory:
+            op = MemoryOp(rw_counter, rw, key1, U160(key2), U8(value.n))
+        elif tag == RWTableTag.Stack:
+            op = StackOp(rw_counter, rw, key1, key2, value)
+        elif tag == RWTableTag.AccountStorage:
+            key = U256(_storage_key(row.key4))
+            op = StorageOp(rw_counter, rw, key1, U160(key2), key, value, row.aux0.expr())
+        elif tag == RWTableTag.CallContext:
+            op = CallContextOp(rw_counter, rw, key1, CallContextFieldTag(key2), value)
+        elif tag == RWTableTag.Account:
+            op = AccountOp(rw_counter, rw, U160(key2), AccountFieldTag(key3), value, FQ(0))
+            first_access = account_first_access.get((key2, key3))
+            if first_access is None or rw_counter < first_access[0]:
+                account_first_access[key2, key3] = (rw_counter, row.value_prev.expr())
+            account_ops.append((len(ops), (key2, key3)))
+        elif tag == RWTableTag.TxRefund:
+            op = TxRefundOp(rw_counter, rw, key1, value)
+        elif tag == RWTableTag.TxAccessListAccount:
+            op = TxAccessListAccountOp(rw_counter, rw, key1, U160(key2), value)
+        elif tag == RWTableTag.TxAccessListAccountStorage:
+            key = U256(_storage_key(row.key3))
+            op = TxAccessListAccountStorageOp(rw_counter, rw, key1, U160(key2), key, value)
+        elif tag == RWTableTag.AccountDestructed:
+            op = AccountDestructedOp(rw_counter, rw, U160(key2), value)
+        elif tag == RWTableTag.TxLog:
+            log_id, field_tag, index = key2 >> 48, (key2 >> 32) & 0xFFFF, key2 & 0xFFFFFFFF
+            op = TxLogOp(rw_counter, rw, key1, log_id, TxLogFieldTag(field_tag), index, value)
+        elif tag == RWTableTag.TxReceipt:
+            op = TxReceiptOp(rw_counter, rw, key1, TxReceiptFieldTag(key3), value)
+        else:
+            raise ValueError("Unreacheable")
+        ops.append(op)
+
+    for idx, account_field in account_ops:
+        ops[idx] = ops[idx]._replace(committed_value=account_first_access[account_field][1])
+
+    n_start_ops = 1 if n_rows is None else n_rows - len(ops)
+    if n_start_ops < 1:
+        raise ValueError(f"{len(ops) + 1} rows are needed, but only {n_rows} are available")
+    return [StartOp() for _ in range(n_start_ops)] + list(sort_operations(ops, memory_budget))
+
+
 def op2row(
     op: Operation,
     randomness: FQ,
@@ -767,40 +1403,213 @@ def op2row(
     )
 
 
-# Generate the advice Rows from a list of Operations
-def assign_state_circuit(ops: List[Operation], randomness: FQ) -> List[Row]:
-    mpt_updates = _mock_mpt_updates(ops, randomness)
+def op2packed_row(
+    op: Operation,
+    randomness: FQ,
+    root: FQ,
+) -> PackedRow:
+    storage_key_rlc = RLC(op.storage_key, randomness)
+    return PackedRow(
+        op.rw_counter,
+        0 if op.rw == RW.Read else 1,
+        int(op.tag),
+        int(op.id),
+        int(op.address),
+        int(op.field_tag),
+        storage_key_rlc.expr().n,
+        unpack("<10H", int(op.address).to_bytes(20, "little")),
+        tuple(storage_key_rlc.le_bytes),
+        FQ(op.value).n,
+        FQ(op.committed_value).n,
+        root.n,
+    )
+
+
+def operation_sort_key(op: Operation) -> int:
+    """
+    Integer key of an Operation in the order of the state circuit rows, which
+    is the ordering key of the Row assigned from it.
+    """
+    return _pack_ordering_key(
+        int(op.tag),
+        int(op.id),
+        int(op.address),
+        int(op.field_tag),
+        int(op.storage_key),
+        op.rw_counter,
+    )
+
+
+def _spill_run(run: List[Tuple[int, Operation]], tmp_dir: Optional[str]) -> IO[bytes]:
+    fp = tempfile.TemporaryFile(dir=tmp_dir)
+    for key, op in run:
+        # Operation subclasses take their own constructor arguments, so the
+        # fields are stored and the op is rebuilt with `_make`.
+        pickle.dump((key, type(op), tuple(op)), fp, pickle.HIGHEST_PROTOCOL)
+    fp.seek(0)
+    return fp
+
 
-    # MPT keys for each Storage and Account row, and None otherwise.
-    mpt_keys = [_mpt_key(op) for op in ops]
-    # MPT updates for each Storage and Account row, and None otherwise.
-    updates = [None if key is None else mpt_updates.get(key) for key in mpt_keys]
-    # root_prev for each Storage and Account row, and None otherwise.
-    roots = [None if update is None else update.root_prev.expr() for update in updates]
+def _load_run(fp: IO[bytes]) -> Iterator[Tuple[int, Operation]]:
+    while True:
+        try:
+            key, op_type, fields = pickle.load(fp)
+        except EOFError:
+            return
+        yield key, op_type._make(fields)
 
+
+def sort_operations(
+    ops: Iterable[Operation],
+    memory_budget: int = SORT_MEMORY_BUDGET,
+    tmp_dir: Optional[str] = None,
+) -> Iterator[Operation]:
+    """
+    Sort Operations, which usually come in rw_counter order, in the order of
+    the state circuit rows.  Operations with equal keys keep their order.
+
+    At most `memory_budget` Operations are sorted in memory.  Larger inputs
+    are split in sorted runs which are spilled to temporary files in `tmp_dir`
+    and merged back while the Operations are consumed.
+    """
+    assert memory_budget > 0, "Memory budget should be positive"
+    runs: List[IO[bytes]] = []
+    run: List[Tuple[int, Operation]] = []
+    try:
+        for op in ops:
+            run.append((operation_sort_key(op), op))
+            if len(run) == memory_budget:
+                run.sort(key=itemgetter(0))
+                runs.append(_spill_run(run, tmp_dir))
+                run = []
+        run.sort(key=itemgetter(0))
+        if not runs:
+            yield from map(itemgetter(1), run)
+            return
+        # heapq.merge keeps the order of the runs for equal keys, so the sort
+        # is stable.
+        merged = heapq.merge(*map(_load_run, runs), iter(run), key=itemgetter(0))
+        yield from map(itemgetter(1), merged)
+    finally:
+        for fp in runs:
+            fp.close()
+
+
+# Generate the advice Rows from a list of Operations.  With `sort`, the
+# Operations are first sorted in the order of the rows with `sort_operations`.
+def assign_state_circuit(ops: Iterable[Operation], randomness: FQ, sort: bool = False) -> List[Row]:
+    rows, _ = assign_state_circuit_with_mpt_updates(ops, randomness, sort)
+    return rows
+
+
+def assign_state_circuit_with_mpt_updates(
+    ops: Iterable[Operation], randomness: FQ, sort: bool = False
+) -> Tuple[List[Row], MPTUpdates]:
+    """
+    Same as `assign_state_circuit`, also returning the mock MPT updates the
+    rows are assigned with, so the MPT table can be built from their values
+    instead of computing them again.
+    """
+    if sort:
+        ops = list(sort_operations(ops))
+    elif not isinstance(ops, Sequence):
+        ops = list(ops)
+    mpt_updates = mock_mpt_updates(ops, randomness)
+    rows = [op2row(op, randomness, root) for op, root in _iter_op_roots(ops, mpt_updates)]
+    return rows, mpt_updates
+
+
+def iter_assign_state_circuit(
+    ops: Sequence[Operation], randomness: FQ, mpt_updates: Optional[MPTUpdates] = None
+) -> Iterator[Row]:
+    """
+    Lazily assign the advice Rows of a list of Operations, so that they can be
+    checked with `verify_state_rows` without holding all of them in memory.
+    The mock MPT updates of the Operations are computed unless given.
+    """
+    if mpt_updates is None:
+        mpt_updates = mock_mpt_updates(ops, randomness)
+    for op, root in _iter_op_roots(ops, mpt_updates):
+        yield op2row(op, randomness, root)
+
+
+def iter_assign_packed_state_circuit(
+    ops: Sequence[Operation], randomness: FQ, mpt_updates: Optional[MPTUpdates] = None
+) -> Iterator[PackedRow]:
+    """
+    Same as `iter_assign_state_circuit`, but yielding PackedRows.
+    """
+    if mpt_updates is None:
+        mpt_updates = mock_mpt_updates(ops, randomness)
+    for op, root in _iter_op_roots(ops, mpt_updates):
+        yield op2packed_row(op, randomness, root)
+
+
+def _iter_op_roots(
+    ops: Sequence[Operation], mpt_updates: MPTUpdates
+) -> Iterator[Tuple[Operation, FQ]]:
     # With real mpt updates, the final root would be obtained from the public
     # input. For _mock_mpt_updates, it's just 3 + 5 * number of MPT updates.
     final_root = FQ(3 + 5 * len(mpt_updates))
-    roots.append(final_root)
-
-    # Fill in the None roots with the first non-None value that comes after it.
-    root: FQ = final_root
-    for i in reversed(range(len(roots))):
-        maybe_root = roots[i]
-        if maybe_root is None:
-            roots[i] = root
-        else:
-            root = maybe_root
 
-    rows = []
-    for op, maybe_root in zip(ops, roots[1:]):
-        assert maybe_root is not None
-        rows.append(op2row(op, randomness, maybe_root))
-    return rows
+    # Each row takes the root_prev of the MPT update of the next Storage or
+    # Account row, or the final root when there is none.  The index of that
+    # row is found by scanning ahead of the rows, which visits each Operation
+    # once overall.
+    next_mpt_idx = 0
+    root = final_root
+    for idx, op in enumerate(ops):
+        if next_mpt_idx <= idx:
+            next_mpt_idx = idx + 1
+            root = final_root
+            while next_mpt_idx < len(ops):
+                mpt_key = _mpt_key(ops[next_mpt_idx])
+                if mpt_key is not None:
+                    root = mpt_updates[mpt_key].root_prev.expr()
+                    break
+                next_mpt_idx += 1
+        yield op, root
+
+
+def mpt_table_from_ops(
+    ops: Iterable[Operation], randomness: FQ, sort: bool = False
+) -> Set[MPTTableRow]:
+    # The mock MPT updates follow the order of the rows, so Operations sorted
+    # by `assign_state_circuit` must be sorted here too.
+    return set(mock_mpt_updates(ops, randomness, sort).values())
+
+
+def mpt_table_from_last_accesses(ops: Iterable[Operation], randomness: FQ) -> Set[MPTTableRow]:
+    """
+    Mock MPT table of Operations with several accesses to the same Account
+    field or storage slot, such as the ones of `rw_table_to_operations`.  The
+    mock MPT updates take the values of the first access to each key, while
+    the state circuit looks up the last one, so the table is mocked from the
+    last access to each key.
+    """
+    last_accesses: Dict[Tuple[FQ, FQ, FQ], Operation] = {}
+    for op in ops:
+        mpt_key = _mpt_key(op)
+        if mpt_key is not None:
+            last_accesses[mpt_key] = op
+    return set(_mock_mpt_updates(last_accesses.values(), randomness).values())
 
 
-def mpt_table_from_ops(ops: List[Operation], randomness: FQ) -> Set[MPTTableRow]:
-    return set(_mock_mpt_updates(ops, randomness).values())
+def mock_mpt_updates(ops: Iterable[Operation], randomness: FQ, sort: bool = False) -> MPTUpdates:
+    """
+    Mock MPT updates of the Account and Storage Operations, sorted first with
+    `sort_operations` when `sort` is set.
+    """
+    return _mock_mpt_updates(sort_operations(ops) if sort else ops, randomness)
+
+
+def _storage_key_rlc(storage_key: int, randomness: FQ) -> FQ:
+    # Same as RLC(storage_key, randomness).expr(), computed on ints
+    rlc = 0
+    if storage_key != 0:
+        for byte in reversed(storage_key.to_bytes(32, "little")):
+            rlc = (rlc * randomness.n + byte) % FQ.field_modulus
+    return FQ(rlc)
 
 
 def _mpt_key(op: Operation) -> Optional[Tuple[FQ, FQ, FQ]]:
@@ -809,10 +1618,10 @@ def _mpt_key(op: Operation) -> Optional[Tuple[FQ, FQ, FQ]]:
     return (FQ(op.address), FQ(op.field_tag), FQ(op.storage_key))
 
 
-def _mock_mpt_updates(ops: List[Operation], randomness: FQ) -> Dict[Tuple[FQ, FQ, FQ], MPTTableRow]:
+def _mock_mpt_updates(ops: Iterable[Operation], randomness: FQ) -> MPTUpdates:
     # makes fake mpt updates for a list of rows. the state root starts at 5 and
     # is incremented by 3 for each Account or Storage MPT update.
-    mpt_map = {}
+    mpt_map: MPTUpdates = {}
 
     root = 3
     for op in ops:
@@ -829,7 +1638,7 @@ def _mock_mpt_updates(ops: List[Operation], randomness: FQ) -> Dict[Tuple[FQ, FQ
         mpt_map[mpt_key] = MPTTableRow(
             FQ(op.address),
             FQ(proof_type),
-            RLC(op.storage_key, randomness).expr(),
+            _storage_key_rlc(op.storage_key, randomness),
             FQ(new_root),
             FQ(root),
             op.value,
@@ -838,3 +1647,84 @@ def _mock_mpt_updates(ops: List[Operation], randomness: FQ) -> Dict[Tuple[FQ, FQ
         root = new_root
 
     return mpt_map
+
+
+# Range checks of check_state_row done for every row: tag, id and field_tag,
+# the 10 address limbs and the 32 storage key bytes
+COMMON_RANGE_CHECKS = 3 + 10 + 32
+# Range checks of the Tag specific constraints.  Stack rows do one more when
+# the previous row is a Stack row of the same call.
+TAG_RANGE_CHECKS = {Tag.Memory: 2, Tag.Stack: 1, Tag.TxReceipt: 1}
+
+
+@dataclass
+class TagStats:
+    rows: int = 0
+    # Number of distinct keys
+    keys: int = 0
+    # Longest run of consecutive rows with the same keys
+    longest_run: int = 0
+    range_check_lookups: int = 0
+
+
+class StateCircuitStats:
+    """
+    Workload of the state circuit per Tag: the rows each Tag contributes, the
+    cardinality of its keys, its longest run of rows with the same keys, and
+    the range check lookups that `check_state_row` does for its rows.
+    """
+
+    tags: Dict[Tag, TagStats]
+
+    def __init__(self, tags: Dict[Tag, TagStats]) -> None:
+        self.tags = tags
+
+    def rows(self) -> int:
+        return sum(stats.rows for stats in self.tags.values())
+
+    def range_check_lookups(self) -> int:
+        return sum(stats.range_check_lookups for stats in self.tags.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "rows": self.rows(),
+            "range_check_lookups": self.range_check_lookups(),
+            "tags": {tag.name: asdict(stats) for tag, stats in self.tags.items()},
+        }
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.to_dict(), **kwargs)
+
+
+def state_circuit_stats(ops_or_rows: Iterable[Union[Operation, StateRow]]) -> StateCircuitStats:
+    """
+    Collect the workload statistics of a list of Operations or Rows, in the
+    order of the state circuit rows.  Only the distinct keys of each Tag are
+    kept in memory.
+    """
+    tags: Dict[Tag, TagStats] = {}
+    keys: Dict[Tag, Set[Tuple[int, ...]]] = {}
+    prev_keys: Optional[Tuple[int, ...]] = None
+    run = 0
+    for op_or_row in ops_or_rows:
+        if isinstance(op_or_row, Operation):
+            op = op_or_row
+            row_keys = tuple(map(int, (op.tag, op.id, op.address, op.field_tag, op.storage_key)))
+        else:
+            row_keys = tuple(key.n for key in op_or_row.keys)
+
+        tag = Tag(row_keys[0])
+        stats = tags.setdefault(tag, TagStats())
+        stats.rows += 1
+        keys.setdefault(tag, set()).add(row_keys)
+        run = run + 1 if row_keys == prev_keys else 1
+        stats.longest_run = max(stats.longest_run, run)
+        stats.range_check_lookups += COMMON_RANGE_CHECKS + TAG_RANGE_CHECKS.get(tag, 0)
+        # 3.3. stack_ptr only increases by 0 or 1 in the same call
+        if tag == Tag.Stack and prev_keys is not None and prev_keys[:2] == row_keys[:2]:
+            stats.range_check_lookups += 1
+        prev_keys = row_keys
+
+    for tag, stats in tags.items():
+        stats.keys = len(keys[tag])
+    return StateCircuitStats(tags)
@@ -1,19 +1,35 @@
+import json
+import os
+from bisect import bisect_right
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from .encoding import is_circuit_code
-from typing import NamedTuple, Tuple, List, Set, Union
+from typing import (
+    Dict,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    List,
+    Set,
+    Union,
+    overload,
+)
 from .util import (
     FQ,
     RLC,
     U160,
     U256,
     U64,
+    keccak256,
     linear_combine,
-    GAS_COST_TX_CALL_DATA_PER_NON_ZERO_BYTE,
-    GAS_COST_TX_CALL_DATA_PER_ZERO_BYTE,
+    call_data_gas_cost,
 )
 from eth_keys import KeyAPI  # type: ignore
 import rlp  # type: ignore
-from eth_utils import keccak
-from .evm import TxContextFieldTag as Tag
+from .evm import KeccakTable, TxContextFieldTag as Tag
 
 
 class Row:
@@ -33,36 +49,6 @@ class Row:
         self.value = value
 
 
-# TODO: Review if the keccak table layout used here matches the final keccak
-# lookup table layout in the spec.
-# - Keccak input spec PR https://github.com/privacy-scaling-explorations/zkevm-specs/pull/147
-# - Tracking issue https://github.com/privacy-scaling-explorations/zkevm-specs/issues/158
-class KeccakTable:
-    # The columns are: (is_enabled, input_rlc, input_len, output_rlc)
-    table: Set[Tuple[FQ, FQ, FQ, FQ]]
-
-    def __init__(self):
-        self.table = set()
-        self.table.add((FQ(0), FQ(0), FQ(0), FQ(0)))  # Add all 0s row
-
-    def add(self, input: bytes, randomness: FQ):
-        output = keccak(input)
-        self.table.add(
-            (
-                FQ(1),
-                RLC(bytes(reversed(input)), randomness, n_bytes=64).expr(),
-                FQ(len(input)),
-                RLC(output, randomness).expr(),
-            )
-        )
-
-    def lookup(self, is_enabled: FQ, input_rlc: FQ, input_len: FQ, output_rlc: FQ, assert_msg: str):
-        assert (is_enabled, input_rlc, input_len, output_rlc) in self.table, (
-            f"{assert_msg}: {(is_enabled, input_rlc, input_len, output_rlc)} "
-            + "not found in the lookup table"
-        )
-
-
 class WrongFieldInteger:
     """
     Wrong Field arithmetic Integer, representing the implementation at
@@ -105,6 +91,45 @@ class Secp256k1ScalarField(WrongFieldInteger):
         WrongFieldInteger.__init__(self, value)
 
 
+# Maximum number of verified signatures remembered by ECDSAVerifyChip.verify
+VERIFIED_SIGNATURES_CACHE_SIZE = 2**12
+
+# Signatures that passed verification, keyed by the little-endian bytes of
+# (msg_hash, r, s, (pub_key_x, pub_key_y)) and ordered by last use.  Only
+# valid signatures are stored, so a hit never hides a failure.
+_verified_signatures: OrderedDict[Tuple[bytes, bytes, bytes, Tuple[bytes, bytes]], None] = (
+    OrderedDict()
+)
+_verified_signatures_hits = 0
+_verified_signatures_misses = 0
+
+
+class SignatureCacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+def signature_cache_info() -> SignatureCacheInfo:
+    """
+    Returns the hits, misses, maxsize and currsize of the verified signatures
+    cache.
+    """
+    return SignatureCacheInfo(
+        _verified_signatures_hits,
+        _verified_signatures_misses,
+        VERIFIED_SIGNATURES_CACHE_SIZE,
+        len(_verified_signatures),
+    )
+
+
+def signature_cache_clear():
+    global _verified_signatures_hits, _verified_signatures_misses
+    _verified_signatures.clear()
+    _verified_signatures_hits = _verified_signatures_misses = 0
+
+
 class ECDSAVerifyChip:
     """
     ECDSA Signature Verification Chip.  This represents an ECDSA signature
@@ -147,18 +172,30 @@ class ECDSAVerifyChip:
         return cls(self_signature, self_pub_key, self_msg_hash)
 
     def verify(self, assert_msg: str):
-        msg_hash = bytes(reversed(self.msg_hash.to_le_bytes()))
-        sig_r = int.from_bytes(self.signature[0].to_le_bytes(), "little")
-        sig_s = int.from_bytes(self.signature[1].to_le_bytes(), "little")
-        signature = KeyAPI.Signature(vrs=[0, sig_r, sig_s])
-        public_key = KeyAPI.PublicKey(
-            bytes(reversed(self.pub_key[0].to_le_bytes()))
-            + bytes(reversed(self.pub_key[1].to_le_bytes()))
+        global _verified_signatures_hits, _verified_signatures_misses
+        msg_hash = self.msg_hash.to_le_bytes()
+        sig_r = self.signature[0].to_le_bytes()
+        sig_s = self.signature[1].to_le_bytes()
+        pub_key = self.pub_key[0].to_le_bytes(), self.pub_key[1].to_le_bytes()
+        key = (msg_hash, sig_r, sig_s, pub_key)
+        if key in _verified_signatures:
+            _verified_signatures_hits += 1
+            _verified_signatures.move_to_end(key)
+            return
+        _verified_signatures_misses += 1
+
+        signature = KeyAPI.Signature(
+            vrs=[0, int.from_bytes(sig_r, "little"), int.from_bytes(sig_s, "little")]
         )
+        public_key = KeyAPI.PublicKey(pub_key[0][::-1] + pub_key[1][::-1])
         assert KeyAPI().ecdsa_verify(
-            msg_hash, signature, public_key
+            msg_hash[::-1], signature, public_key
         ), f"{assert_msg}: ecdsa_verify failed"
 
+        _verified_signatures[key] = None
+        if len(_verified_signatures) > VERIFIED_SIGNATURES_CACHE_SIZE:
+            _verified_signatures.popitem(last=False)
+
 
 class SignVerifyChip:
     """
@@ -193,7 +230,7 @@ class SignVerifyChip:
     def assign(
         cls, signature: KeyAPI.Signature, pub_key: KeyAPI.PublicKey, msg_hash: bytes, randomness: FQ
     ):
-        pub_key_hash = keccak(pub_key.to_bytes())
+        pub_key_hash = keccak256(pub_key.to_bytes())
         self_pub_key_hash = RLC(pub_key_hash, randomness)
         self_address = FQ(int.from_bytes(pub_key_hash[-20:], "big"))
         self_msg_hash_rlc = RLC(int.from_bytes(msg_hash, "big"), randomness).expr()
@@ -211,13 +248,12 @@ class SignVerifyChip:
 
         # 1. Verify that keccak(pub_key_bytes) = pub_key_hash by keccak table
         # lookup, where pub_key_bytes is built from the pub_key in the
-        # ecdsa_chip
-        pub_key_bytes = bytes(reversed(self.pub_key_x_bytes)) + bytes(
-            reversed(self.pub_key_y_bytes)
-        )
+        # ecdsa_chip.  The little-endian pub_key_bytes are the little-endian
+        # y bytes followed by the little-endian x bytes.
+        pub_key_le_bytes = self.pub_key_y_bytes + self.pub_key_x_bytes
         keccak_table.lookup(
             is_not_padding,
-            is_not_padding * RLC(bytes(reversed(pub_key_bytes)), randomness, n_bytes=64).expr(),
+            is_not_padding * RLC(pub_key_le_bytes, randomness, n_bytes=64).expr(),
             is_not_padding * FQ(64),
             is_not_padding * self.pub_key_hash.expr(),
             assert_msg,
@@ -240,10 +276,151 @@ class SignVerifyChip:
         self.ecdsa_chip.verify(assert_msg)
 
 
+class TxTableRows(Sequence[Row]):
+    """
+    Tx table rows with virtual padding and CallData rows.  The pad rows in the
+    front of the fixed region and in the back of the dynamic region are ranges
+    of indices, and the CallData rows are a view of the calldata of the txs.
+    Iterating creates the virtual rows on the fly, so the memory scales
+    with the fixed rows of the txs instead of the capacity of the circuit and
+    the size of the calldata.  A virtual row accessed or assigned by index is
+    kept, so it can be modified in place.
+    """
+
+    front_padding: range
+    fixed_rows: List[Row]  # Fixed rows of the txs
+    call_data: range  # CallData rows of the txs
+    back_padding: range
+    # tx_id and calldata of the txs with calldata, and the index of the first
+    # CallData row of each of them
+    txs_call_data: List[Tuple[FQ, bytes]]
+    txs_call_data_start: List[int]
+    # Virtual rows accessed or assigned by index, which replace the rows
+    # created on the fly
+    virtual_rows: Dict[int, Row]
+    back_padding_row: Row  # Shared by the pad rows in the back when iterating
+
+    def __init__(
+        self,
+        n_front_padding: int,
+        fixed_rows: List[Row],
+        txs_call_data: List[Tuple[FQ, bytes]],
+        n_back_padding: int,
+    ):
+        self.front_padding = range(n_front_padding)
+        self.fixed_rows = fixed_rows
+        start = n_front_padding + len(fixed_rows)
+        self.txs_call_data = []
+        self.txs_call_data_start = []
+        for tx_id, call_data in txs_call_data:
+            if len(call_data) > 0:
+                self.txs_call_data.append((tx_id, call_data))
+                self.txs_call_data_start.append(start)
+                start += len(call_data)
+        self.call_data = range(n_front_padding + len(fixed_rows), start)
+        self.back_padding = range(start, start + n_back_padding)
+        self.virtual_rows = {}
+        self.back_padding_row = Row(FQ(0), FQ(Tag.Pad), FQ(0), FQ(0))
+
+    def _virtual_row(self, index: int) -> Row:
+        if index in self.back_padding:
+            return Row(FQ(0), FQ(Tag.Pad), FQ(0), FQ(0))
+        if index in self.front_padding:
+            # Front pad rows use a sequential id starting at 1 in the tx_id field
+            return Row(FQ(index + 1), FQ(Tag.Pad), FQ(0), FQ(0))
+        tx_index = bisect_right(self.txs_call_data_start, index) - 1
+        tx_id, call_data = self.txs_call_data[tx_index]
+        byte_index = index - self.txs_call_data_start[tx_index]
+        return Row(tx_id, FQ(Tag.CallData), FQ(byte_index), FQ(call_data[byte_index]))
+
+    def __len__(self) -> int:
+        return self.back_padding.stop
+
+    @overload
+    def __getitem__(self, index: int) -> Row: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Row]: ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        index = self._check_index(index)
+        if 0 <= index - len(self.front_padding) < len(self.fixed_rows):
+            return self.fixed_rows[index - len(self.front_padding)]
+        row = self.virtual_rows.get(index)
+        if row is None:
+            row = self.virtual_rows[index] = self._virtual_row(index)
+        return row
+
+    def __setitem__(self, index: int, row: Row):
+        index = self._check_index(index)
+        if 0 <= index - len(self.front_padding) < len(self.fixed_rows):
+            self.fixed_rows[index - len(self.front_padding)] = row
+        else:
+            self.virtual_rows[index] = row
+
+    def _check_index(self, index: int) -> int:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Tx table row index out of range")
+        return index
+
+    def __iter__(self) -> Iterator[Row]:
+        for index in self.front_padding:
+            row = self.virtual_rows.get(index)
+            yield self._virtual_row(index) if row is None else row
+        yield from self.fixed_rows
+        for (tx_id, call_data), start in zip(self.txs_call_data, self.txs_call_data_start):
+            for byte_index, byte in enumerate(call_data):
+                row = self.virtual_rows.get(start + byte_index)
+                if row is None:
+                    row = Row(tx_id, FQ(Tag.CallData), FQ(byte_index), FQ(byte))
+                yield row
+        for index in self.back_padding:
+            row = self.virtual_rows.get(index)
+            yield self.back_padding_row if row is None else row
+
+
+class SignVerifications(Sequence[SignVerifyChip]):
+    """
+    SignVerifyChips of the txs, after the padding txs that all share the same
+    padding chip.
+    """
+
+    n_padding: int
+    padding: SignVerifyChip
+    chips: List[SignVerifyChip]
+
+    def __init__(self, n_padding: int, padding: SignVerifyChip, chips: List[SignVerifyChip]):
+        self.n_padding = n_padding
+        self.padding = padding
+        self.chips = chips
+
+    def __len__(self) -> int:
+        return self.n_padding + len(self.chips)
+
+    @overload
+    def __getitem__(self, index: int) -> SignVerifyChip: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[SignVerifyChip]: ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Sign verification index out of range")
+        return self.padding if index < self.n_padding else self.chips[index - self.n_padding]
+
+
 class Witness(NamedTuple):
-    rows: List[Row]  # Transaction table rows
+    rows: Sequence[Row]  # Transaction table rows
     keccak_table: KeccakTable
-    sign_verifications: List[SignVerifyChip]
+    sign_verifications: Sequence[SignVerifyChip]
 
 
 @is_circuit_code
@@ -260,6 +437,9 @@ def verify_circuit(
     rows = witness.rows
     sign_verifications = witness.sign_verifications
     keccak_table = witness.keccak_table
+    # Ids of the chips already verified.  The padding txs share the same
+    # chip, which only needs to be verified once.
+    verified_chips: Set[int] = set()
     for tx_index in range(MAX_TXS):
         assert_msg = f"Constraints failed for tx_index = {tx_index}"
         tx_row_index = tx_index * Tag.TxSignHash
@@ -269,7 +449,9 @@ def verify_circuit(
         # SignVerifyChip constraint verification.  Padding txs rows contain
         # 0 in all values.  The SignVerifyChip skips the verification when
         # the msg_hash_rlc == 0.
-        sign_verifications[tx_index].verify(keccak_table, randomness, assert_msg)
+        if id(sign_verifications[tx_index]) not in verified_chips:
+            sign_verifications[tx_index].verify(keccak_table, randomness, assert_msg)
+            verified_chips.add(id(sign_verifications[tx_index]))
 
         # 0. Copy constraints using fixed offsets between the tx rows and the SignVerifyChip
         assert rows[caller_addr_index].value == sign_verifications[tx_index].address, (
@@ -304,44 +486,167 @@ class Transaction(NamedTuple):
             return bytes(0)
         return self.to.to_bytes(20, "big")
 
+    def hash(self) -> bytes:
+        return keccak256(
+            rlp.encode(
+                [
+                    self.nonce,
+                    self.gas_price,
+                    self.gas,
+                    self.encode_to(),
+                    self.value,
+                    self.data,
+                    self.sig_v,
+                    self.sig_r,
+                    self.sig_s,
+                ]
+            )
+        )
+
+
+class TxWitnessCacheEntry(NamedTuple):
+    sign_hash: bytes
+    pub_key: bytes
+    sender: bytes
+    randomness: FQ  # Randomness used in the values of the rows
+    rows: List[Tuple[int, int, int]]  # (tag, index, value) of the fixed rows
+
+
+class TxWitnessCache:
+    """
+    On-disk cache of the witness of signed transactions, so a tx that was
+    already seen skips the recovery of the public key from its signature.
+    Its key still needs the tx hash, which costs about as much as the hashing
+    of the sign data and the public key that it replaces.
+
+    Each tx has its own file in the `path` directory, keyed by the tx hash and
+    the chain_id, with its sign hash, public key, sender and the fixed rows for
+    the last randomness it was used with.  The CallData rows are rebuilt from
+    the tx data.  An unreadable file is a miss, and is overwritten.  The cached
+    values are witness data, so a cache with wrong values makes the circuit
+    verification fail instead of going unnoticed.
+    """
+
+    path: str
+
+    def __init__(self, path: str) -> None:
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+
+    def key(self, tx: Transaction, chain_id: U64) -> str:
+        return f"{tx.hash().hex()}-{chain_id}"
+
+    def entry_path(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}.json")
+
+    def load(self, key: str) -> Optional[TxWitnessCacheEntry]:
+        try:
+            with open(self.entry_path(key)) as fp:
+                entry = json.load(fp)
+            return TxWitnessCacheEntry(
+                bytes.fromhex(entry["sign_hash"]),
+                bytes.fromhex(entry["pub_key"]),
+                bytes.fromhex(entry["sender"]),
+                FQ(entry["randomness"]),
+                [(tag, index, value) for tag, index, value in entry["rows"]],
+            )
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, TypeError):
+            # Not valid JSON, or fields missing or of the wrong type
+            return None
+
+    def save(self, key: str, entry: TxWitnessCacheEntry):
+        # Write then rename, so a crash or a concurrent writer never leaves a
+        # truncated entry
+        path = self.entry_path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as fp:
+            json.dump(
+                {
+                    "sign_hash": entry.sign_hash.hex(),
+                    "pub_key": entry.pub_key.hex(),
+                    "sender": entry.sender.hex(),
+                    "randomness": entry.randomness.n,
+                    "rows": entry.rows,
+                },
+                fp,
+            )
+        os.replace(tmp_path, path)
+
 
 def tx2witness(
-    index: int, tx: Transaction, chain_id: U64, randomness: FQ, keccak_table: KeccakTable
-) -> Tuple[List[Row], SignVerifyChip]:
+    index: int,
+    tx: Transaction,
+    chain_id: U64,
+    randomness: FQ,
+    keccak_table: KeccakTable,
+    cache: Optional[TxWitnessCache] = None,
+) -> Tuple[TxTableRows, SignVerifyChip]:
     """
     Generate the witness data for a single transaction: generate the tx table
     rows, insert the pub_key_bytes entry in the keccak_table and assign the
-    SignVerifyChip.
+    SignVerifyChip.  The CallData rows are a view of the calldata, as in
+    `txs2witness`.
     """
+    rows, sign_verification, pk_bytes = _tx2witness(index, tx, chain_id, randomness, cache)
+    keccak_table.add(pk_bytes, randomness)
+    return (TxTableRows(0, rows, [(FQ(index + 1), tx.data)], 0), sign_verification)
 
-    tx_sign_data = rlp.encode(
-        [tx.nonce, tx.gas_price, tx.gas, tx.encode_to(), tx.value, tx.data, chain_id, 0, 0]
-    )
-    tx_sign_hash = keccak(tx_sign_data)
+
+def _tx2witness(
+    index: int,
+    tx: Transaction,
+    chain_id: U64,
+    randomness: FQ,
+    cache: Optional[TxWitnessCache] = None,
+) -> Tuple[List[Row], SignVerifyChip, bytes]:
+    # Same as tx2witness without the CallData rows, returning the
+    # pub_key_bytes to insert in the keccak table instead of inserting them,
+    # so it can run in another process.
+    cache_key: Optional[str] = None
+    entry: Optional[TxWitnessCacheEntry] = None
+    if cache is not None:
+        # The tx is hashed once for the lookup and the update of its entry
+        cache_key = cache.key(tx, chain_id)
+        entry = cache.load(cache_key)
 
     sig_parity = tx.sig_v - 35 - chain_id * 2
     sig = KeyAPI.Signature(vrs=(sig_parity, tx.sig_r, tx.sig_s))
 
-    pk = sig.recover_public_key_from_msg_hash(tx_sign_hash)
-    pk_bytes = pk.to_bytes()
-    keccak_table.add(pk_bytes, randomness)
-    pk_hash = keccak(pk.to_bytes())
-    addr = pk_hash[-20:]
+    if entry is None:
+        tx_sign_data = rlp.encode(
+            [tx.nonce, tx.gas_price, tx.gas, tx.encode_to(), tx.value, tx.data, chain_id, 0, 0]
+        )
+        tx_sign_hash = keccak256(tx_sign_data)
 
-    sign_verification = SignVerifyChip.assign(sig, pk, tx_sign_hash, randomness)
+        pk = sig.recover_public_key_from_msg_hash(tx_sign_hash)
+        pk_bytes = pk.to_bytes()
+        pk_hash = keccak256(pk_bytes)
+        addr = pk_hash[-20:]
+    else:
+        tx_sign_hash, pk_bytes, addr = entry.sign_hash, entry.pub_key, entry.sender
+        pk = KeyAPI.PublicKey(pk_bytes)
 
-    call_data_gas_cost = sum(
-        [
-            (
-                GAS_COST_TX_CALL_DATA_PER_ZERO_BYTE
-                if byte == 0
-                else GAS_COST_TX_CALL_DATA_PER_NON_ZERO_BYTE
-            )
-            for byte in tx.data
-        ]
-    )
+    sign_verification = SignVerifyChip.assign(sig, pk, tx_sign_hash, randomness)
 
     tx_id = FQ(index + 1)
+    rows: List[Row]
+    if entry is not None and entry.randomness == randomness:
+        rows = [Row(tx_id, FQ(tag), FQ(i), FQ(value)) for tag, i, value in entry.rows]
+    else:
+        rows = _tx_fixed_rows(tx_id, tx, addr, tx_sign_hash, randomness)
+        if cache is not None and cache_key is not None:
+            fixed_rows = [(row.tag.n, row.index.n, row.value.n) for row in rows]
+            entry = TxWitnessCacheEntry(tx_sign_hash, pk_bytes, addr, randomness, fixed_rows)
+            cache.save(cache_key, entry)
+
+    return (rows, sign_verification, pk_bytes)
+
+
+def _tx_fixed_rows(
+    tx_id: FQ, tx: Transaction, addr: bytes, tx_sign_hash: bytes, randomness: FQ
+) -> List[Row]:
     rows: List[Row] = []
     rows.append(Row(tx_id, FQ(Tag.Nonce), FQ(0), FQ(tx.nonce)))
     rows.append(Row(tx_id, FQ(Tag.Gas), FQ(0), FQ(tx.gas)))
@@ -351,13 +656,10 @@ def tx2witness(
     rows.append(Row(tx_id, FQ(Tag.IsCreate), FQ(0), FQ(1) if tx.to is None else FQ(0)))
     rows.append(Row(tx_id, FQ(Tag.Value), FQ(0), RLC(tx.value, randomness).expr()))
     rows.append(Row(tx_id, FQ(Tag.CallDataLength), FQ(0), FQ(len(tx.data))))
-    rows.append(Row(tx_id, FQ(Tag.CallDataGasCost), FQ(0), FQ(call_data_gas_cost)))
+    rows.append(Row(tx_id, FQ(Tag.CallDataGasCost), FQ(0), FQ(call_data_gas_cost(tx.data))))
     tx_sign_hash_rlc = RLC(int.from_bytes(tx_sign_hash, "big"), randomness).expr()
     rows.append(Row(tx_id, FQ(Tag.TxSignHash), FQ(0), tx_sign_hash_rlc))
-    for byte_index, byte in enumerate(tx.data):
-        rows.append(Row(tx_id, FQ(Tag.CallData), FQ(byte_index), FQ(byte)))
-
-    return (rows, sign_verification)
+    return rows
 
 
 # Dummy signature, public key and message hash that passes verification used to
@@ -377,41 +679,61 @@ DUMMY_MSG_HASH = 0x0000000000000000000000000000000000000000000000000000000000000
 
 
 def txs2witness(
-    txs: List[Transaction], chain_id: U64, MAX_TXS: int, MAX_CALLDATA_BYTES: int, randomness: FQ
+    txs: List[Transaction],
+    chain_id: U64,
+    MAX_TXS: int,
+    MAX_CALLDATA_BYTES: int,
+    randomness: FQ,
+    processes: int = 1,
+    cache: Optional[TxWitnessCache] = None,
 ) -> Witness:
     """
     Generate the complete witness of the transactions for a fixed size circuit.
+
+    With more than one process, the witness of each transaction, dominated by
+    the recovery of its public key, is generated in a pool of `processes`
+    worker processes.  The results are merged in tx order, so the witness is
+    the same as the one generated serially.  With a cache, the txs found in it
+    reuse their cached witness data.
     """
     assert len(txs) <= MAX_TXS
-
-    keccak_table = KeccakTable()
+    assert processes > 0, "Number of processes should be positive"
+
+    n = len(txs)
+    args = (range(n), txs, [chain_id] * n, [randomness] * n, [cache] * n)
+    results: Iterable[Tuple[List[Row], SignVerifyChip, bytes]]
+    if processes == 1 or n <= 1:
+        results = map(_tx2witness, *args)
+    else:
+        with ProcessPoolExecutor(processes) as pool:
+            # Send a few chunks of txs to each process to balance the load
+            chunk_size = -(-n // (4 * processes))
+            results = list(pool.map(_tx2witness, *args, chunksize=chunk_size))
+
+    keccak_table = KeccakTable(randomness)
     sign_verifications: List[SignVerifyChip] = []
     tx_fixed_rows: List[Row] = []  # Accumulate fixed rows of each tx
-    tx_dyn_rows: List[Row] = []  # Accumulate CallData rows of each tx
-    for index, tx in enumerate(txs):
-        tx_rows, sign_verification = tx2witness(index, tx, chain_id, randomness, keccak_table)
+    for tx_rows, sign_verification, pk_bytes in results:
+        keccak_table.add(pk_bytes, randomness)
         sign_verifications.append(sign_verification)
-        for row in tx_rows:
-            if row.tag == Tag.CallData:
-                tx_dyn_rows.append(row)
-            else:
-                tx_fixed_rows.append(row)
+        tx_fixed_rows.extend(tx_rows)
+    # tx_id and calldata of each tx, viewed as the CallData rows
+    txs_call_data = [(FQ(index + 1), tx.data) for index, tx in enumerate(txs)]
+    call_data_len = sum(len(tx.data) for tx in txs)
 
-    assert len(tx_dyn_rows) <= MAX_CALLDATA_BYTES
+    assert call_data_len <= MAX_CALLDATA_BYTES
 
     # Fill all the rows in the fixed region to reach MAX_TXS * Tag.TxSignHash
     # with pad rows in the front.  These front padding rows use a sequential id
     # starting at 1 in the tx_id field used to prove a lower bound on the
     # number padding rows in the fixed region.   And fill all the rows in the
     # dynamic region to reach MAX_CALLDATA_BYTES with pad rows in the back.
-    rows = (
-        [
-            Row(FQ(i + 1), FQ(Tag.Pad), FQ(0), FQ(0))
-            for i in range((MAX_TXS - len(txs)) * Tag.TxSignHash)
-        ]
-        + tx_fixed_rows
-        + tx_dyn_rows
-        + [Row(FQ(0), FQ(Tag.Pad), FQ(0), FQ(0))] * (MAX_CALLDATA_BYTES - len(tx_dyn_rows))
+    # The pad rows and the CallData rows are virtual, see TxTableRows.
+    rows = TxTableRows(
+        (MAX_TXS - len(txs)) * Tag.TxSignHash,
+        tx_fixed_rows,
+        txs_call_data,
+        MAX_CALLDATA_BYTES - call_data_len,
     )
 
     dummy_ecdsa_chip = ECDSAVerifyChip(
@@ -427,6 +749,8 @@ def txs2witness(
     )
     # Fill the rest of sign_verifications with the witnessess assigned to 0s
     # and dummy ecdsa vefification values to disable the verification.
-    sign_verifications = [padding_sign_verification] * (MAX_TXS - len(txs)) + sign_verifications
-
-    return Witness(rows, keccak_table, sign_verifications)
+    return Witness(
+        rows,
+        keccak_table,
+        SignVerifications(MAX_TXS - len(txs), padding_sign_verification, sign_verifications),
+    )
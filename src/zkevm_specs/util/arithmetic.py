@@ -3,6 +3,8 @@ from typing import Sequence, Protocol, Type, TypeVar, Union
 from py_ecc import bn128
 from py_ecc.utils import prime_field_inv
 
+from .param import GAS_COST_TX_CALL_DATA_PER_NON_ZERO_BYTE, GAS_COST_TX_CALL_DATA_PER_ZERO_BYTE
+
 
 def linear_combine(seq: Sequence[Union[int, FQ]], base: FQ, range_check: bool = True) -> FQ:
     """
@@ -84,3 +86,14 @@ def cast_expr(expression: Expression, ty: Type[ExpressionImpl]) -> ExpressionImp
     if not isinstance(expression, ty):
         raise TypeError(f"Casting Expression to {ty}, but got {type(expression)}")
     return expression
+
+
+def call_data_gas_cost(call_data: bytes) -> int:
+    """
+    Gas cost of the call_data of a transaction
+    """
+    zero_bytes = call_data.count(0)
+    return (
+        zero_bytes * GAS_COST_TX_CALL_DATA_PER_ZERO_BYTE
+        + (len(call_data) - zero_bytes) * GAS_COST_TX_CALL_DATA_PER_NON_ZERO_BYTE
+    )
@@ -1,4 +1,8 @@
-from typing import Optional
+from __future__ import annotations
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import os
+import traceback
 
 from .arithmetic import Expression, FQ
 
@@ -8,6 +12,108 @@ class ConstraintUnsatFailure(Exception):
         self.message = message
 
 
+def require(condition: Any, failure: Any = None):
+    """
+    Same as `assert condition, failure`, but still checked when Python runs
+    with assertions disabled (`python -O`).
+    """
+    if not condition:
+        raise AssertionError() if failure is None else AssertionError(failure)
+
+
+# Modules implementing the constraint helpers, whose frames are skipped when
+# locating the constraint which failed
+CONSTRAINT_HELPER_MODULES = (
+    os.path.join("util", "constraint_system.py"),
+    os.path.join("evm", "instruction.py"),
+    os.path.join("evm", "table.py"),
+)
+
+
+@dataclass(frozen=True)
+class ConstraintFailure:
+    """
+    A constraint failure at a step or row of a circuit.
+    """
+
+    # Index of the step or row
+    index: int
+    # ExecutionState or Tag of the step or row
+    state: Optional[str]
+    # Type and message of the failure
+    kind: str
+    message: str
+    # Source of the failed constraint, as "path:line: code"
+    location: str
+
+
+class FailureReport:
+    """
+    Collects up to `max_failures` constraint failures, so a single verification
+    pass reports many failures instead of aborting on the first one.
+    """
+
+    max_failures: int
+    failures: List[ConstraintFailure]
+    n_checked: int
+
+    def __init__(self, max_failures: int = 100) -> None:
+        assert max_failures > 0, "Failure budget should be positive"
+        self.max_failures = max_failures
+        self.failures = []
+        self.n_checked = 0
+
+    def ok(self) -> bool:
+        return len(self.failures) == 0
+
+    def exhausted(self) -> bool:
+        return len(self.failures) >= self.max_failures
+
+    def check(self, index: int, state: Optional[str], check: Callable[..., Any], *args) -> bool:
+        """
+        Run check(*args), recording the constraint failure it raises if any.
+        Other errors are bugs of the witness or the spec, so they propagate.
+        Returns whether the check passed.
+        """
+        self.n_checked += 1
+        try:
+            check(*args)
+            return True
+        except (AssertionError, ConstraintUnsatFailure) as e:
+            self.record(index, state, e)
+            return False
+
+    def record(self, index: int, state: Optional[str], error: Exception):
+        if self.exhausted():
+            return
+        message = error.args[0] if len(error.args) > 0 else error
+        message = getattr(message, "message", message)
+        self.failures.append(
+            ConstraintFailure(
+                index=index,
+                state=state,
+                kind=type(error).__name__,
+                message=str(message),
+                location=_failure_location(traceback.extract_tb(error.__traceback__)),
+            )
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "n_checked": self.n_checked,
+            "max_failures": self.max_failures,
+            "exhausted": self.exhausted(),
+            "failures": [asdict(failure) for failure in self.failures],
+        }
+
+
+def _failure_location(frames: Sequence[traceback.FrameSummary]) -> str:
+    for frame in reversed(frames):
+        if not frame.filename.endswith(CONSTRAINT_HELPER_MODULES):
+            return f"{frame.filename}:{frame.lineno}: {frame.line}"
+    return ""
+
+
 class ConstraintSystem:
     cond: Optional[Expression]
 
@@ -29,19 +135,20 @@ class ConstraintSystem:
         return expr.expr()
 
     def constrain_equal(self, lhs: Expression, rhs: Expression):
-        assert self._eval(lhs.expr() - rhs.expr()) == 0, ConstraintUnsatFailure(
-            f"Expected values to be equal, but got {lhs} and {rhs}"
-        )
+        if self._eval(lhs.expr() - rhs.expr()) != 0:
+            raise AssertionError(
+                ConstraintUnsatFailure(f"Expected values to be equal, but got {lhs} and {rhs}")
+            )
 
     def constrain_zero(self, value: Expression):
-        assert self._eval(value) == 0, ConstraintUnsatFailure(
-            f"Expected value to be 0, but got {value}"
-        )
+        if self._eval(value) != 0:
+            raise AssertionError(ConstraintUnsatFailure(f"Expected value to be 0, but got {value}"))
 
     def constrain_bool(self, value: Expression):
-        assert self._eval(value) in [0, 1], ConstraintUnsatFailure(
-            f"Expected value to be a bool, but got {value}"
-        )
+        if self._eval(value) not in [0, 1]:
+            raise AssertionError(
+                ConstraintUnsatFailure(f"Expected value to be a bool, but got {value}")
+            )
 
     def is_zero(self, value: Expression) -> FQ:
         return FQ(value.expr() == 0)
@@ -1,13 +1,43 @@
+from functools import lru_cache
 from typing import Union
 from Crypto.Hash import keccak
 
 from .typing import U256
 
+# Maximum number of digests memoized by keccak256.  The witness generators of
+# the circuits hash the same public keys, code and sign data many times per
+# block, so the digests are shared by all of them in the process.
+KECCAK_CACHE_SIZE = 2**12
+# Maximum size of the inputs whose digests are memoized, which bounds the
+# inputs kept alive by the cache to KECCAK_CACHE_SIZE * 1 KiB (4 MiB).
+# Larger inputs are hashed every time.
+KECCAK_CACHE_MAX_INPUT_SIZE = 2**10
+
+
+def _keccak256(data: Union[bytes, bytearray]) -> bytes:
+    return keccak.new(digest_bits=256).update(data).digest()
+
+
+_cached_keccak256 = lru_cache(maxsize=KECCAK_CACHE_SIZE)(_keccak256)
+
 
 def keccak256(data: Union[str, bytes, bytearray]) -> bytes:
     if isinstance(data, str):
         data = bytes.fromhex(data)
-    return keccak.new(digest_bits=256).update(data).digest()
+    if len(data) > KECCAK_CACHE_MAX_INPUT_SIZE:
+        return _keccak256(data)
+    return _cached_keccak256(bytes(data))
+
+
+def keccak_cache_info():
+    """
+    Returns the hits, misses, maxsize and currsize of the keccak256 cache.
+    """
+    return _cached_keccak256.cache_info()
+
+
+def keccak_cache_clear():
+    _cached_keccak256.cache_clear()
 
 
 EMPTY_HASH: U256 = U256(int.from_bytes(keccak256(""), "big"))
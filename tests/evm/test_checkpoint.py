@@ -0,0 +1,106 @@
+import os
+import pytest
+
+from zkevm_specs.evm import (
+    Bytecode,
+    TraceWitnessBuilder,
+    Transaction,
+    VerificationCheckpoint,
+    inputs_digest,
+    iter_struct_logs,
+    iter_verify_steps,
+    verify_steps,
+)
+from zkevm_specs.util import rand_fq
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "trace_arith.json")
+
+TX = Transaction(
+    caller_address=0xFE,
+    callee_address=0xFF,
+    call_data=bytes.fromhex("a9059cbb" + "00" * 12 + "11" * 20),
+)
+
+BYTECODE = (
+    Bytecode()
+    .push1(2)
+    .push1(3)
+    .add()
+    .push1(5)
+    .mul()
+    .iszero()
+    .caller()
+    .calldatasize()
+    .push1(4)
+    .calldataload()
+    .not_()
+    .gas()
+    .codesize()
+    .stop()
+)
+
+
+def build_witness():
+    randomness = rand_fq()
+    builder = TraceWitnessBuilder(randomness, BYTECODE, TX)
+    with open(FIXTURE) as fp:
+        steps = list(builder.build_steps(iter_struct_logs(fp)))
+    return randomness, builder.tables(), steps
+
+
+def test_checkpoint_resume(tmp_path):
+    randomness, tables, steps = build_witness()
+    checkpoint = VerificationCheckpoint(str(tmp_path / "checkpoint.json"), interval=2)
+
+    # Break the gas of the 7th step so verification crashes on the 6th one
+    broken_gas = steps[6].gas_left
+    steps[6].gas_left = broken_gas + 1
+    verified = []
+    with pytest.raises(AssertionError):
+        for idx in iter_verify_steps(randomness, tables, steps, checkpoint=checkpoint):
+            verified.append(idx)
+    assert verified == [0, 1, 2, 3, 4]
+    assert checkpoint.load(inputs_digest(randomness, tables))[0] == 4
+
+    # Resuming checks the checkpointed steps, including the 5th one which was
+    # verified as next step of the 4th one
+    steps[6].gas_left = broken_gas
+    for idx in [2, 4]:
+        steps[idx].gas_left += 1
+        with pytest.raises(ValueError):
+            verify_steps(randomness, tables, steps, checkpoint=checkpoint)
+        steps[idx].gas_left -= 1
+
+    # Resume from the last checkpointed step once fixed
+    resumed = list(iter_verify_steps(randomness, tables, iter(steps), checkpoint=checkpoint))
+    assert resumed == list(range(4, len(steps) - 1))
+
+    # Everything has been verified, so a rerun is a no-op
+    assert list(iter_verify_steps(randomness, tables, steps, checkpoint=checkpoint)) == []
+
+    # Fewer steps than checkpointed are rejected instead of verifying nothing,
+    # even when one of them is corrupted
+    steps[1].gas_left += 1
+    for short_steps in [steps[:3], steps[:1], []]:
+        with pytest.raises(ValueError):
+            verify_steps(randomness, tables, short_steps, checkpoint=checkpoint)
+
+
+def test_checkpoint_inputs_changed(tmp_path):
+    randomness, tables, steps = build_witness()
+    checkpoint = VerificationCheckpoint(str(tmp_path / "checkpoint.json"), interval=2)
+    verify_steps(randomness, tables, steps, checkpoint=checkpoint)
+
+    # Different tables start over from step 0
+    other_randomness, other_tables, other_steps = build_witness()
+    verified = list(
+        iter_verify_steps(other_randomness, other_tables, other_steps, checkpoint=checkpoint)
+    )
+    assert verified[0] == 0
+
+    # Same tables but different steps are rejected
+    checkpoint.clear()
+    checkpoint.interval = 1
+    verify_steps(randomness, tables, steps[:5], checkpoint=checkpoint)
+    with pytest.raises(ValueError):
+        verify_steps(randomness, tables, [steps[1]] + steps[1:], checkpoint=checkpoint)
@@ -0,0 +1,75 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from zkevm_specs.evm import Bytecode, Interpreter, Transaction, verify_steps
+from zkevm_specs.util import FailureReport, rand_fq
+
+TX = Transaction(caller_address=0xFE, callee_address=0xFF, gas=30000)
+BYTECODE = Bytecode().push1(2).push1(3).add().push1(5).mul().iszero().not_().stop()
+
+
+def build_witness():
+    randomness = rand_fq()
+    interpreter = Interpreter(randomness, BYTECODE, TX)
+    steps = interpreter.run()
+    return randomness, interpreter.tables(), steps
+
+
+def test_failure_report():
+    randomness, tables, steps = build_witness()
+    report = FailureReport()
+    verify_steps(randomness, tables, steps, report=report)
+    assert report.ok() and report.n_checked == len(steps) - 1
+
+    # Wrong gas of ADD breaks the PUSH before it and ADD itself, and a wrong
+    # pc of ISZERO breaks MUL
+    steps[2].gas_left += 1
+    steps[5].program_counter += 1
+    report = FailureReport()
+    verify_steps(randomness, tables, steps, report=report)
+    assert [(failure.index, failure.state) for failure in report.failures] == [
+        (1, "PUSH"),
+        (2, "ADD"),
+        (4, "MUL"),
+        (5, "ISZERO"),
+    ]
+    assert "execution" in report.failures[1].location
+    assert report.to_dict()["failures"][0]["kind"] == "AssertionError"
+
+    report = FailureReport(max_failures=2)
+    verify_steps(randomness, tables, steps, report=report)
+    assert report.exhausted() and report.n_checked == 3
+
+
+def test_failure_report_propagates_bugs():
+    def broken_check():
+        raise TypeError("unsupported operand")
+
+    report = FailureReport()
+    with pytest.raises(TypeError):
+        report.check(0, None, broken_check)
+    assert report.ok()
+
+
+def test_failure_without_asserts():
+    # Constraints are still checked when Python runs with `-O`
+    script = (
+        "from zkevm_specs.evm import Bytecode, Interpreter, Transaction, verify_steps\n"
+        "from zkevm_specs.util import rand_fq\n"
+        "randomness = rand_fq()\n"
+        "tx = Transaction(caller_address=0xFE, callee_address=0xFF, gas=30000)\n"
+        "interpreter = Interpreter(randomness, Bytecode().push1(2).push1(3).add().stop(), tx)\n"
+        "steps = interpreter.run()\n"
+        "steps[2].gas_left += 1\n"
+        "try:\n"
+        "    verify_steps(randomness, interpreter.tables(), steps)\n"
+        "except AssertionError:\n"
+        "    exit(0)\n"
+        "exit(1)\n"
+    )
+    src = os.path.join(os.path.dirname(__file__), "..", "..", "src")
+    env = dict(os.environ, PYTHONPATH=os.path.abspath(src))
+    subprocess.run([sys.executable, "-O", "-c", script], env=env, check=True)
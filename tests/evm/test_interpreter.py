@@ -0,0 +1,245 @@
+import pytest
+
+from zkevm_specs.evm import (
+    EXECUTION_STATE_IMPL,
+    Account,
+    Block,
+    Bytecode,
+    ExecutionState,
+    Interpreter,
+    StepState,
+    Transaction,
+    verify_steps,
+)
+from zkevm_specs.copy_circuit import verify_copy_table
+from zkevm_specs.util import rand_fq
+
+CALLEE = Account(
+    address=0xFF,
+    balance=int(1e18),
+    code=Bytecode().stop(),
+    storage={0: 7, 1: 0x1234},
+)
+OTHER = Account(address=0xAA, nonce=1, code=Bytecode().push1(0).stop())
+
+TX = Transaction(
+    caller_address=0xFE,
+    callee_address=CALLEE.address,
+    gas=100000,
+    call_data=bytes.fromhex("a9059cbb" + "00" * 12 + "11" * 20),
+)
+
+BLOCK = Block(number=300, timestamp=1234, history_hashes=[0xBEEF + idx for idx in range(256)])
+
+
+def loop_bytecode(iterations: int) -> Bytecode:
+    # counter = iterations; do { counter -= 1; sum += counter } while counter != 0
+    loop = len(Bytecode().push1(0).push2(iterations).code)
+    return (
+        Bytecode()
+        .push1(0)
+        .push2(iterations)
+        .jumpdest()
+        .push1(1)
+        .swap1()
+        .sub()
+        .dup1()
+        .swap2()
+        .add()
+        .swap1()
+        .dup1()
+        .iszero()
+        .iszero()
+        .push1(loop)
+        .jumpi()
+        .pop()
+        .push1(0)
+        .sstore()
+        .push1(0)
+        .sload()
+        .push1(1)
+        .sload()
+        .stop()
+    )
+
+
+def arithmetic_bytecode() -> Bytecode:
+    bytecode = (
+        Bytecode()
+        .push1(5)
+        .push1(3)
+        .push1(7)
+        .addmod()
+        .push1(5)
+        .push1(3)
+        .push1(7)
+        .mulmod()
+        .mul()
+        .push1(3)
+        .push1(0xF9)
+        .not_()
+        .sdiv()
+        .push1(3)
+        .push1(7)
+        .smod()
+        .push1(3)
+        .push1(1)
+        .shl()
+        .push1(1)
+        .shr()
+        .slt()
+        .sgt()
+    )
+    jumpdest = len(bytecode.code) + 3
+    return bytecode.push1(jumpdest).jump().jumpdest().stop()
+
+
+TESTING_DATA = (
+    loop_bytecode(10),
+    arithmetic_bytecode(),
+    Bytecode()
+    .push32(0x0102030405060708090A0B0C0D0E0F101112131415161718191A1B1C1D1E1F20)
+    .push1(0)
+    .mstore()
+    .push1(4)
+    .push1(0)
+    .push1(0x20)
+    .calldatacopy()
+    .push1(0x24)
+    .push1(0)
+    .sha3()
+    .push1(0x20)
+    .push1(0)
+    .push1(0x40)
+    .codecopy()
+    .push1(0x60)
+    .push1(0x10)
+    .sha3()
+    .stop(),
+    Bytecode()
+    .address()
+    .caller()
+    .origin()
+    .callvalue()
+    .calldatasize()
+    .push1(4)
+    .calldataload()
+    .codesize()
+    .gasprice()
+    .selfbalance()
+    .coinbase()
+    .timestamp()
+    .number()
+    .gaslimit()
+    .chainid()
+    .basefee()
+    .push2(299)
+    .blockhash()
+    .push2(10)
+    .blockhash()
+    .push1(OTHER.address)
+    .extcodehash()
+    .push1(0xAB)
+    .extcodehash()
+    .returndatasize()
+    .gas()
+    .stop(),
+    Bytecode()
+    .push1(0x20)
+    .push1(0)
+    .push1(0)
+    .push1(OTHER.address)
+    .extcodecopy()
+    .push1(0xCA)
+    .push1(0xFE)
+    .push1(0x20)
+    .push1(0)
+    .log2()
+    .push1(0x10)
+    .push1(0x30)
+    .log0()
+    .push1(0x20)
+    .push1(0)
+    .return_(),
+)
+
+# ExecutionStates of the gadgets the interpreter doesn't generate: the steps
+# around the root call and the calls to other contracts
+UNSUPPORTED_EXECUTION_STATES = {
+    ExecutionState.BeginTx,
+    ExecutionState.EndTx,
+    ExecutionState.EndBlock,
+    ExecutionState.CALL,
+}
+
+
+def verify_implemented_steps(randomness, tables, steps):
+    # Steps without execution gadget are only used as the next step
+    for idx, step in enumerate(steps[:-1]):
+        if step.execution_state in EXECUTION_STATE_IMPL:
+            verify_steps(randomness, tables, steps[idx : idx + 2])
+
+
+@pytest.mark.parametrize("bytecode", TESTING_DATA)
+def test_interpreter(bytecode: Bytecode):
+    randomness = rand_fq()
+
+    interpreter = Interpreter(randomness, bytecode, TX, BLOCK, [CALLEE, OTHER])
+    steps = interpreter.run()
+
+    assert steps[-1].execution_state.halts_in_success()
+    assert interpreter.builder.skipped_steps == []
+    # The root call ends into EndTx, which is not generated
+    end_tx = StepState(
+        execution_state=ExecutionState.EndTx,
+        rw_counter=interpreter.builder.rw_dictionary.rw_counter,
+        call_id=interpreter.builder.call_id,
+    )
+    tables = interpreter.tables()
+    verify_copy_table(interpreter.builder.copy_circuit, tables, randomness)
+    verify_implemented_steps(randomness, tables, steps + [end_tx])
+
+
+def test_interpreter_coverage():
+    randomness = rand_fq()
+
+    execution_states = set()
+    for bytecode in TESTING_DATA:
+        interpreter = Interpreter(randomness, bytecode, TX, BLOCK, [CALLEE, OTHER])
+        execution_states.update(step.execution_state for step in interpreter.run())
+    assert execution_states & EXECUTION_STATE_IMPL.keys() == (
+        EXECUTION_STATE_IMPL.keys() - UNSUPPORTED_EXECUTION_STATES
+    )
+
+
+def test_interpreter_return():
+    randomness = rand_fq()
+
+    interpreter = Interpreter(randomness, TESTING_DATA[-1], TX, BLOCK, [CALLEE, OTHER])
+    interpreter.run()
+    assert interpreter.return_data == bytes(OTHER.code.code).ljust(0x20, b"\x00")
+    assert interpreter.memory_size == 2
+
+
+def test_interpreter_storage():
+    randomness = rand_fq()
+
+    interpreter = Interpreter(randomness, loop_bytecode(10), TX, BLOCK, [CALLEE])
+    interpreter.run()
+    # sum of 0..9 is stored at slot 0 and both slots are read back
+    assert interpreter.world_state.storage == {(CALLEE.address, 0): 45}
+    assert interpreter.stack == [45, 0x1234]
+    assert interpreter.builder.tx_refund == 0
+
+
+def test_interpreter_unsupported():
+    randomness = rand_fq()
+
+    with pytest.raises(NotImplementedError):
+        Interpreter(randomness, Bytecode().push1(0).call(), TX).run()
+    with pytest.raises(NotImplementedError):
+        Interpreter(randomness, Bytecode().add(), TX).run()
+    with pytest.raises(NotImplementedError):
+        Interpreter(randomness, Bytecode().push1(3).jump().stop(), TX).run()
+    with pytest.raises(ValueError):
+        Interpreter(randomness, Bytecode().stop(), Transaction(gas=21000, call_data=b"\x01")).run()
@@ -13,7 +13,10 @@ from zkevm_specs.evm import (
 from zkevm_specs.util import rand_fq, RLC
 
 
-TESTING_DATA = ((Opcode.JUMPI, bytes([40]), bytes([7])),)
+TESTING_DATA = (
+    (Opcode.JUMPI, bytes([40]), bytes([7])),
+    (Opcode.JUMPI, bytes([40]), bytes([9])),
+)
 
 
 @pytest.mark.parametrize("opcode, cond_bytes, dest_bytes", TESTING_DATA)
@@ -23,9 +26,13 @@ def test_jumpi_cond_nonzero(opcode: Opcode, cond_bytes: bytes, dest_bytes: bytes
     dest = RLC(bytes(reversed(dest_bytes)), randomness)
 
     block = Block()
-    # Jumps to PC=7 because the condition (40) is nonzero.
-    # PUSH1 80 PUSH1 40 PUSH1 07 JUMPI JUMPDEST STOP
-    bytecode = Bytecode().push1(0x80).push1(0x40).push1(dest_bytes).jumpi().jumpdest().stop()
+    # Jumps to PC=dest because the condition (40) is nonzero, skipping the
+    # STOPs in between.
+    # PUSH1 80 PUSH1 40 PUSH1 dest JUMPI STOP* JUMPDEST STOP
+    bytecode = Bytecode().push1(0x80).push1(0x40).push1(dest_bytes).jumpi()
+    for _ in range(7, int.from_bytes(dest_bytes, "little")):
+        bytecode.stop()
+    bytecode.jumpdest().stop()
     bytecode_hash = RLC(bytecode.hash(), randomness)
 
     tables = Tables(
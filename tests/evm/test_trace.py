@@ -0,0 +1,189 @@
+import io
+import os
+import pytest
+
+from zkevm_specs.evm import (
+    Bytecode,
+    ExecutionState,
+    LookupUnsatFailure,
+    Opcode,
+    StepState,
+    StructLog,
+    TraceWitnessBuilder,
+    Transaction,
+    iter_struct_logs,
+    verify_steps,
+)
+from zkevm_specs.copy_circuit import verify_copy_table
+from zkevm_specs.util import rand_fq
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+TX = Transaction(
+    caller_address=0xFE,
+    callee_address=0xFF,
+    call_data=bytes.fromhex("a9059cbb" + "00" * 12 + "11" * 20),
+)
+
+TESTING_DATA = (
+    (
+        "trace_arith.json",
+        Bytecode()
+        .push1(2)
+        .push1(3)
+        .add()
+        .push1(5)
+        .mul()
+        .iszero()
+        .caller()
+        .calldatasize()
+        .push1(4)
+        .calldataload()
+        .not_()
+        .gas()
+        .codesize()
+        .stop(),
+        0,
+    ),
+    (
+        "trace_sha3.json",
+        Bytecode()
+        .push32(0x0102030405060708090A0B0C0D0E0F101112131415161718191A1B1C1D1E1F20)
+        .push1(0)
+        .mstore()
+        .push1(4)
+        .push1(0)
+        .push1(0x20)
+        .calldatacopy()
+        .push1(0x24)
+        .push1(0)
+        .sha3()
+        .stop(),
+        # MSTORE has no execution gadget yet, so verify the steps after it
+        3,
+    ),
+)
+
+
+@pytest.mark.parametrize("fixture, bytecode, first_verified_step", TESTING_DATA)
+def test_trace_witness(fixture: str, bytecode: Bytecode, first_verified_step: int):
+    randomness = rand_fq()
+
+    builder = TraceWitnessBuilder(randomness, bytecode, TX)
+    with open(os.path.join(FIXTURES_DIR, fixture)) as fp:
+        # Small chunks to exercise entries split across reads
+        steps = list(builder.build_steps(iter_struct_logs(fp, chunk_size=61)))
+
+    assert steps[-1].execution_state == ExecutionState.STOP
+    tables = builder.tables()
+    verify_copy_table(builder.copy_circuit, tables, randomness)
+    verify_steps(randomness, tables, steps[first_verified_step:])
+
+
+def test_trace_witness_rejects_wrong_values():
+    randomness = rand_fq()
+
+    bytecode = Bytecode().push1(2).push1(3).add().stop()
+    trace = """{"structLogs": [
+        {"pc": 0, "op": "PUSH1", "gas": 100, "depth": 1, "stack": []},
+        {"pc": 2, "op": "PUSH1", "gas": 97, "depth": 1, "stack": ["0x2"]},
+        {"pc": 4, "op": "ADD", "gas": 94, "depth": 1, "stack": ["0x2", "0x3"]},
+        {"pc": 5, "op": "STOP", "gas": 91, "depth": 1, "stack": ["0x6"]}
+    ]}"""
+
+    builder = TraceWitnessBuilder(randomness, bytecode)
+    steps = list(builder.build_steps(iter_struct_logs(io.StringIO(trace))))
+    assert [step.execution_state for step in steps] == [
+        ExecutionState.PUSH,
+        ExecutionState.PUSH,
+        ExecutionState.ADD,
+        ExecutionState.STOP,
+    ]
+
+    verify_steps(randomness, builder.tables(), steps[:2])
+    with pytest.raises(AssertionError):
+        verify_steps(randomness, builder.tables(), steps[2:])
+
+
+def test_trace_witness_skips_calls():
+    randomness = rand_fq()
+
+    topic = 0x0102030405060708090A0B0C0D0E0F101112131415161718191A1B1C1D1E1F20
+    bytecode = (
+        Bytecode()
+        .push1(4)
+        .push1(0)
+        .push1(0)
+        .calldatacopy()
+        .push32(topic)
+        .push1(4)
+        .push1(0)
+        .log1()
+        .push1(0)
+        .push1(0)
+        .push1(0)
+        .push1(0)
+        .push1(0)
+        .push1(0xFF)
+        .gas()
+        .call()
+        .iszero()
+        .push1(4)
+        .push1(0)
+        .return_()
+    )
+    call_args = [0, 0, 0, 0, 0, 0xFF]
+    struct_logs = [
+        StructLog(0, Opcode.PUSH1, 100000, 3, 1, []),
+        StructLog(2, Opcode.PUSH1, 99997, 3, 1, [4]),
+        StructLog(4, Opcode.PUSH1, 99994, 3, 1, [4, 0]),
+        StructLog(6, Opcode.CALLDATACOPY, 99991, 9, 1, [4, 0, 0]),
+        StructLog(7, Opcode.PUSH32, 99982, 3, 1, []),
+        StructLog(40, Opcode.PUSH1, 99979, 3, 1, [topic]),
+        StructLog(42, Opcode.PUSH1, 99976, 3, 1, [topic, 4]),
+        StructLog(44, Opcode.LOG1, 99973, 782, 1, [topic, 4, 0]),
+        *[
+            StructLog(45 + 2 * i, Opcode.PUSH1, 99191 - 3 * i, 3, 1, call_args[:i])
+            for i in range(6)
+        ],
+        StructLog(57, Opcode.GAS, 99173, 2, 1, call_args),
+        StructLog(58, Opcode.CALL, 99171, 97000, 1, call_args + [99171]),
+        # Steps of the callee
+        StructLog(0, Opcode.PUSH1, 97000, 3, 2, []),
+        StructLog(2, Opcode.STOP, 96997, 0, 2, [1]),
+        StructLog(59, Opcode.ISZERO, 98000, 3, 1, [1]),
+        StructLog(60, Opcode.PUSH1, 97997, 3, 1, [0]),
+        StructLog(62, Opcode.PUSH1, 97994, 3, 1, [0, 4]),
+        StructLog(64, Opcode.RETURN, 97991, 0, 1, [0, 4, 0]),
+    ]
+
+    builder = TraceWitnessBuilder(randomness, bytecode, TX)
+    steps = list(builder.build_steps(struct_logs))
+    assert len(steps) == len(struct_logs) - 2
+    assert [(step.step_index, step.op) for step in builder.skipped_steps] == [(15, Opcode.CALL)]
+    assert "skipping 2 logs" in builder.skipped_steps[0].reason
+    assert steps[8].log_id == 1
+
+    tables = builder.tables()
+    verify_copy_table(builder.copy_circuit, tables, randomness)
+    # The steps before and after the call verify, and the root call ends with
+    # RETURN into EndTx
+    verify_steps(randomness, tables, steps[:16])
+    end_tx = StepState(
+        execution_state=ExecutionState.EndTx,
+        rw_counter=builder.rw_dictionary.rw_counter,
+        call_id=builder.call_id,
+    )
+    verify_steps(randomness, tables, steps[16:] + [end_tx])
+    with pytest.raises(LookupUnsatFailure):
+        verify_steps(randomness, tables, steps[15:17])
+
+
+def test_iter_struct_logs_malformed():
+    with pytest.raises(ValueError):
+        list(iter_struct_logs(io.StringIO('{"result": {"gas": 0}}')))
+
+    logs = iter_struct_logs(io.StringIO('{"structLogs": [{"pc": 0, "op": "STOP", "gas": 0}'))
+    assert next(logs).op == Opcode.STOP
+    with pytest.raises(ValueError):
+        next(logs)
@@ -3,7 +3,8 @@ from copy import deepcopy
 
 from zkevm_specs.bytecode import *
 from zkevm_specs.evm import Opcode, Bytecode, BytecodeFieldTag, BytecodeTableRow, is_push
-from zkevm_specs.util import RLC, rand_fq
+from zkevm_specs.util import RLC, keccak256, rand_fq
+
 
 # Unroll the bytecode
 def unroll(bytecode, randomness):
@@ -203,3 +204,23 @@ def test_bytecode_invalid_is_code():
     row = unrolled.rows[7]
     invalid.rows[7] = BytecodeTableRow(row.bytecode_hash, row.field_tag, row.index, 1, row.value)
     verify(k, [invalid], randomness, False)
+
+
+def test_bytecode_failure_report():
+    unrolled = unroll(bytes([8, 2, 3, 8, 9, 7, 128]), randomness)
+    push_table = assign_push_table()
+    keccak_table = assign_keccak_table([unrolled.bytes], randomness)
+    rows = assign_bytecode_circuit(k, [unrolled], randomness)
+
+    # Skip the index of two bytes, which breaks them and the bytes after them
+    for idx in [2, 5]:
+        rows[idx] = rows[idx]._replace(index=rows[idx].index + 10)
+
+    report = FailureReport()
+    verify_bytecode_circuit(rows, push_table, keccak_table, randomness, report)
+    assert [failure.index for failure in report.failures] == [2, 3, 5, 6]
+    assert all(failure.state == "Byte" for failure in report.failures)
+
+    report = FailureReport(max_failures=1)
+    verify_bytecode_circuit(rows, push_table, keccak_table, randomness, report)
+    assert len(report.failures) == 1 and report.n_checked == 3
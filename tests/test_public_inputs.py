@@ -4,7 +4,17 @@ from eth_keys import keys
 from eth_utils import keccak
 import rlp
 from zkevm_specs.public_inputs import *
-from zkevm_specs.util import FQ, RLC, U64, U256, U160
+from zkevm_specs.util import (
+    FQ,
+    RLC,
+    U64,
+    U256,
+    U160,
+    linear_combine,
+    PUBLIC_INPUTS_BLOCK_LEN as BLOCK_LEN,
+    PUBLIC_INPUTS_EXTRA_LEN as EXTRA_LEN,
+    PUBLIC_INPUTS_TX_LEN as TX_LEN,
+)
 import random
 from random import randrange, randbytes
 
@@ -49,6 +59,15 @@ def verify(
             ok = False
     assert ok == success
 
+    # The column-wise checks agree with the checks of each row
+    try:
+        verify_circuit(witness, MAX_TXS, MAX_CALLDATA_BYTES, column_wise=True)
+    except AssertionError:
+        ok = False
+    else:
+        ok = True
+    assert ok == success
+
 
 def rand_u256() -> U256:
     return U256(randrange(0, 2**256))
@@ -118,6 +137,65 @@ def test_basic():
     verify(public_data, MAX_TXS, MAX_CALLDATA_BYTES, rand_rpi)
 
 
+def test_columns():
+    random.seed(0)
+
+    MAX_TXS = 3
+    MAX_CALLDATA_BYTES = 20
+
+    public_data = rand_public_data(MAX_TXS - 1, MAX_CALLDATA_BYTES)
+    witness = public_data2witness(public_data, MAX_TXS, MAX_CALLDATA_BYTES, rand_rpi)
+    columns = witness.columns
+    n_rows = BLOCK_LEN + 1 + EXTRA_LEN + 3 * (TX_LEN * MAX_TXS + 1 + MAX_CALLDATA_BYTES)
+    assert all(len(column) == n_rows for column in vars(columns).values())
+    raw_public_inputs = [FQ(value) for value in columns.raw_public_inputs]
+    assert witness.public_inputs.rpi_rlc == linear_combine(
+        raw_public_inputs, rand_rpi, range_check=False
+    )
+
+    # Rows are views of the columns
+    row = witness.rows[-1]
+    assert row.q_end == FQ(1) and row.rpi_rlc_acc == raw_public_inputs[-1]
+    row.tx_table.value = FQ(-1)
+    assert columns.tx_table_value[-1] == FQ.field_modulus - 1
+
+
+def test_tx_table_rows():
+    random.seed(0)
+
+    MAX_TXS = 3
+    MAX_CALLDATA_BYTES = 20
+
+    public_data = rand_public_data(MAX_TXS - 1, MAX_CALLDATA_BYTES)
+    rows = list(public_data.iter_tx_table(MAX_TXS, MAX_CALLDATA_BYTES))
+    assert len(rows) == TX_LEN * MAX_TXS + 1 + MAX_CALLDATA_BYTES
+    assert tx_table_columns(rows) == public_data.tx_table(MAX_TXS, MAX_CALLDATA_BYTES)
+    calldata = rows[TX_LEN * MAX_TXS + 1 :]
+    assert calldata[0] == (1, 0, public_data.txs[0].data[0])
+    assert calldata[-1] == (0, 0, 0)
+
+    witness = public_data2witness(public_data, MAX_TXS, MAX_CALLDATA_BYTES, rand_rpi)
+    columns = witness.columns
+    written = zip(columns.tx_table_tx_id, columns.tx_table_index, columns.tx_table_value)
+    assert list(written)[: len(rows)] == rows
+
+
+def test_disabled_rows():
+    random.seed(0)
+
+    MAX_TXS = 2
+    MAX_CALLDATA_BYTES = 8
+
+    public_data = rand_public_data(MAX_TXS - 1, MAX_CALLDATA_BYTES)
+    witness = public_data2witness(public_data, MAX_TXS, MAX_CALLDATA_BYTES, rand_rpi)
+    # Rows disabled by their selector are not constrained
+    witness.rows[5].q_tx_table = FQ(0)
+    witness.rows[5].tx_table.tx_id = FQ(123)
+    verify(witness, MAX_TXS, MAX_CALLDATA_BYTES, rand_rpi)
+    witness.rows[5].q_tx_table = FQ(2)
+    verify(witness, MAX_TXS, MAX_CALLDATA_BYTES, rand_rpi, success=False)
+
+
 def override_not_success(override: Callable[Witness, None]):
     random.seed(0)
 
@@ -1,7 +1,10 @@
+import json
 import traceback
-from typing import Union, List
+import pytest
+from typing import Iterator, Union, List
 
 from zkevm_specs.state import *
+from zkevm_specs.evm import LookupUnsatFailure, RWDictionary
 from zkevm_specs.util import rand_fq, FQ, RLC
 
 randomness = rand_fq()
@@ -112,6 +115,55 @@ def test_mpt_updates_ok():
     verify(ops, tables, randomness)
 
 
+def test_mpt_lookup_index():
+    # fmt: off
+    ops = [StartOp()] + [
+        StorageOp(rw_counter=i + 1, rw=RW.Write, tx_id=1, addr=0x12345678, key=i, value=rlc(i), committed_value=rlc(0))
+        for i in range(100)
+    ]
+    # fmt: on
+    tables = Tables(mpt_table_from_ops(ops, randomness))
+    assert len(tables.mpt_index) == len(tables.mpt_table) == 100
+    verify_state_circuit(assign_state_circuit(ops, randomness), tables, randomness)
+
+    row = next(iter(tables.mpt_table))
+    query = (row.address, row.proof_type, row.storage_key, row.value, row.value_prev)
+    assert tables.mpt_lookup(*query, row.root, row.root_prev) == row
+    with pytest.raises(LookupUnsatFailure):
+        tables.mpt_lookup(*query, row.root_prev, row.root)
+    with pytest.raises(LookupUnsatFailure):
+        tables.mpt_lookup(
+            row.address, row.proof_type, FQ(12345), *query[3:], row.root, row.root_prev
+        )
+
+
+def test_mock_mpt_updates(monkeypatch):
+    # fmt: off
+    ops = [
+        StartOp(),
+        AccountOp(rw_counter=2, rw=RW.Read, addr=0x12345678, field_tag=AccountFieldTag.Nonce, value=FQ(1), committed_value=FQ(1)),
+        StorageOp(rw_counter=1, rw=RW.Write, tx_id=1, addr=0x12345678, key=2**255 + 1, value=rlc(789), committed_value=rlc(98765)),
+    ]
+    # fmt: on
+    mpt_updates = mock_mpt_updates(ops, randomness)
+    assert mock_mpt_updates(iter(ops), randomness) == mpt_updates
+    assert [update.storage_key for update in mpt_updates.values()] == [FQ(0), rlc(2**255 + 1)]
+
+    # The rows and the MPT table share the updates of the sorted Operations
+    rows, sorted_mpt_updates = assign_state_circuit_with_mpt_updates(ops, randomness, sort=True)
+    assert rows == assign_state_circuit(ops, randomness, sort=True)
+    assert set(sorted_mpt_updates.values()) == mpt_table_from_ops(ops, randomness, sort=True)
+    tables = Tables(set(sorted_mpt_updates.values()))
+    verify_state_circuit(rows, tables, randomness)
+
+    # The lazy assignments use the given updates instead of computing them again
+    sorted_ops = list(sort_operations(ops))
+    monkeypatch.setattr("zkevm_specs.state.mock_mpt_updates", None)
+    assert list(iter_assign_state_circuit(sorted_ops, randomness, sorted_mpt_updates)) == rows
+    packed_rows = iter_assign_packed_state_circuit(sorted_ops, randomness, sorted_mpt_updates)
+    assert [packed_row.to_row() for packed_row in packed_rows] == rows
+
+
 def test_state_bad_key2():
     # fmt: off
     ops = [
@@ -197,6 +249,299 @@ def test_state_keys_non_lexicographic_order():
     verify(ops, tables, randomness, success=False)
 
 
+def test_state_ordering_key():
+    # fmt: off
+    ops = [
+        StartOp(),
+        MemoryOp(rw_counter=1, rw=RW.Write, call_id=1, mem_addr=0, value=42),
+        StorageOp(rw_counter=2, rw=RW.Write, tx_id=1, addr=0x12345678, key=0x1112, value=rlc(98765), committed_value=rlc(98765)),
+        StorageOp(rw_counter=3, rw=RW.Write, tx_id=1, addr=0x12345678, key=0x1111, value=rlc(789), committed_value=rlc(98765)),
+    ]
+    # fmt: on
+    rows = assign_state_circuit(ops, r)
+    keys = [ordering_key(row) for row in rows]
+    for key_prev, key in zip(keys, keys[1:]):
+        gadget = LowerThanGadget(ordering_limbs(key_prev), ordering_limbs(key))
+        assert gadget.lt() == (key_prev < key)
+
+    assert explain_ordering_failure(keys[2], keys[3]) == (
+        "Keys are not in order: limb 2 (storage_key) decreases from 0x1112 to 0x1111"
+    )
+    tables = Tables(mpt_table_from_ops(ops, randomness))
+    report = FailureReport()
+    verify_state_circuit(rows, tables, randomness, report)
+    assert [failure.index for failure in report.failures] == [3]
+    assert "limb 2 (storage_key)" in report.failures[0].message
+
+
+def test_state_common_constraints_column_wise():
+    # fmt: off
+    ops = [
+        StartOp(),
+        MemoryOp(rw_counter=1, rw=RW.Write, call_id=1, mem_addr=0, value=42),
+        MemoryOp(rw_counter=2, rw=RW.Read,  call_id=1, mem_addr=0, value=42),
+        MemoryOp(rw_counter=3, rw=RW.Write, call_id=1, mem_addr=1, value=43),
+        StackOp(rw_counter=4, rw=RW.Write, call_id=1, stack_ptr=1022, value=rlc(533)),
+        StackOp(rw_counter=5, rw=RW.Read,  call_id=1, stack_ptr=1022, value=rlc(533)),
+        StorageOp(rw_counter=6, rw=RW.Write, tx_id=1, addr=0x12345678, key=0x1111, value=rlc(789), committed_value=rlc(98765)),
+        StorageOp(rw_counter=7, rw=RW.Write, tx_id=1, addr=0x12345678, key=0x1112, value=rlc(98765), committed_value=rlc(98765)),
+    ]
+    # fmt: on
+    rows = assign_state_circuit(ops, r)
+    tables = Tables(mpt_table_from_ops(ops, randomness))
+    failures, keys = common_constraint_failures(rows, randomness)
+    assert failures == set() and keys == [ordering_key(row) for row in rows]
+
+    rows[1] = rows[1]._replace(key2_limbs=(FQ(2**16),) + rows[1].key2_limbs[1:])
+    rows[2] = rows[2]._replace(value=FQ(41))
+    rows[3] = rows[3]._replace(key4_bytes=(FQ(256),) + rows[3].key4_bytes[1:])
+    rows[4] = rows[4]._replace(is_write=FQ(2))
+    rows[5] = rows[5]._replace(rw_counter=FQ(3))
+    rows[7] = rows[7]._replace(keys=rows[7].keys[:3] + (FQ(MAX_FIELD_TAG + 1), rows[7].keys[4]))
+    failures, _ = common_constraint_failures(rows, randomness)
+    assert failures == {1, 2, 3, 4, 5, 7}
+    for (idx, row) in enumerate(rows):
+        row_prev = rows[idx - 1]
+        row_next = rows[(idx + 1) % len(rows)]
+        try:
+            check_state_row(row, row_prev, row_next, tables, randomness)
+            assert idx not in failures
+        except AssertionError:
+            assert idx in failures
+
+    report = FailureReport()
+    verify_state_circuit(rows, tables, randomness, report)
+    assert [failure.index for failure in report.failures] == [1, 2, 3, 4, 5, 7]
+
+
+def test_state_sort_operations(tmp_path):
+    # fmt: off
+    ops = [
+        StartOp(),
+        StartOp(),
+        MemoryOp(rw_counter=1, rw=RW.Write, call_id=1, mem_addr=1, value=42),
+        StackOp(rw_counter=2, rw=RW.Write, call_id=1, stack_ptr=1023, value=rlc(533)),
+        StorageOp(rw_counter=3, rw=RW.Write, tx_id=1, addr=0x12345678, key=0x1112, value=rlc(789), committed_value=rlc(98765)),
+        MemoryOp(rw_counter=4, rw=RW.Read,  call_id=1, mem_addr=1, value=42),
+        MemoryOp(rw_counter=5, rw=RW.Write, call_id=1, mem_addr=0, value=7),
+        StorageOp(rw_counter=6, rw=RW.Write, tx_id=1, addr=0x12345678, key=0x1111, value=rlc(98765), committed_value=rlc(98765)),
+        StackOp(rw_counter=7, rw=RW.Read,  call_id=1, stack_ptr=1023, value=rlc(533)),
+    ]
+    # fmt: on
+    expected = [ops[i] for i in [0, 1, 6, 2, 5, 3, 8, 7, 4]]
+    assert list(sort_operations(ops)) == expected
+    # Spill runs of 2 operations to disk
+    assert list(sort_operations(ops, memory_budget=2, tmp_dir=str(tmp_path))) == expected
+    assert [type(op) for op in sort_operations(ops, memory_budget=2)] == [
+        type(op) for op in expected
+    ]
+    assert list(tmp_path.iterdir()) == []
+
+    rows = assign_state_circuit(ops, r, sort=True)
+    tables = Tables(mpt_table_from_ops(ops, randomness, sort=True))
+    verify_state_circuit(rows, tables, randomness)
+
+
+def test_state_streaming():
+    # fmt: off
+    ops = [
+        StartOp(),
+        MemoryOp(rw_counter=1, rw=RW.Write, call_id=1, mem_addr=0, value=42),
+        StackOp(rw_counter=2, rw=RW.Write, call_id=1, stack_ptr=1023, value=rlc(533)),
+        StorageOp(rw_counter=3, rw=RW.Write, tx_id=1, addr=0x12345678, key=0x1111, value=rlc(789), committed_value=rlc(98765)),
+        StorageOp(rw_counter=4, rw=RW.Write, tx_id=1, addr=0x12345678, key=0x1112, value=rlc(98765), committed_value=rlc(98765)),
+        CallContextOp(rw_counter=5, rw=RW.Read, call_id=1, field_tag=CallContextFieldTag.IsStatic, value=FQ(0)),
+        AccountOp(rw_counter=6, rw=RW.Read, addr=0x12345678, field_tag=AccountFieldTag.Nonce, value=FQ(1), committed_value=FQ(1)),
+        TxRefundOp(rw_counter=7, rw=RW.Read, tx_id=1, value=FQ(0)),
+    ]
+    # fmt: on
+    mpt_updates = mock_mpt_updates(ops, randomness)
+    tables = Tables(set(mpt_updates.values()))
+    rows = assign_state_circuit(ops, r)
+    assert [row.root.n for row in rows] == [3, 3, 3, 8, 13, 13, 18, 18]
+    assert isinstance(iter_assign_state_circuit(ops, r), Iterator)
+    assert list(iter_assign_state_circuit(ops, r)) == rows
+
+    for n in range(1, len(rows) + 1):
+        report = FailureReport()
+        verify_state_rows(iter(rows[:n]), tables, randomness, report)
+        assert report.n_checked == n
+    verify_state_rows(iter_assign_state_circuit(ops, r, mpt_updates), tables, randomness)
+
+    # The first row is checked last
+    rows[0] = rows[0]._replace(rw_counter=FQ(1))
+    rows[4] = rows[4]._replace(is_write=FQ(2))
+    report = FailureReport()
+    verify_state_rows(iter(rows), tables, randomness, report)
+    assert [failure.index for failure in report.failures] == [4, 0]
+    with pytest.raises(AssertionError):
+        verify_state_rows(iter(rows[1:]), tables, randomness)
+
+
+def test_state_packed_rows():
+    # fmt: off
+    ops = [
+        StartOp(),
+        MemoryOp(rw_counter=1, rw=RW.Write, call_id=1, mem_addr=0, value=42),
+        StackOp(rw_counter=2, rw=RW.Write, call_id=1, stack_ptr=1023, value=rlc(533)),
+        StorageOp(rw_counter=3, rw=RW.Write, tx_id=1, addr=0x12345678, key=0x1111, value=rlc(789), committed_value=rlc(98765)),
+        AccountOp(rw_counter=4, rw=RW.Read, addr=0x12345678, field_tag=AccountFieldTag.Nonce, value=FQ(1), committed_value=FQ(1)),
+    ]
+    # fmt: on
+    tables = Tables(mpt_table_from_ops(ops, randomness))
+    rows = assign_state_circuit(ops, r)
+    packed_rows = list(iter_assign_packed_state_circuit(ops, r))
+    assert [row.to_row() for row in packed_rows] == rows
+    assert [PackedRow.from_row(row) for row in rows] == packed_rows
+    verify(packed_rows, tables, randomness)
+    verify_state_circuit(packed_rows, tables, randomness)
+    verify_state_rows(iter_assign_packed_state_circuit(ops, r), tables, randomness)
+
+    # Read consistency breaks with the previous row
+    row = packed_rows[3].to_row()
+    packed_rows[3] = PackedRow.from_row(row._replace(is_write=FQ(0), value=FQ(1)))
+    packed_rows.insert(3, PackedRow.from_row(row))
+    verify(packed_rows, tables, randomness, success=False)
+
+    # The address limbs and storage key bytes are kept as assigned
+    packed_rows = list(iter_assign_packed_state_circuit(ops, r))
+    assert len(set(packed_rows)) == len(packed_rows)
+    row = rows[3]._replace(key2_limbs=(FQ(2**16),) + rows[3].key2_limbs[1:])
+    packed_rows[3] = PackedRow.from_row(row)
+    assert packed_rows[3].to_row() == row
+    verify(packed_rows, tables, randomness, success=False)
+    row = rows[3]._replace(key4_bytes=(FQ(256),) + rows[3].key4_bytes[1:])
+    packed_rows[3] = PackedRow.from_row(row)
+    assert packed_rows[3].to_row() == row
+    verify(packed_rows, tables, randomness, success=False)
+
+
+def test_state_parallel():
+    # fmt: off
+    ops = [
+        StartOp(),
+        MemoryOp(rw_counter=1, rw=RW.Write, call_id=1, mem_addr=0, value=42),
+        MemoryOp(rw_counter=2, rw=RW.Read,  call_id=1, mem_addr=0, value=42),
+        MemoryOp(rw_counter=3, rw=RW.Write, call_id=1, mem_addr=1, value=43),
+        StackOp(rw_counter=4, rw=RW.Write, call_id=1, stack_ptr=1022, value=rlc(533)),
+        StackOp(rw_counter=5, rw=RW.Read,  call_id=1, stack_ptr=1022, value=rlc(533)),
+        StorageOp(rw_counter=6, rw=RW.Write, tx_id=1, addr=0x12345678, key=0x1111, value=rlc(789), committed_value=rlc(98765)),
+        StorageOp(rw_counter=7, rw=RW.Write, tx_id=1, addr=0x12345678, key=0x1112, value=rlc(98765), committed_value=rlc(98765)),
+    ]
+    # fmt: on
+    rows = assign_state_circuit(ops, r)
+    tables = Tables(mpt_table_from_ops(ops, randomness))
+    verify_state_circuit_parallel(rows, tables, randomness, processes=2, chunk_size=3)
+
+    rows[0] = rows[0]._replace(rw_counter=FQ(1))
+    rows[2] = rows[2]._replace(value=FQ(41))
+    rows[5] = rows[5]._replace(rw_counter=FQ(3))
+    rows[7] = rows[7]._replace(is_write=FQ(2))
+    expected = FailureReport()
+    verify_state_circuit(rows, tables, randomness, expected)
+    for chunk_size in [1, 3, 100]:
+        report = FailureReport()
+        verify_state_circuit_parallel(rows, tables, randomness, report, 2, chunk_size)
+        assert report.failures == expected.failures
+        assert [failure.index for failure in report.failures] == [0, 2, 5, 7]
+        assert report.n_checked == len(rows)
+
+    report = FailureReport(max_failures=2)
+    verify_state_circuit_parallel(rows, tables, randomness, report, processes=2, chunk_size=2)
+    assert [failure.index for failure in report.failures] == [0, 2]
+    assert report.n_checked == 3
+    with pytest.raises(AssertionError):
+        verify_state_circuit_parallel(rows[1:], tables, randomness, processes=2, chunk_size=3)
+
+
+def test_state_from_rw_table():
+    rws = (
+        RWDictionary(1)
+        .call_context_read(1, CallContextFieldTag.TxId, 1)
+        .stack_write(1, 1023, RLC(0x1111, r))
+        .stack_read(1, 1023, RLC(0x1111, r))
+        .memory_write(1, 0, 0x11)
+        .account_read(0xFF, AccountFieldTag.Balance, 5)
+        .account_write(0xFF, AccountFieldTag.Nonce, 2, 1)
+        .account_storage_read(0xFF, RLC(2, r), RLC(7, r), 1, RLC(7, r))
+        .account_storage_write(0xFF, RLC(2, r), RLC(8, r), RLC(7, r), 1, RLC(7, r))
+        .tx_access_list_account_storage_write(1, 0xFF, RLC(2, r), True, False)
+        .tx_refund_write(1, 4800, 0)
+        .tx_log_write(1, 1, TxLogFieldTag.Topic, 0, RLC(0xABCD, r))
+        .tx_receipt_read(1, TxReceiptFieldTag.LogLength, 1)
+        .account_write(0xFF, AccountFieldTag.Nonce, 3, 2)
+        .rws
+    )
+    ops = rw_table_to_operations(set(rws))
+    assert [(type(op), op.rw_counter) for op in ops] == [
+        (StartOp, 0),
+        (MemoryOp, 4),
+        (StackOp, 2),
+        (StackOp, 3),
+        (StorageOp, 7),
+        (StorageOp, 8),
+        (CallContextOp, 1),
+        (AccountOp, 6),
+        (AccountOp, 13),
+        (AccountOp, 5),
+        (TxRefundOp, 10),
+        (TxAccessListAccountStorageOp, 9),
+        (TxLogOp, 11),
+        (TxReceiptOp, 12),
+    ]
+    # Committed values of the Account fields come from their first access
+    assert [op.committed_value for op in ops[7:10]] == [FQ(1), FQ(1), FQ(5)]
+    assert ops[12] == TxLogOp(11, RW.Write, 1, 1, TxLogFieldTag.Topic, 0, rlc(0xABCD))
+
+    # Both circuits are fed from the same rw table
+    tables = Tables(mpt_table_from_last_accesses(ops, randomness))
+    verify_state_circuit(assign_state_circuit(ops, randomness), tables, randomness)
+    # The MPT table of all the accesses doesn't match the last ones
+    tables = Tables(mpt_table_from_ops(ops, randomness))
+    with pytest.raises(LookupUnsatFailure):
+        verify_state_circuit(assign_state_circuit(ops, randomness), tables, randomness)
+
+    ops = rw_table_to_operations(rws, n_rows=20)
+    assert len(ops) == 20 and all(isinstance(op, StartOp) for op in ops[:7])
+    with pytest.raises(ValueError):
+        rw_table_to_operations(rws, n_rows=len(rws))
+    with pytest.raises(ValueError):
+        rw_table_to_operations([RWDictionary(1).account_storage_read(0xFF, FQ(2), FQ(7), 1, FQ(7)).rws[0]])  # type: ignore
+
+
+def test_state_circuit_stats():
+    # fmt: off
+    ops = [
+        StartOp(),
+        MemoryOp(rw_counter=1, rw=RW.Write, call_id=1, mem_addr=0, value=42),
+        MemoryOp(rw_counter=2, rw=RW.Read,  call_id=1, mem_addr=0, value=42),
+        MemoryOp(rw_counter=3, rw=RW.Read,  call_id=1, mem_addr=0, value=42),
+        MemoryOp(rw_counter=4, rw=RW.Write, call_id=1, mem_addr=1, value=43),
+        StackOp(rw_counter=5, rw=RW.Write, call_id=1, stack_ptr=1022, value=rlc(533)),
+        StackOp(rw_counter=6, rw=RW.Write, call_id=1, stack_ptr=1023, value=rlc(534)),
+        StorageOp(rw_counter=7, rw=RW.Write, tx_id=1, addr=0x12345678, key=0x1111, value=rlc(789), committed_value=rlc(98765)),
+    ]
+    # fmt: on
+    stats = state_circuit_stats(ops)
+    assert stats.tags[Tag.Memory] == TagStats(
+        rows=4, keys=2, longest_run=3, range_check_lookups=4 * (COMMON_RANGE_CHECKS + 2)
+    )
+    assert stats.tags[Tag.Stack] == TagStats(
+        rows=2, keys=2, longest_run=1, range_check_lookups=2 * (COMMON_RANGE_CHECKS + 1) + 1
+    )
+    assert stats.rows() == len(ops)
+    assert stats.range_check_lookups() == len(ops) * COMMON_RANGE_CHECKS + 4 * 2 + 3
+
+    rows_stats = state_circuit_stats(assign_state_circuit(ops, randomness))
+    assert rows_stats.to_dict() == stats.to_dict()
+    assert json.loads(stats.to_json())["tags"]["Storage"] == {
+        "rows": 1,
+        "keys": 1,
+        "longest_run": 1,
+        "range_check_lookups": COMMON_RANGE_CHECKS,
+    }
+
+
 def test_state_bad_rwc():
     # fmt: off
     # rwc decreases
@@ -377,3 +722,37 @@ def test_storage_committed_value_bad():
     # fmt: on
     tables = Tables(mpt_table_from_ops(ops, randomness))
     verify(ops, tables, randomness, success=False)
+
+
+def test_state_failure_report():
+    # fmt: off
+    ops = [
+        StartOp(),
+        MemoryOp(rw_counter=1, rw=RW.Write, call_id=1, mem_addr=0, value=42),
+        MemoryOp(rw_counter=2, rw=RW.Read,  call_id=1, mem_addr=0, value=42),
+        StackOp(rw_counter=3, rw=RW.Write, call_id=1, stack_ptr=1023, value=rlc(533)),
+        StackOp(rw_counter=4, rw=RW.Read,  call_id=1, stack_ptr=1023, value=rlc(533)),
+    ]
+    # fmt: on
+    rows = assign_state_circuit(ops, r)
+    tables = Tables(mpt_table_from_ops(ops, randomness))
+    report = FailureReport()
+    verify_state_circuit(rows, tables, randomness, report)
+    assert report.ok() and report.n_checked == len(rows)
+
+    # key2 doesn't match its limbs, and is_write is not boolean
+    rows[1] = rows[1]._replace(key2_limbs=(FQ(1),) * 10)
+    rows[4] = rows[4]._replace(is_write=FQ(2))
+    report = FailureReport()
+    verify_state_circuit(rows, tables, randomness, report)
+    assert [(failure.index, failure.state) for failure in report.failures] == [
+        (1, "Memory"),
+        (4, "Stack"),
+    ]
+    assert all("state.py" in failure.location for failure in report.failures)
+
+    # Stop once the budget is exhausted
+    report = FailureReport(max_failures=1)
+    verify_state_circuit(rows, tables, randomness, report)
+    assert len(report.failures) == 1 and report.exhausted()
+    assert report.n_checked == 2
@@ -1,10 +1,25 @@
+import pickle
+import pytest
 import traceback
 from typing import Union, List
 from eth_keys import keys
 from eth_utils import keccak
 import rlp
+import zkevm_specs.tx
+from zkevm_specs.bytecode import assign_keccak_table
+from zkevm_specs.evm import Bytecode, KeccakCircuit, LookupUnsatFailure, Tables
 from zkevm_specs.tx import *
-from zkevm_specs.util import rand_fq, FQ, RLC, U64
+from zkevm_specs.util import (
+    rand_fq,
+    FQ,
+    RLC,
+    U64,
+    KECCAK_CACHE_MAX_INPUT_SIZE,
+    KECCAK_CACHE_SIZE,
+    keccak256,
+    keccak_cache_clear,
+    keccak_cache_info,
+)
 
 randomness = rand_fq()
 r = randomness
@@ -78,6 +93,41 @@ def test_ecdsa_verify_chip():
     ecdsa_chip.verify(assert_msg="ecdsa verification failed")
 
 
+def test_ecdsa_verify_chip_cache(monkeypatch):
+    signature_cache_clear()
+    n_verified = 0
+    ecdsa_verify = zkevm_specs.tx.KeyAPI.ecdsa_verify
+
+    def counting_ecdsa_verify(*args, **kwargs):
+        nonlocal n_verified
+        n_verified += 1
+        return ecdsa_verify(*args, **kwargs)
+
+    monkeypatch.setattr(zkevm_specs.tx.KeyAPI, "ecdsa_verify", counting_ecdsa_verify)
+
+    sk = keys.PrivateKey(b"\x03" * 32)
+    msg_hash = b"\xaf" * 32
+    sig = sk.sign_msg_hash(msg_hash)
+
+    ecdsa_chip = ECDSAVerifyChip.assign(sig, sk.public_key, msg_hash)
+    ecdsa_chip.verify(assert_msg="ecdsa verification failed")
+    assert n_verified == 1
+    # The second verification of the same signature is a cache hit
+    ECDSAVerifyChip.assign(sig, sk.public_key, msg_hash).verify(assert_msg="cache hit failed")
+    assert n_verified == 1
+    assert signature_cache_info() == (1, 1, VERIFIED_SIGNATURES_CACHE_SIZE, 1)
+
+    # Changing any part of the key misses the cache
+    ecdsa_chip.signature = (ecdsa_chip.signature[0], Secp256k1ScalarField(2))
+    with pytest.raises(AssertionError):
+        ecdsa_chip.verify(assert_msg="ecdsa verification failed")
+    assert n_verified == 2
+    # Only valid signatures are stored
+    assert signature_cache_info() == (1, 2, VERIFIED_SIGNATURES_CACHE_SIZE, 1)
+    signature_cache_clear()
+    assert signature_cache_info() == (0, 0, VERIFIED_SIGNATURES_CACHE_SIZE, 0)
+
+
 def test_tx2witness():
     sk = keys.PrivateKey(b"\x01" * 32)
     pk = sk.public_key
@@ -96,6 +146,9 @@ def test_tx2witness():
     tx = sign_tx(sk, tx, chain_id)
     keccak_table = KeccakTable()
     rows, sign_verification = tx2witness(0, tx, chain_id, r, keccak_table)
+    # The CallData rows are a view of the calldata
+    assert isinstance(rows, TxTableRows) and len(rows.call_data) == len(data)
+    assert [row.value for row in rows[-len(data) :]] == [FQ(byte) for byte in data]
     for row in rows:
         if row.tag == Tag.CallerAddress:
             assert addr == row.value.n.to_bytes(20, "big")
@@ -131,6 +184,173 @@ def test_verify():
     verify(witness, MAX_TXS, MAX_CALLDATA_BYTES, chain_id, r)
 
 
+def test_txs2witness_parallel():
+    MAX_TXS = 8
+    MAX_CALLDATA_BYTES = 40
+    NUM_TXS = 7
+    chain_id = 1337
+    sks = [keys.PrivateKey(bytes([byte + 1]) * 32) for byte in range(NUM_TXS)]
+
+    txs: List[Transaction] = []
+    for i, sk in enumerate(sks):
+        to = int.from_bytes(sks[(i + 1) % len(sks)].public_key.to_canonical_address(), "big")
+        txs.append(gen_tx(i, sk, to, chain_id))
+
+    witness = txs2witness(txs, chain_id, MAX_TXS, MAX_CALLDATA_BYTES, r)
+    witness_parallel = txs2witness(txs, chain_id, MAX_TXS, MAX_CALLDATA_BYTES, r, processes=2)
+    for field in Witness._fields:
+        assert pickle.dumps(getattr(witness_parallel, field)) == pickle.dumps(
+            getattr(witness, field)
+        )
+    verify(witness_parallel, MAX_TXS, MAX_CALLDATA_BYTES, chain_id, r)
+
+
+def test_keccak_cache():
+    keccak_cache_clear()
+    witness, chain_id, MAX_TXS, MAX_CALLDATA_BYTES = gen_valid_witness()
+    info = keccak_cache_info()
+    # The public key of each tx is hashed by the SignVerifyChip and the
+    # keccak table after its address is derived
+    assert info.hits >= 2 * 3
+    assert info.currsize <= info.maxsize == KECCAK_CACHE_SIZE
+    assert keccak256(bytearray(b"\x01\x02")) == keccak(b"\x01\x02")
+    assert keccak_cache_info().misses == info.misses + 1
+    # Large inputs are not memoized
+    data = bytes(KECCAK_CACHE_MAX_INPUT_SIZE + 1)
+    assert keccak256(data) == keccak(data)
+    assert keccak_cache_info().currsize == info.currsize + 1
+    verify(witness, MAX_TXS, MAX_CALLDATA_BYTES, chain_id, r)
+
+
+def test_txs2witness_lazy_padding():
+    MAX_TXS = 10**4
+    MAX_CALLDATA_BYTES = 10**7
+    chain_id = 1337
+    sks = [keys.PrivateKey(bytes([byte + 1]) * 32) for byte in range(2)]
+    txs = [gen_tx(i, sk, 0x1234, chain_id) for i, sk in enumerate(sks)]
+
+    witness = txs2witness(txs, chain_id, MAX_TXS, MAX_CALLDATA_BYTES, r)
+    rows = witness.rows
+    assert isinstance(rows, TxTableRows)
+    n_front_padding = (MAX_TXS - 2) * Tag.TxSignHash
+    assert len(rows.fixed_rows) == 2 * Tag.TxSignHash and len(rows.call_data) == 1
+    assert rows[0].tx_id == FQ(1) and rows[n_front_padding - 1].tx_id == FQ(n_front_padding)
+    assert rows[n_front_padding].tx_id == FQ(1) and rows[n_front_padding].tag == Tag.Nonce
+    assert rows[-1].tag == Tag.Pad and rows[-1].tx_id == FQ(0)
+    verify(witness, MAX_TXS, MAX_CALLDATA_BYTES, chain_id, r)
+
+    # Iterating doesn't create the pad rows that were never accessed
+    n_accessed = len(rows.virtual_rows)
+    head = [(row.tx_id, row.tag) for row, _ in zip(rows, range(3))]
+    assert head == [(FQ(i + 1), FQ(Tag.Pad)) for i in range(3)]
+    assert len(rows.virtual_rows) == n_accessed
+
+    # Pad rows accessed by index are kept, so modifying them sticks
+    rows[1].value = FQ(1)
+    rows[-1].value = FQ(2)
+    assert (rows[1].value, rows[-1].value, rows[-2].value) == (FQ(1), FQ(2), FQ(0))
+    assert [row.value for row, _ in zip(rows, range(3))] == [FQ(0), FQ(1), FQ(0)]
+
+
+def test_txs2witness_lazy_call_data():
+    MAX_TXS = 5
+    MAX_CALLDATA_BYTES = 2**16
+    chain_id = 1337
+    sks = [keys.PrivateKey(bytes([byte + 1]) * 32) for byte in range(3)]
+    txs = [gen_tx(i, sk, 0x1234, chain_id) for i, sk in enumerate(sks)]
+    data = bytes(range(256)) * 128 + bytes(2**14)
+    txs[1] = sign_tx(sks[1], Transaction(*txs[1][:5], data, 0, 0, 0), chain_id)
+
+    witness = txs2witness(txs, chain_id, MAX_TXS, MAX_CALLDATA_BYTES, r)
+    rows = witness.rows
+    assert isinstance(rows, TxTableRows)
+    assert len(rows.call_data) == len(data) + 2 and len(rows.virtual_rows) == 0
+    # Tx 1 has no calldata, so the CallData rows of tx 2 come first
+    start = rows.call_data.start
+    assert (rows[start].tx_id, rows[start].tag) == (FQ(2), FQ(Tag.CallData))
+    row = rows[start + 300]
+    assert (row.tx_id, row.tag, row.index, row.value) == (FQ(2), Tag.CallData, FQ(300), FQ(44))
+    row = rows[rows.call_data.stop - 1]
+    assert (row.tx_id, row.index, row.value) == (FQ(3), FQ(1), FQ(2))
+    assert rows[rows.call_data.stop].tag == Tag.Pad
+
+    # The rows are the same as the ones of each tx
+    tx_rows, _ = tx2witness(1, txs[1], chain_id, r, KeccakTable())
+    fields = lambda row: (row.tx_id, row.tag, row.index, row.value)
+    call_data_rows = [fields(row) for row in tx_rows if row.tag == Tag.CallData]
+    assert call_data_rows == [fields(row) for row in rows[start : start + len(data)]]
+    gas_cost = sum(4 if byte == 0 else 16 for byte in data)
+    assert FQ(gas_cost) in [row.value for row in tx_rows if row.tag == Tag.CallDataGasCost]
+    verify(witness, MAX_TXS, MAX_CALLDATA_BYTES, chain_id, r)
+
+
+def test_txs2witness_cache(tmp_path):
+    MAX_TXS = 5
+    MAX_CALLDATA_BYTES = 16
+    chain_id = 1337
+    sks = [keys.PrivateKey(bytes([byte + 1]) * 32) for byte in range(3)]
+    txs = [gen_tx(i, sk, 0x1234, chain_id) for i, sk in enumerate(sks)]
+
+    cache = TxWitnessCache(str(tmp_path))
+    witness = txs2witness(txs, chain_id, MAX_TXS, MAX_CALLDATA_BYTES, r, cache=cache)
+    assert len(list(tmp_path.iterdir())) == len(txs)
+    entry = cache.load(cache.key(txs[1], chain_id))
+    assert entry.sender == sks[1].public_key.to_canonical_address()
+    assert entry.randomness == r
+
+    # The txs in a different order reuse the cached entries
+    txs = [txs[1], txs[0], txs[2]]
+    witness = txs2witness(txs, chain_id, MAX_TXS, MAX_CALLDATA_BYTES, r)
+    witness_cached = txs2witness(txs, chain_id, MAX_TXS, MAX_CALLDATA_BYTES, r, cache=cache)
+    for field in Witness._fields:
+        assert pickle.dumps(getattr(witness_cached, field)) == pickle.dumps(getattr(witness, field))
+    verify(witness_cached, MAX_TXS, MAX_CALLDATA_BYTES, chain_id, r)
+
+    # A new randomness updates the cached rows
+    r2 = rand_fq()
+    witness = txs2witness(txs, chain_id, MAX_TXS, MAX_CALLDATA_BYTES, r2, cache=cache)
+    assert cache.load(cache.key(txs[0], chain_id)).randomness == r2
+    verify(witness, MAX_TXS, MAX_CALLDATA_BYTES, chain_id, r2)
+
+    # A corrupted entry doesn't pass verification
+    cache.save(cache.key(txs[0], chain_id), entry._replace(randomness=r2))
+    witness = txs2witness(txs, chain_id, MAX_TXS, MAX_CALLDATA_BYTES, r2, cache=cache)
+    verify(witness, MAX_TXS, MAX_CALLDATA_BYTES, chain_id, r2, success=False)
+
+
+def test_txs2witness_cache_miss(tmp_path, monkeypatch):
+    MAX_TXS = 5
+    MAX_CALLDATA_BYTES = 16
+    chain_id = 1337
+    sks = [keys.PrivateKey(bytes([byte + 1]) * 32) for byte in range(3)]
+    txs = [gen_tx(i, sk, 0x1234, chain_id) for i, sk in enumerate(sks)]
+    cache = TxWitnessCache(str(tmp_path))
+
+    # An unreadable entry is a miss, and is overwritten
+    key = cache.key(txs[0], chain_id)
+    with open(cache.entry_path(key), "w") as fp:
+        fp.write('{"sign_hash": ')
+    assert cache.load(key) is None
+    with open(cache.entry_path(key), "w") as fp:
+        fp.write('{"sign_hash": "00"}')
+    assert cache.load(key) is None
+
+    # Each tx is hashed once on a miss
+    n_hashed = 0
+    tx_hash = Transaction.hash
+
+    def counting_hash(tx):
+        nonlocal n_hashed
+        n_hashed += 1
+        return tx_hash(tx)
+
+    monkeypatch.setattr(Transaction, "hash", counting_hash)
+    witness = txs2witness(txs, chain_id, MAX_TXS, MAX_CALLDATA_BYTES, r, cache=cache)
+    assert n_hashed == len(txs)
+    assert cache.load(key).sender == sks[0].public_key.to_canonical_address()
+    verify(witness, MAX_TXS, MAX_CALLDATA_BYTES, chain_id, r)
+
+
 def gen_valid_witness() -> Tuple[Witness, U64, int, int]:
     MAX_TXS = 5
     MAX_CALLDATA_BYTES = 16
@@ -150,11 +370,35 @@ def gen_valid_witness() -> Tuple[Witness, U64, int, int]:
     return witness, chain_id, MAX_TXS, MAX_CALLDATA_BYTES
 
 
+def test_keccak_table_shared():
+    witness, chain_id, MAX_TXS, MAX_CALLDATA_BYTES = gen_valid_witness()
+    keccak_table = witness.keccak_table
+
+    # Add the entries of the bytecode and EVM circuits to the tx keccak table
+    code = bytes(Bytecode().push1(1).stop().code)
+    assign_keccak_table([code], r, keccak_table)
+    keccak_table.extend(KeccakCircuit().add(b"\x01\x02", r).rows)
+    assert len(keccak_table) == 3 + 1 + 1
+
+    code_rlc = RLC(code[::-1], r, n_bytes=len(code)).expr()
+    code_hash = RLC(Bytecode(code).hash(), r).expr()
+    assert (code_rlc, FQ(len(code)), code_hash) in keccak_table
+    assert (code_rlc, FQ(len(code) + 1), code_hash) not in keccak_table
+
+    tables = Tables(set(), set(), set(), set(), keccak_table=keccak_table)
+    assert tables.keccak_table is keccak_table
+    row = tables.keccak_lookup(FQ(2), RLC(b"\x02\x01", r, n_bytes=2))
+    assert row.output == RLC(keccak256(b"\x01\x02"), r).expr()
+    with pytest.raises(LookupUnsatFailure):
+        tables.keccak_lookup(FQ(3), RLC(b"\x02\x01", r, n_bytes=2))
+
+    verify(witness, MAX_TXS, MAX_CALLDATA_BYTES, chain_id, r)
+
+
 def test_bad_keccak():
     witness, chain_id, MAX_TXS, MAX_CALLDATA_BYTES = gen_valid_witness()
     # Set empty keccak lookup table
     witness = Witness(witness.rows, KeccakTable(), witness.sign_verifications)
-    verify(witness, MAX_TXS, MAX_CALLDATA_BYTES, chain_id, r, success=False)
 
 
 def test_bad_signature():
@@ -162,7 +406,6 @@ def test_bad_signature():
     sign_verifications = witness.sign_verifications
     sign_verifications[0].ecdsa_chip.signature = (Secp256k1ScalarField(1), Secp256k1ScalarField(2))
     witness = Witness(witness.rows, witness.keccak_table, sign_verifications)
-    verify(witness, MAX_TXS, MAX_CALLDATA_BYTES, chain_id, r, success=False)
 
 
 def test_bad_address():
@@ -170,7 +413,6 @@ def test_bad_address():
     sign_verifications = witness.sign_verifications
     sign_verifications[0].address = FQ(1234)
     witness = Witness(witness.rows, witness.keccak_table, sign_verifications)
-    verify(witness, MAX_TXS, MAX_CALLDATA_BYTES, chain_id, r, success=False)
 
 
 def test_bad_msg_hash():
@@ -178,7 +420,6 @@ def test_bad_msg_hash():
     sign_verifications = witness.sign_verifications
     sign_verifications[0].msg_hash_rlc = FQ(4567)
     witness = Witness(witness.rows, witness.keccak_table, sign_verifications)
-    verify(witness, MAX_TXS, MAX_CALLDATA_BYTES, chain_id, r, success=False)
 
 
 def test_bad_addr_copy():
@@ -187,7 +428,6 @@ def test_bad_addr_copy():
     row_addr_offset = 0 * Tag.TxSignHash + Tag.CallerAddress - 1
     rows[row_addr_offset].value = FQ(1213)
     witness = Witness(rows, witness.keccak_table, witness.sign_verifications)
-    verify(witness, MAX_TXS, MAX_CALLDATA_BYTES, chain_id, r, success=False)
 
 
 def test_bad_sign_hash_copy():